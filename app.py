@@ -1,319 +1,161 @@
 import streamlit as st
 import pandas as pd
-import requests
-import math
-from datetime import datetime, timedelta
-import json
-
-st.set_page_config(page_title="Sistema EV+ - Brasileirão 2025", page_icon="⚽", layout="wide")
-
-# ==================== FUNÇÕES MATEMÁTICAS ====================
-
-def poisson_probability(k, lambda_value):
-    if lambda_value <= 0:
-        lambda_value = 0.5
-    return (lambda_value ** k * math.exp(-lambda_value)) / math.factorial(k)
-
-def calculate_match_probabilities(home_expected_goals, away_expected_goals, max_goals=7):
-    probability_matrix = []
-    for home_goals in range(max_goals + 1):
-        for away_goals in range(max_goals + 1):
-            probability = poisson_probability(home_goals, home_expected_goals) * poisson_probability(away_goals, away_expected_goals)
-            probability_matrix.append({
-                'home_goals': home_goals,
-                'away_goals': away_goals,
-                'probability': probability
-            })
-    return probability_matrix
-
-def calculate_markets(probability_matrix):
-    markets = {}
-    markets['home_win'] = sum(p['probability'] for p in probability_matrix if p['home_goals'] > p['away_goals'])
-    markets['draw'] = sum(p['probability'] for p in probability_matrix if p['home_goals'] == p['away_goals'])
-    markets['away_win'] = sum(p['probability'] for p in probability_matrix if p['home_goals'] < p['away_goals'])
-    markets['over_2.5'] = sum(p['probability'] for p in probability_matrix if (p['home_goals'] + p['away_goals']) > 2.5)
-    markets['under_2.5'] = 1 - markets['over_2.5']
-    markets['btts_yes'] = sum(p['probability'] for p in probability_matrix if p['home_goals'] > 0 and p['away_goals'] > 0)
-    markets['btts_no'] = 1 - markets['btts_yes']
-    return markets
-
-def calculate_ev(probability, odd):
-    return (probability * odd) - 1 if odd > 0 else 0
-
-def calculate_kelly_criterion(probability, odd):
-    if odd <= 1:
-        return 0
-    kelly = (probability * odd - 1) / (odd - 1)
-    return max(0, min(kelly, 0.25))
-
-def classify_bet(probability, odd, ev):
-    if ev >= 0.10 and probability >= 0.40 and 1.50 <= odd <= 4.00:
-        return "simple_high"
-    elif ev >= 0.15 and odd >= 5.00:
-        return "high_risk"
-    elif 0.05 <= ev <= 0.15 and probability >= 0.30:
-        return "multiple"
-    elif ev > 0:
-        return "simple_low"
-    else:
-        return "no_value"
 
-def calculate_bankroll_distribution(total_bankroll, bets, risk_profile="balanced"):
-    simple_high_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "simple_high"]
-    multiple_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "multiple"]
-    high_risk_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "high_risk"]
-    simple_low_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "simple_low"]
-    
-    profiles = {
-        "conservative": {"simple": 0.60, "multiple": 0.30, "high_risk": 0.10},
-        "balanced": {"simple": 0.50, "multiple": 0.35, "high_risk": 0.15},
-        "aggressive": {"simple": 0.40, "multiple": 0.40, "high_risk": 0.20}
-    }
-    
-    profile = profiles[risk_profile]
-    
-    simple_budget = total_bankroll * profile["simple"]
-    multiple_budget = total_bankroll * profile["multiple"]
-    high_risk_budget = total_bankroll * profile["high_risk"]
-    
-    recommendations = {
-        "simple_high": simple_high_bets,
-        "simple_low": simple_low_bets,
-        "multiple": multiple_bets,
-        "high_risk": high_risk_bets,
-        "budgets": {
-            "simple_total": simple_budget,
-            "multiple_total": multiple_budget,
-            "high_risk_total": high_risk_budget
-        }
-    }
-    
-    return recommendations
+from ev_core.analysis import analyse_match
+from ev_core.betting import calculate_bankroll_distribution, calculate_ev, classify_bet
+from ev_core.config import load_model_config
+from ev_core.dixon_coles import model_for_index
+from ev_core.event_store import EventStore
+from ev_core.ingestion import SeasonIngestor
+from ev_core.ledger import BetLedger
+from ev_core.margins import DISAGREEMENT_THRESHOLD, compare_prices
+from ev_core.market_catalogue import CATALOGUE_GROUPS, catalogue_label, has_push
+from ev_core.odds_history import OddsHistory, find_fixture
+from ev_core.odds_import import MARKET_BET_KEYS, market_label, read_odds_file, scan_value_bets
+from ev_core.portfolio import optimize_portfolio
+from ev_core.pricing_cache import PricingCache
+from ev_core.staking import PATHS, RUIN_LEVEL, profile_risk, staking_plan
+from ev_core.round_pricing import price_round
+from ev_core.season_cache import SeasonCache, SeasonLoader, season_formats
+from ev_core.season_simulation import simulate_from_index
+from ev_core.sportsdb import SportsDBClient
+
+st.set_page_config(page_title="Sistema EV+ - Brasileirão", page_icon="⚽", layout="wide")
 
 # ==================== FUNÇÕES DA API ====================
 
-API_BASE = "https://www.thesportsdb.com/api/v1/json/3"
-LEAGUE_ID = "4351"
-
-@st.cache_data(ttl=3600)
-def get_season_results():
-    season_formats = ["2025", "2024-2025"]
-    for season in season_formats:
-        url = f"{API_BASE}/eventsseason.php?id={LEAGUE_ID}&s={season}"
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data and data.get('events') and len(data['events']) > 0:
-                    return data['events'], None, season
-        except:
-            continue
-    return None, "Erro ao carregar dados", None
-
-def process_team_stats(events, team_name, venue='home', use_recent=True):
-    """
-    Processa estatísticas com ponderação de jogos recentes
-    use_recent=True: Últimos 5 jogos têm peso 70%, restante 30%
-    """
-    games = []
-    for event in events:
-        if not event.get('intHomeScore') or not event.get('intAwayScore'):
-            continue
-        try:
-            if venue == 'home' and event.get('strHomeTeam') == team_name:
-                games.append({
-                    'scored': int(event['intHomeScore']),
-                    'conceded': int(event['intAwayScore']),
-                    'date': event.get('dateEvent')
-                })
-            elif venue == 'away' and event.get('strAwayTeam') == team_name:
-                games.append({
-                    'scored': int(event['intAwayScore']),
-                    'conceded': int(event['intHomeScore']),
-                    'date': event.get('dateEvent')
-                })
-        except:
-            continue
-    
-    if not games:
-        return None
-    
-    games.sort(key=lambda x: x['date'], reverse=True)
-    
-    if use_recent and len(games) >= 5:
-        recent_5 = games[:5]
-        older = games[5:]
-        
-        recent_scored_avg = sum(g['scored'] for g in recent_5) / len(recent_5)
-        recent_conceded_avg = sum(g['conceded'] for g in recent_5) / len(recent_5)
-        
-        if older:
-            older_scored_avg = sum(g['scored'] for g in older) / len(older)
-            older_conceded_avg = sum(g['conceded'] for g in older) / len(older)
-            
-            scored_average = (recent_scored_avg * 0.7) + (older_scored_avg * 0.3)
-            conceded_average = (recent_conceded_avg * 0.7) + (older_conceded_avg * 0.3)
-        else:
-            scored_average = recent_scored_avg
-            conceded_average = recent_conceded_avg
-    else:
-        scored_average = sum(game['scored'] for game in games) / len(games)
-        conceded_average = sum(game['conceded'] for game in games) / len(games)
-    
-    return {
-        'games': len(games),
-        'scored_average': scored_average,
-        'conceded_average': conceded_average,
-        'last_5': games[:5] if len(games) >= 5 else games
-    }
-
-def get_head_to_head(events, home_team, away_team):
-    """Retorna confrontos diretos entre os dois times"""
-    h2h = []
-    for event in events:
-        if not event.get('intHomeScore') or not event.get('intAwayScore'):
-            continue
-        
-        home = event.get('strHomeTeam')
-        away = event.get('strAwayTeam')
-        
-        if (home == home_team and away == away_team) or (home == away_team and away == home_team):
-            try:
-                h2h.append({
-                    'date': event.get('dateEvent'),
-                    'home': home,
-                    'away': away,
-                    'score_home': int(event['intHomeScore']),
-                    'score_away': int(event['intAwayScore'])
-                })
-            except:
-                continue
-    
-    h2h.sort(key=lambda x: x['date'], reverse=True)
-    return h2h[:5]
-
-def adjust_probability_with_h2h(base_prob_home, base_prob_draw, base_prob_away, h2h_data, home_team):
-    """
-    Ajusta probabilidades baseado em confrontos diretos
-    Peso: 15% H2H, 85% estatísticas gerais
-    """
-    if not h2h_data or len(h2h_data) < 2:
-        return base_prob_home, base_prob_draw, base_prob_away
-    
-    h2h_home_wins = 0
-    h2h_draws = 0
-    h2h_away_wins = 0
-    
-    for match in h2h_data:
-        if match['score_home'] > match['score_away']:
-            if match['home'] == home_team:
-                h2h_home_wins += 1
-            else:
-                h2h_away_wins += 1
-        elif match['score_home'] < match['score_away']:
-            if match['away'] == home_team:
-                h2h_home_wins += 1
-            else:
-                h2h_away_wins += 1
-        else:
-            h2h_draws += 1
-    
-    total_h2h = len(h2h_data)
-    h2h_prob_home = h2h_home_wins / total_h2h
-    h2h_prob_draw = h2h_draws / total_h2h
-    h2h_prob_away = h2h_away_wins / total_h2h
-    
-    adjusted_home = (base_prob_home * 0.85) + (h2h_prob_home * 0.15)
-    adjusted_draw = (base_prob_draw * 0.85) + (h2h_prob_draw * 0.15)
-    adjusted_away = (base_prob_away * 0.85) + (h2h_prob_away * 0.15)
-    
-    total = adjusted_home + adjusted_draw + adjusted_away
-    adjusted_home /= total
-    adjusted_draw /= total
-    adjusted_away /= total
-    
-    return adjusted_home, adjusted_draw, adjusted_away
+LEAGUES = {
+    "4351": "Brasileirão Série A",
+    "4404": "Brasileirão Série B"
+}
+SEASONS = ("2025", "2024", "2023")
+
+@st.cache_resource
+def get_season_loader():
+    """Snapshot em disco da temporada, revalidado em segundo plano a cada hora"""
+    return SeasonLoader(SeasonCache(), SportsDBClient().fetch_season_events, max_age=3600)
+
+@st.cache_resource
+def get_event_store():
+    """Histórico colunar de todas as ligas/temporadas já carregadas"""
+    return EventStore()
+
+@st.cache_resource
+def get_season_ingestor():
+    """Mantém o índice da temporada e aplica só os jogos novos/alterados de cada snapshot"""
+    return SeasonIngestor(get_event_store())
+
+@st.cache_resource
+def get_pricing_cache():
+    """Preços por (λ casa, λ fora, parâmetros) compartilhados entre reruns e sessões"""
+    return PricingCache()
+
+@st.cache_data(ttl=60)
+def get_model_config():
+    """Pesos do modelo gravados pela calibração (padrões se não houver arquivo)"""
+    return load_model_config()
+
+def get_season_index(league_id, season):
+    snapshot = get_season_loader().load(league_id, season_formats(season))
+    if snapshot is None:
+        return None, "Erro ao carregar dados", None
+    return get_season_ingestor().ingest(league_id, snapshot.season, snapshot.fetched_at, snapshot.events), None, snapshot.season
 
 # ==================== GERENCIAMENTO DE APOSTAS ====================
 
+@st.cache_resource
+def get_ledger():
+    """Histórico de apostas em SQLite, compartilhado entre sessões"""
+    return BetLedger()
+
 def load_bets_history():
-    """Carrega histórico de apostas do session_state"""
-    if 'bets_history' not in st.session_state:
-        st.session_state.bets_history = []
-    return st.session_state.bets_history
+    """Carrega histórico de apostas do banco"""
+    return get_ledger().list_bets()
+
+@st.cache_resource
+def get_odds_history():
+    """Série temporal das odds importadas, usada no closing line value"""
+    return OddsHistory()
 
 def save_bet_to_history(bet_data):
-    """Salva aposta no histórico"""
-    if 'bets_history' not in st.session_state:
-        st.session_state.bets_history = []
-    
-    bet_data['id'] = len(st.session_state.bets_history)
-    bet_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    st.session_state.bets_history.append(bet_data)
+    """Salva aposta no histórico com o jogo pendente correspondente (event_id e kickoff) para o CLV"""
+    if not bet_data.get('kickoff') and ' vs ' in bet_data['jogo']:
+        bet_data = {**find_fixture(season_index, *bet_data['jogo'].split(' vs ', 1)), **bet_data}
+    return get_ledger().save_bet(bet_data)
 
 def update_bet_status(bet_id, new_status):
     """Atualiza status de uma aposta"""
-    for bet in st.session_state.bets_history:
-        if bet.get('id') == bet_id:
-            bet['status'] = new_status
-            break
+    return get_ledger().update_status(bet_id, new_status)
 
 def calculate_roi():
     """Calcula ROI das apostas finalizadas"""
-    history = load_bets_history()
-    finalized = [b for b in history if b.get('status') in ['ganhou', 'perdeu']]
-    
-    if not finalized:
-        return 0, 0, 0
-    
-    total_invested = sum(b.get('stake', 0) for b in finalized)
-    total_returned = sum(b.get('stake', 0) * b.get('odd', 0) for b in finalized if b.get('status') == 'ganhou')
-    profit = total_returned - total_invested
-    roi = (profit / total_invested * 100) if total_invested > 0 else 0
-    
-    wins = len([b for b in finalized if b.get('status') == 'ganhou'])
-    win_rate = (wins / len(finalized) * 100) if finalized else 0
-    
-    return roi, profit, win_rate
+    return get_ledger().calculate_roi()
+
+def resolve_closing_lines():
+    """Grava uma única vez a odd de fechamento das apostas cujo jogo já começou (0 = sem snapshot)"""
+    pending = get_ledger().pending_closing()
+    if pending:
+        closing_lines = get_odds_history().closing_line_value(pending)
+        get_ledger().set_closing_odds({bet['id']: closing_lines.get(bet['id'], (0.0, None))[0] for bet in pending})
 
 # ==================== INICIALIZAR ESTADO ====================
 
 if 'multiple_bets' not in st.session_state:
     st.session_state.multiple_bets = []
+if 'score_matrices' not in st.session_state:
+    st.session_state.score_matrices = {}
 if 'show_analysis' not in st.session_state:
     st.session_state.show_analysis = False
 if 'selected_home' not in st.session_state:
     st.session_state.selected_home = None
 if 'selected_away' not in st.session_state:
     st.session_state.selected_away = None
-if 'bets_history' not in st.session_state:
-    st.session_state.bets_history = []
 
 # ==================== CARREGAR DADOS ====================
 
+league_id = st.sidebar.selectbox("🏆 Liga", list(LEAGUES), format_func=LEAGUES.get, key='league_id')
+selected_season = st.sidebar.selectbox("📅 Temporada", SEASONS, key='season')
+h2h_all_seasons = st.sidebar.toggle("🔄 H2H com temporadas anteriores", key='h2h_all_seasons',
+                                    help="Usa todas as temporadas desta liga já gravadas no histórico local")
+use_dixon_coles = st.sidebar.toggle("📐 Modelo Dixon-Coles", key='dixon_coles',
+                                    help="Gols esperados por ratings de ataque/defesa ajustados à temporada")
+
 with st.spinner("🔄 Carregando dados..."):
-    events, error, season_used = get_season_results()
+    season_index, error, season_used = get_season_index(league_id, selected_season)
 
-if error or not events:
+if error or not season_index:
     st.error(f"❌ {error}")
     st.stop()
 
-teams = set()
-completed_games = 0
+team_list = season_index.team_list
+completed_games = season_index.completed_games
+goals_model = model_for_index(season_index) if use_dixon_coles else None
+pricing_scope = (league_id, season_used)
+get_pricing_cache().bind(pricing_scope, season_index)
+pricing_stats = get_pricing_cache().stats()
+st.sidebar.caption(f"⚡ Cache de preços: {pricing_stats['hits']} acertos, {pricing_stats['misses']} cálculos, "
+                   f"{pricing_stats['size']}/{pricing_stats['max_entries']} entradas")
 
-for event in events:
-    if event.get('intHomeScore') and event.get('intAwayScore'):
-        completed_games += 1
-    if event.get('strHomeTeam'):
-        teams.add(event['strHomeTeam'])
-    if event.get('strAwayTeam'):
-        teams.add(event['strAwayTeam'])
+def get_head_to_head(home_team, away_team):
+    """Confrontos diretos da temporada ou de todo o histórico da liga"""
+    def load():
+        if h2h_all_seasons:
+            return get_event_store().head_to_head(home_team, away_team, leagues=[league_id])
+        return season_index.head_to_head(home_team, away_team)
+    return get_pricing_cache().lookup(('h2h', home_team, away_team, h2h_all_seasons), load, pricing_scope)
 
-team_list = sorted(list(teams))
+def get_match_analysis(home_team, away_team, model_config):
+    """Análise completa do jogo (estatísticas, λ, mercados com H2H), em cache por temporada"""
+    return get_pricing_cache().lookup(
+        ('analysis', home_team, away_team, tuple(model_config), use_dixon_coles, h2h_all_seasons),
+        lambda: analyse_match(season_index, home_team, away_team, model_config, goals_model,
+                              get_head_to_head(home_team, away_team), get_pricing_cache(), pricing_scope),
+        pricing_scope
+    )
 
 # ==================== NAVEGAÇÃO ====================
 
-st.title('⚽ Sistema de Análise de Valor (EV+) - Brasileirão 2025')
+st.title(f'⚽ Sistema de Análise de Valor (EV+) - {LEAGUES[league_id]} {season_used}')
 
 tab1, tab2 = st.tabs(["📊 Análise & Apostas", "📈 Dashboard de Performance"])
 
@@ -323,6 +165,141 @@ with tab1:
     st.header("⚽ Análise de Jogo")
     st.caption(f"✅ {completed_games} jogos completos | {len(team_list)} times | Temporada {season_used}")
 
+    with st.expander("📅 Precificar Rodada Completa", expanded=False):
+        if st.toggle("Calcular todos os jogos pendentes", key='price_round'):
+            round_prices = price_round(season_index, config=get_model_config(), model=goals_model)
+            if len(round_prices['event_id']) > 0:
+                dataframe_round = pd.DataFrame({
+                    'Data': round_prices['date'],
+                    'Rodada': round_prices['round'],
+                    'Casa': round_prices['home_team'],
+                    'Fora': round_prices['away_team'],
+                    'Gols Casa': round_prices['expected_home_goals'].round(2),
+                    'Gols Fora': round_prices['expected_away_goals'].round(2),
+                    'Casa %': (round_prices['home_win'] * 100).round(1),
+                    'Empate %': (round_prices['draw'] * 100).round(1),
+                    'Fora %': (round_prices['away_win'] * 100).round(1),
+                    'Over 2.5 %': (round_prices['over_2.5'] * 100).round(1),
+                    'Under 2.5 %': (round_prices['under_2.5'] * 100).round(1),
+                    'BTTS Sim %': (round_prices['btts_yes'] * 100).round(1),
+                    'BTTS Não %': (round_prices['btts_no'] * 100).round(1)
+                })
+                st.caption(f"🗓️ {len(dataframe_round)} jogos pendentes precificados (clique no cabeçalho para ordenar)")
+                st.dataframe(dataframe_round, hide_index=True, use_container_width=True)
+            else:
+                st.info("Nenhum jogo pendente com histórico suficiente")
+
+    with st.expander("📥 Importar Odds em Lote", expanded=False):
+        st.caption("CSV ou JSON com uma linha por jogo x mercado x casa: event_id e/ou home_team/away_team, "
+                   "market (home_win, draw, away_win, over_2.5, under_2.5, btts_yes, btts_no), bookmaker, odd")
+        odds_file = st.file_uploader("Arquivo de odds", type=['csv', 'json'], key='odds_file')
+        if odds_file is not None:
+            odds_table, skipped_rows = read_odds_file(odds_file.getvalue(), odds_file.name)
+            pending_prices = price_round(season_index, config=get_model_config(), model=goals_model)
+            value_bets, unmatched_rows = scan_value_bets(odds_table, pending_prices, kelly_cap=get_model_config().kelly_cap)
+            recorded_snapshots = get_odds_history().record_table(odds_table, pending_prices)
+            st.caption(f"📄 {len(odds_table.odd)} odds lidas | {skipped_rows} linhas inválidas | "
+                       f"{unmatched_rows} sem jogo pendente correspondente | "
+                       f"{recorded_snapshots} movimentos de odd gravados")
+            if len(value_bets['ev']) > 0:
+                st.success(f"🎯 {len(value_bets['ev'])} apostas com EV+ encontradas")
+                st.dataframe(pd.DataFrame({
+                    'Data': value_bets['date'],
+                    'Jogo': [f"{home} vs {away}" for home, away in zip(value_bets['home_team'], value_bets['away_team'])],
+                    'Mercado': [market_label(market, home, away) for market, home, away in
+                                zip(value_bets['market'], value_bets['home_team'], value_bets['away_team'])],
+                    'Casa': value_bets['bookmaker'],
+                    'Odd': value_bets['odd'].round(2),
+                    'Prob %': (value_bets['probability'] * 100).round(1),
+                    'EV %': (value_bets['ev'] * 100).round(1),
+                    'Kelly %': (value_bets['kelly'] * 100).round(2),
+                    'Classificação': value_bets['classification']
+                }), hide_index=True, use_container_width=True)
+                if st.button("➕ Adicionar todas à lista", key='add_imported_bets'):
+                    for row in range(len(value_bets['ev'])):
+                        home, away, market = value_bets['home_team'][row], value_bets['away_team'][row], value_bets['market'][row]
+                        if f"{home} vs {away}" not in st.session_state.score_matrices:
+                            st.session_state.score_matrices[f"{home} vs {away}"] = get_pricing_cache().price(
+                                value_bets['expected_home_goals'][row], value_bets['expected_away_goals'][row],
+                                get_model_config(), goals_model, pricing_scope
+                            ).matrix
+                        st.session_state.multiple_bets.append({
+                            'jogo': f"{home} vs {away}",
+                            'mercado': market_label(market, home, away),
+                            'prob': float(value_bets['probability'][row]),
+                            'odd': float(value_bets['odd'][row]),
+                            'ev': float(value_bets['ev'][row]),
+                            'classification': value_bets['classification'][row],
+                            'key': MARKET_BET_KEYS[market],
+                            'stake': 0,
+                            'status': 'pendente'
+                        })
+                    st.success(f"✅ {len(value_bets['ev'])} apostas adicionadas")
+            else:
+                st.info("Nenhuma aposta com EV+ no arquivo")
+            
+            if len(set(odds_table.bookmaker)) > 1:
+                st.markdown("#### 📚 Melhor Preço e Margem das Casas")
+                devig_method = st.radio("Remoção da margem", ['shin', 'power', 'proportional'], horizontal=True,
+                                        key='devig_method',
+                                        format_func={'shin': 'Shin', 'power': 'Potência', 'proportional': 'Proporcional'}.get)
+                price_comparison = compare_prices(odds_table, pending_prices, consensus_method=devig_method)
+                dataframe_prices = pd.DataFrame({
+                    'Jogo': [f"{home} vs {away}" for home, away in
+                             zip(price_comparison['home_team'], price_comparison['away_team'])],
+                    'Mercado': [market_label(market, home, away) for market, home, away in
+                                zip(price_comparison['market'], price_comparison['home_team'], price_comparison['away_team'])],
+                    'Melhor Odd': price_comparison['best_odd'].round(2),
+                    'Casa': price_comparison['best_bookmaker'],
+                    'Casas': price_comparison['books'],
+                    'Margem Média %': (price_comparison['overround'] * 100).round(2),
+                    'Odd Justa': price_comparison['fair_odd'].round(2),
+                    'Consenso %': (price_comparison[f'fair_{devig_method}'] * 100).round(1),
+                    'Modelo %': (price_comparison['model_probability'] * 100).round(1),
+                    'EV Melhor Odd %': (price_comparison['ev'] * 100).round(1),
+                    '⚠️ Divergência': price_comparison['flag']
+                })
+                st.caption(f"⚠️ {int(price_comparison['flag'].sum())} mercados em que o modelo se afasta mais de "
+                           f"{DISAGREEMENT_THRESHOLD*100:.0f} p.p. do consenso das casas sem margem")
+                st.dataframe(dataframe_prices, hide_index=True, use_container_width=True)
+
+    with st.expander("🏆 Simulação da Temporada", expanded=False):
+        simulations = st.select_slider("Simulações", options=[1000, 10000, 50000, 100000], value=10000,
+                                       key='season_simulations')
+        if st.toggle("Simular jogos restantes", key='simulate_season'):
+            simulation = simulate_from_index(season_index, simulations, seed=42, config=get_model_config(),
+                                             model=goals_model)
+            dataframe_simulation = pd.DataFrame({
+                'Time': simulation.teams,
+                'Pontos Esperados': simulation.expected_points.round(1),
+                'Posição Média': simulation.expected_position.round(1),
+                'Campeão %': (simulation.zones['champion'] * 100).round(1),
+                'G4 %': (simulation.zones['top_4'] * 100).round(1),
+                'Z4 %': (simulation.zones['relegation'] * 100).round(1)
+            }).sort_values('Posição Média')
+            st.caption(f"🎲 {simulation.simulations:,} simulações dos {len(season_index.upcoming_rows)} jogos restantes")
+            st.dataframe(dataframe_simulation, hide_index=True, use_container_width=True)
+
+            st.write("**💰 Comparar com odds de longo prazo**")
+            column_team, column_market, column_odd = st.columns(3)
+            with column_team:
+                outright_team = st.selectbox("Time", simulation.teams, key='outright_team')
+            with column_market:
+                outright_market = st.selectbox("Mercado", ['champion', 'top_4', 'relegation'], key='outright_market',
+                                               format_func={'champion': 'Campeão', 'top_4': 'G4', 'relegation': 'Z4'}.get)
+            with column_odd:
+                odd_input_outright = st.text_input("Odd (ex: 450 = 4,50):", key='outright_odd', placeholder="Ex: 450")
+            if odd_input_outright and odd_input_outright.isdigit():
+                odd_outright = float(odd_input_outright) / 100
+                outright_probability = float(simulation.zones[outright_market][simulation.teams.index(outright_team)])
+                ev_outright = calculate_ev(outright_probability, odd_outright)
+                if ev_outright > 0:
+                    st.success(f"✅ EV: +{ev_outright*100:.1f}% (prob. {outright_probability*100:.1f}%, odd justa {1/outright_probability:.2f})")
+                elif outright_probability > 0:
+                    st.error(f"❌ EV: {ev_outright*100:.1f}% (prob. {outright_probability*100:.1f}%, odd justa {1/outright_probability:.2f})")
+                else:
+                    st.error("❌ Nenhuma simulação terminou nesse resultado")
+
     column_home, column_away = st.columns(2)
 
     with column_home:
@@ -344,15 +321,25 @@ with tab1:
             st.session_state.show_analysis = True
         
         if st.session_state.show_analysis:
-            home_statistics = process_team_stats(events, home_team, 'home', use_recent=True)
-            away_statistics = process_team_stats(events, away_team, 'away', use_recent=True)
+            model_config = get_model_config()
+            analysis = get_match_analysis(home_team, away_team, model_config)
             
-            if home_statistics and away_statistics:
-                expected_home_goals = (home_statistics['scored_average'] + away_statistics['conceded_average']) / 2
-                expected_away_goals = (away_statistics['scored_average'] + home_statistics['conceded_average']) / 2
+            if analysis is not None:
+                home_statistics, away_statistics = analysis.home_statistics, analysis.away_statistics
+                expected_home_goals, expected_away_goals = analysis.expected_home_goals, analysis.expected_away_goals
+                model_goals = analysis.model_goals
                 
                 st.success(f"**{home_team}** vs **{away_team}**")
-                st.caption("📊 Probabilidades ajustadas com últimos 5 jogos (peso 70%) + confrontos diretos (peso 15%)")
+                if model_goals:
+                    st.caption(
+                        f"📐 Dixon-Coles: ataque/defesa de {goals_model.matches} jogos, mando ×{goals_model.home_advantage:.2f}, "
+                        f"ρ={goals_model.rho:.3f} + confrontos diretos (peso {model_config.h2h_weight:.0%})"
+                    )
+                else:
+                    st.caption(
+                        f"📊 Probabilidades ajustadas com últimos {model_config.recent_games} jogos "
+                        f"(peso {model_config.recent_weight:.0%}) + confrontos diretos (peso {model_config.h2h_weight:.0%})"
+                    )
                 
                 column_home_metric, column_away_metric, column_total_metric = st.columns(3)
                 with column_home_metric:
@@ -368,7 +355,7 @@ with tab1:
                     
                     with col_h2h:
                         st.subheader("🔄 Confrontos Diretos")
-                        h2h = get_head_to_head(events, home_team, away_team)
+                        h2h = analysis.head_to_head
                         if h2h:
                             for match in h2h:
                                 winner = ""
@@ -396,18 +383,9 @@ with tab1:
                             result = "✅" if game['scored'] > game['conceded'] else "❌" if game['scored'] < game['conceded'] else "🤝"
                             st.write(f"{result} {game['scored']} x {game['conceded']} gols")
                 
-                probability_matrix = calculate_match_probabilities(expected_home_goals, expected_away_goals)
-                markets = calculate_markets(probability_matrix)
-                
-                # AJUSTAR PROBABILIDADES COM H2H
-                h2h_data = get_head_to_head(events, home_team, away_team)
-                markets['home_win'], markets['draw'], markets['away_win'] = adjust_probability_with_h2h(
-                    markets['home_win'], 
-                    markets['draw'], 
-                    markets['away_win'],
-                    h2h_data,
-                    home_team
-                )
+                probability_matrix = analysis.matrix
+                markets = analysis.markets
+                st.session_state.score_matrices[f"{home_team} vs {away_team}"] = probability_matrix
                 
                 st.divider()
                 st.subheader("💡 Insira as Odds")
@@ -737,6 +715,47 @@ with tab1:
                             if st.button("💾 Dashboard", key=f"save_{market['key']}_{home_team}_{away_team}"):
                                 save_bet_to_history(market.copy())
                                 st.success("✅ Salva!")
+                
+                with st.expander("📚 Catálogo de Mercados", expanded=False):
+                    catalogue = analysis.catalogue
+                    st.caption(f"Todos os mercados saem da mesma matriz de placares (0 a {probability_matrix.shape[-1] - 1}+ gols, "
+                               "sem o ajuste de confrontos diretos do 1X2). Linhas com devolução usam a probabilidade "
+                               "sem a devolução, então a odd justa é 1/p")
+                    catalogue_group = st.selectbox("Tipo de mercado", list(CATALOGUE_GROUPS), key='catalogue_group')
+                    group_keys = CATALOGUE_GROUPS[catalogue_group]
+                    st.dataframe(pd.DataFrame({
+                        'Mercado': [catalogue_label(key, home_team, away_team) for key in group_keys],
+                        'Prob %': [round(catalogue[key] * 100, 2) for key in group_keys],
+                        'Odd Justa': [round(1 / catalogue[key], 2) if catalogue[key] > 0 else None for key in group_keys]
+                    }), hide_index=True, use_container_width=True)
+                    
+                    column_catalogue_market, column_catalogue_odd = st.columns(2)
+                    with column_catalogue_market:
+                        catalogue_key = st.selectbox("Mercado", group_keys, key='catalogue_market',
+                                                     format_func=lambda key: catalogue_label(key, home_team, away_team))
+                    with column_catalogue_odd:
+                        catalogue_odd_input = st.text_input("Odd (ex: 225 = 2,25):", value="", placeholder="Ex: 225",
+                                                            key=f"catalogue_odd_{home_team}_{away_team}")
+                    if catalogue_odd_input and catalogue_odd_input.isdigit() and float(catalogue_odd_input) / 100 >= 1.01:
+                        catalogue_odd = float(catalogue_odd_input) / 100
+                        catalogue_probability = catalogue[catalogue_key]
+                        catalogue_ev = calculate_ev(catalogue_probability, catalogue_odd)
+                        st.metric("EV", f"{catalogue_ev*100:+.1f}%", delta="✅" if catalogue_ev > 0 else "❌")
+                        if has_push(catalogue_key):
+                            st.caption("Mercado com devolução: fica fora das múltiplas e da carteira")
+                        elif catalogue_ev > 0 and st.button("➕ Lista", key=f"add_catalogue_{home_team}_{away_team}"):
+                            st.session_state.multiple_bets.append({
+                                'jogo': f"{home_team} vs {away_team}",
+                                'mercado': catalogue_label(catalogue_key, home_team, away_team),
+                                'prob': catalogue_probability,
+                                'odd': catalogue_odd,
+                                'ev': catalogue_ev,
+                                'classification': classify_bet(catalogue_probability, catalogue_odd, catalogue_ev),
+                                'key': catalogue_key,
+                                'stake': 0,
+                                'status': 'pendente'
+                            })
+                            st.success("✅")
 
     # ==================== GESTÃO DE BANCA ====================
 
@@ -775,26 +794,28 @@ with tab1:
             
             st.markdown("### 🎯 Recomendação de Investimento")
             
+            positions = staking_plan(
+                st.session_state.multiple_bets, total_bankroll, risk_profile,
+                get_model_config().kelly_cap, st.session_state.score_matrices
+            )
+            selected_bets = st.session_state.multiple_bets
+            
             if recommendations['simple_high'] or recommendations['simple_low']:
                 st.markdown("#### ⭐ Apostas Simples")
                 simple_budget = recommendations['budgets']['simple_total']
-                all_simple = recommendations['simple_high'] + recommendations['simple_low']
+                st.write(f"**Orçamento: R$ {simple_budget:.2f}**")
                 
-                if all_simple:
-                    st.write(f"**Orçamento: R$ {simple_budget:.2f}**")
-                    
-                    for bet in all_simple:
-                        kelly = calculate_kelly_criterion(bet['prob'], bet['odd'])
-                        total_kelly = sum(calculate_kelly_criterion(b['prob'], b['odd']) for b in all_simple)
-                        stake = simple_budget * (kelly / total_kelly) if total_kelly > 0 else simple_budget / len(all_simple)
-                        
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        with col1:
-                            st.write(f"**{bet['mercado']}** ({bet['jogo']})")
-                        with col2:
-                            st.write(f"Odd: {bet['odd']:.2f}")
-                        with col3:
-                            st.write(f"**R$ {stake:.2f}**")
+                for position in positions:
+                    if position.group != 'simple':
+                        continue
+                    bet = selected_bets[position.legs[0]]
+                    col1, col2, col3 = st.columns([3, 1, 1])
+                    with col1:
+                        st.write(f"**{bet['mercado']}** ({bet['jogo']})")
+                    with col2:
+                        st.write(f"Odd: {bet['odd']:.2f}")
+                    with col3:
+                        st.write(f"**R$ {position.stake:.2f}**")
             
             if recommendations['multiple']:
                 st.markdown("#### 🔗 Apostas para Múltipla")
@@ -810,16 +831,28 @@ with tab1:
                     with col2:
                         st.write(f"Prob: {bet['prob']*100:.1f}%")
                 
-                if len(recommendations['multiple']) >= 2:
-                    example_multiple = recommendations['multiple'][:min(4, len(recommendations['multiple']))]
-                    odd_multiple = 1
-                    prob_multiple = 1
-                    for bet in example_multiple:
-                        odd_multiple *= bet['odd']
-                        prob_multiple *= bet['prob']
-                    
-                    st.write(f"**Exemplo:** {len(example_multiple)} apostas → Odd {odd_multiple:.2f} → Investir R$ {multiple_budget:.2f}")
-                    st.write(f"Retorno potencial: R$ {multiple_budget * odd_multiple:.2f}")
+            if len(selected_bets) >= 2:
+                st.markdown("#### 🧮 Melhores Múltiplas")
+                parlay_positions = [position for position in positions if position.group == 'multiple']
+                if parlay_positions:
+                    st.caption("💡 Probabilidade conjunta real (pernas do mesmo jogo pela matriz de placares), "
+                               "ordenadas por EV por unidade de risco")
+                    for position in parlay_positions:
+                        legs_description = " + ".join(
+                            f"{selected_bets[leg]['mercado']} ({selected_bets[leg]['jogo']})" for leg in position.legs
+                        )
+                        same_game = len({selected_bets[leg]['jogo'] for leg in position.legs}) < len(position.legs)
+                        col1, col2, col3 = st.columns([3, 1, 1])
+                        with col1:
+                            same_game_flag = " 🔗 mesmo jogo" if same_game else ""
+                            st.write(f"**{len(position.legs)} pernas**{same_game_flag}: {legs_description}")
+                        with col2:
+                            parlay_ev = position.probability * position.odd - 1
+                            st.write(f"Odd {position.odd:.2f} | Prob {position.probability*100:.1f}% | EV +{parlay_ev*100:.1f}%")
+                        with col3:
+                            st.write(f"**R$ {position.stake:.2f}**")
+                else:
+                    st.caption("Nenhuma combinação das apostas selecionadas tem EV+")
             
             if recommendations['high_risk']:
                 st.markdown("#### 🎲 Apostas High-Risk (Tiro Alto)")
@@ -828,16 +861,43 @@ with tab1:
                 st.write(f"**Orçamento: R$ {high_risk_budget:.2f}**")
                 st.caption("⚠️ Alto retorno, mas risco elevado")
                 
-                for bet in recommendations['high_risk']:
-                    stake = high_risk_budget / len(recommendations['high_risk'])
-                    
+                for position in positions:
+                    if position.group != 'high_risk':
+                        continue
+                    bet = selected_bets[position.legs[0]]
                     col1, col2, col3 = st.columns([3, 1, 1])
                     with col1:
                         st.write(f"**{bet['mercado']}** ({bet['jogo']})")
                     with col2:
                         st.write(f"Odd: {bet['odd']:.2f}")
                     with col3:
-                        st.write(f"**R$ {stake:.2f}**")
+                        st.write(f"**R$ {position.stake:.2f}**")
+            
+            st.divider()
+            
+            st.markdown("### 🎢 Risco do Plano (Monte Carlo)")
+            risk_rounds = st.select_slider("Rodadas repetindo o plano", options=[5, 10, 20, 50], value=20, key='risk_rounds')
+            profile_results = profile_risk(
+                selected_bets, total_bankroll, get_model_config().kelly_cap, st.session_state.score_matrices,
+                rounds=risk_rounds
+            )
+            profile_labels = {"conservative": "🛡️ Conservador", "balanced": "⚖️ Balanceado", "aggressive": "🔥 Agressivo"}
+            dataframe_risk = pd.DataFrame([
+                {
+                    'Perfil': profile_labels[profile] + (" ◀" if profile == risk_profile else ""),
+                    'Ruína %': round(result['risk_of_ruin'] * 100, 2),
+                    'Drawdown Mediano %': round(result['drawdown_percentiles'][50] * 100, 1),
+                    'Drawdown P95 %': round(result['drawdown_percentiles'][95] * 100, 1),
+                    'Drawdown P99 %': round(result['drawdown_percentiles'][99] * 100, 1),
+                    'Crescimento/Rodada %': round(result['expected_log_growth'] * 100, 2),
+                    'Banca Mediana Final (R$)': round(result['median_final'] * total_bankroll, 2),
+                    'Chance de Lucro %': round(result['probability_of_profit'] * 100, 1)
+                }
+                for profile, result in profile_results.items()
+            ])
+            st.caption(f"🎲 {PATHS:,} caminhos de {risk_rounds} rodadas reinvestindo as mesmas frações da banca; "
+                       f"ruína = banca abaixo de {RUIN_LEVEL:.0%} da inicial")
+            st.dataframe(dataframe_risk, hide_index=True, use_container_width=True)
             
             st.divider()
             
@@ -854,6 +914,33 @@ with tab1:
                 st.metric("High-Risk", f"R$ {recommendations['budgets']['high_risk_total']:.2f}")
             with col4:
                 st.metric("Total Investido", f"R$ {total_recommended:.2f}")
+            
+            st.divider()
+            
+            st.markdown("### 🧮 Carteira Kelly Simultânea")
+            st.caption("Frações calculadas em conjunto maximizando o crescimento da banca: "
+                       "apostas do mesmo jogo são tratadas como resultados correlacionados/excludentes")
+            max_exposure = st.slider("Exposição máxima da banca (%)", 5, 100, 25, step=5, key='portfolio_exposure') / 100
+            portfolio = optimize_portfolio(
+                st.session_state.multiple_bets, st.session_state.score_matrices,
+                max_exposure=max_exposure, max_fraction=get_model_config().kelly_cap
+            )
+            dataframe_portfolio = pd.DataFrame({
+                'Jogo': [bet['jogo'] for bet in st.session_state.multiple_bets],
+                'Mercado': [bet['mercado'] for bet in st.session_state.multiple_bets],
+                'Odd': [round(bet['odd'], 2) for bet in st.session_state.multiple_bets],
+                'Kelly Isolado %': (portfolio['independent_kelly'] * 100).round(2),
+                'Kelly Carteira %': (portfolio['fractions'] * 100).round(2),
+                'Stake (R$)': (portfolio['fractions'] * total_bankroll).round(2)
+            })
+            st.dataframe(dataframe_portfolio, hide_index=True, use_container_width=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Exposição Total", f"R$ {portfolio['exposure'] * total_bankroll:.2f}",
+                          delta=f"{portfolio['exposure']*100:.1f}% da banca", delta_color="off")
+            with col2:
+                st.metric("Crescimento Esperado", f"{portfolio['expected_growth']*100:.2f}% (log)")
         
         else:
             st.info("💡 Insira sua banca total para receber recomendações personalizadas")
@@ -907,8 +994,10 @@ with tab2:
     st.header("📈 Dashboard de Performance")
     
     roi, profit, win_rate = calculate_roi()
+    resolve_closing_lines()
+    average_clv, clv_count = get_ledger().average_clv()
     
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
         st.metric("ROI", f"{roi:.1f}%", delta="Positivo" if roi > 0 else "Negativo")
     with col2:
@@ -916,7 +1005,12 @@ with tab2:
     with col3:
         st.metric("Taxa de Acerto", f"{win_rate:.1f}%")
     with col4:
-        st.metric("Total de Apostas", len(st.session_state.bets_history))
+        st.metric("Total de Apostas", get_ledger().count())
+    with col5:
+        if clv_count:
+            st.metric("CLV Médio", f"{average_clv*100:+.1f}%", help=f"{clv_count} apostas com odd de fechamento")
+        else:
+            st.metric("CLV Médio", "-", help="Importe odds antes dos jogos para medir o fechamento")
     
     st.divider()
     
@@ -952,17 +1046,52 @@ with tab2:
     
     st.subheader("📋 Histórico de Apostas")
     
-    if st.session_state.bets_history:
-        df_history = pd.DataFrame(st.session_state.bets_history)
+    ledger = get_ledger()
+    
+    if ledger.count() > 0:
+        column_filter_status, column_filter_market, column_filter_dates, column_page_size = st.columns([2, 2, 2, 1])
+        with column_filter_status:
+            filter_statuses = st.multiselect("Status", ["pendente", "ganhou", "perdeu"], key='history_status')
+        with column_filter_market:
+            filter_market = st.text_input("Mercado contém", key='history_market')
+        with column_filter_dates:
+            filter_dates = st.date_input("Período", value=(), key='history_dates')
+        with column_page_size:
+            page_size = st.selectbox("Por página", [10, 25, 50, 100], index=1, key='history_page_size')
+        
+        history_filters = {
+            'statuses': filter_statuses,
+            'market': filter_market.strip(),
+            'date_from': filter_dates[0] if len(filter_dates) > 0 else None,
+            'date_to': filter_dates[1] if len(filter_dates) > 1 else (filter_dates[0] if len(filter_dates) > 0 else None)
+        }
+        total_filtered = ledger.count_bets(**history_filters)
+        total_pages = max(1, -(-total_filtered // page_size))
         
-        for index, bet in enumerate(st.session_state.bets_history):
+        page = st.number_input("Página", min_value=1, max_value=total_pages, value=1, step=1, key='history_page')
+        page = min(page, total_pages)
+        page_bets = ledger.query_bets(**history_filters, limit=page_size, offset=(page - 1) * page_size)
+        
+        if page_bets:
+            first_shown = (page - 1) * page_size + 1
+            st.caption(f"Mostrando {first_shown}-{first_shown + len(page_bets) - 1} de {total_filtered} apostas | Página {page}/{total_pages}")
+        else:
+            st.info("Nenhuma aposta encontrada com esses filtros")
+        if any(history_filters.values()):
+            filtered_roi, filtered_profit, filtered_win_rate = ledger.calculate_roi(**history_filters)
+            st.caption(f"Filtro: ROI {filtered_roi:.1f}% | Lucro R$ {filtered_profit:.2f} | Acerto {filtered_win_rate:.1f}%")
+        
+        for bet in page_bets:
             with st.expander(f"{bet['timestamp']} | {bet['jogo']} - {bet['mercado']}"):
                 col1, col2, col3, col4, col5, col6 = st.columns([2, 1, 1, 1, 1, 1])
                 with col1:
                     st.write(f"**Jogo:** {bet['jogo']}")
                     st.write(f"**Mercado:** {bet['mercado']}")
+                    st.checkbox("Selecionar", key=f"select_bet_{bet['id']}")
                 with col2:
                     st.write(f"**Odd:** {bet['odd']:.2f}")
+                    if bet['closing_odd']:
+                        st.write(f"**Fechamento:** {bet['closing_odd']:.2f} (CLV {(bet['odd'] / bet['closing_odd'] - 1)*100:+.1f}%)")
                 with col3:
                     st.write(f"**Stake:** R$ {bet['stake']:.2f}")
                 with col4:
@@ -971,18 +1100,35 @@ with tab2:
                 with col5:
                     new_status = st.selectbox("Mudar para:", ["pendente", "ganhou", "perdeu"], 
                                              index=["pendente", "ganhou", "perdeu"].index(bet['status']),
-                                             key=f"status_change_{bet.get('id', index)}")
-                    if st.button("✅ Atualizar", key=f"update_{bet.get('id', index)}"):
-                        update_bet_status(bet.get('id', index), new_status)
+                                             key=f"status_change_{bet['id']}")
+                    if st.button("✅ Atualizar", key=f"update_{bet['id']}"):
+                        update_bet_status(bet['id'], new_status)
                         st.success("Status atualizado!")
                         st.rerun()
                 with col6:
-                    if st.button("🗑️", key=f"delete_history_{index}"):
-                        st.session_state.bets_history.pop(index)
+                    if st.button("🗑️", key=f"delete_history_{bet['id']}"):
+                        ledger.delete_bet(bet['id'])
                         st.rerun()
         
+        if page_bets:
+            st.markdown("#### ✏️ Atualização em Massa")
+            selected_ids = [bet['id'] for bet in page_bets if st.session_state.get(f"select_bet_{bet['id']}")]
+            column_bulk_status, column_bulk_selected, column_bulk_filtered = st.columns([2, 1, 1])
+            with column_bulk_status:
+                bulk_status = st.selectbox("Novo status:", ["pendente", "ganhou", "perdeu"], key='bulk_status')
+            with column_bulk_selected:
+                if st.button(f"✅ Selecionadas ({len(selected_ids)})", disabled=not selected_ids, use_container_width=True):
+                    ledger.bulk_update_status(selected_ids, bulk_status)
+                    for bet_id in selected_ids:
+                        del st.session_state[f"select_bet_{bet_id}"]
+                    st.rerun()
+            with column_bulk_filtered:
+                if st.button(f"✅ Todas filtradas ({total_filtered})", use_container_width=True):
+                    ledger.update_status_where(bulk_status, **history_filters)
+                    st.rerun()
+        
         if st.button("🗑️ Limpar Histórico Completo", type="secondary"):
-            st.session_state.bets_history = []
+            ledger.clear()
             st.rerun()
     else:
         st.info("Nenhuma aposta registrada ainda. Comece registrando suas apostas acima!")
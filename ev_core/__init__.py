@@ -0,0 +1,42 @@
+"""
+Núcleo de cálculo do Sistema EV+ (sem dependência de interface).
+
+Os nomes públicos abaixo são carregados sob demanda (PEP 562): importar
+o pacote não importa numpy, pandas, streamlit nem requests, e
+``from ev_core import calculate_ev`` só carrega o módulo que define a
+função. Nada aqui acessa rede ou disco no import.
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    'analyse_match': 'analysis', 'analyse_matches': 'analysis', 'evaluate_odds': 'analysis', 'analysis_summary': 'analysis',
+    'MatchAnalysis': 'analysis',
+    'calculate_ev': 'betting', 'calculate_kelly_criterion': 'betting', 'classify_bet': 'betting',
+    'calculate_bankroll_distribution': 'betting',
+    'ModelConfig': 'config', 'DEFAULT_CONFIG': 'config', 'load_model_config': 'config',
+    'model_for_index': 'dixon_coles', 'fit_season_index': 'dixon_coles',
+    'market_catalogue': 'market_catalogue',
+    'expected_goals': 'model', 'adjust_probability_with_h2h': 'model',
+    'PricingService': 'pricing_api',
+    'PricingCache': 'pricing_cache',
+    'price_round': 'round_pricing',
+    'poisson_probability': 'score_matrix', 'calculate_match_probabilities': 'score_matrix',
+    'calculate_markets': 'score_matrix', 'price_fixtures': 'score_matrix',
+    'SeasonCache': 'season_cache',
+    'SeasonIndex': 'season_index', 'process_team_stats': 'season_index', 'get_head_to_head': 'season_index',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'ev_core' has no attribute '{name}'")
+    value = getattr(import_module(f'ev_core.{module_name}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,165 @@
+"""
+Análise de um jogo sem interface (o fluxo do botão "ANALISAR JOGO")
+
+Estatísticas de casa/fora com peso dos jogos recentes, gols esperados
+(médias ou Dixon-Coles), matriz de placares, mercados e ajuste do 1X2
+pelos confrontos diretos, na mesma ordem e com os mesmos parâmetros da
+interface. Usado pelo app, pela CLI e pela API, então os três dão o
+mesmo preço para o mesmo jogo.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from ev_core.betting import calculate_ev, calculate_kelly_criterion, classify_bet
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.market_catalogue import catalogue_label, market_catalogue
+from ev_core.model import MIN_H2H_GAMES, adjust_probability_with_h2h, blend_with_h2h, count_h2h_results, expected_goals
+from ev_core.odds_import import MARKET_BET_KEYS, ODDS_MARKETS, market_label, normalize_market
+from ev_core.pricing_cache import PricingCache
+from ev_core.score_matrix import calculate_markets, calculate_match_probabilities
+
+MatchAnalysis = namedtuple('MatchAnalysis', [
+    'home_team', 'away_team', 'home_statistics', 'away_statistics', 'expected_home_goals', 'expected_away_goals',
+    'model_goals', 'matrix', 'markets', 'head_to_head', 'catalogue'
+])
+
+
+def _match_goals(season_index, home_team, away_team, config, model):
+    """(estatísticas casa, estatísticas fora, λ casa, λ fora, modelo usado) ou None"""
+    home_statistics = season_index.team_stats(home_team, 'home', True, config.recent_games, config.recent_weight)
+    away_statistics = season_index.team_stats(away_team, 'away', True, config.recent_games, config.recent_weight)
+    if not (home_statistics and away_statistics):
+        return None
+    model_goals = model.expected_goals(home_team, away_team) if model is not None else None
+    expected_home_goals, expected_away_goals = model_goals or expected_goals(home_statistics, away_statistics)
+    return home_statistics, away_statistics, expected_home_goals, expected_away_goals, model if model_goals else None
+
+
+def analyse_match(season_index, home_team, away_team, config=DEFAULT_CONFIG, model=None, head_to_head=None,
+                  pricing_cache=None, scope=None):
+    """
+    Analisa home_team x away_team; None se algum time não tem jogos no mando
+    model: DixonColesModel (λ e matriz com τ quando conhece os dois times)
+    head_to_head: confrontos já carregados (padrão: os da temporada)
+    pricing_cache: PricingCache para reaproveitar matriz, mercados e catálogo
+    """
+    goals = _match_goals(season_index, home_team, away_team, config, model)
+    if goals is None:
+        return None
+    home_statistics, away_statistics, expected_home_goals, expected_away_goals, goals_model = goals
+
+    if pricing_cache is not None:
+        pricing = pricing_cache.price(expected_home_goals, expected_away_goals, config, goals_model, scope)
+        matrix, markets, catalogue = pricing.matrix, dict(pricing.markets), pricing.catalogue
+    else:
+        if goals_model is not None:
+            matrix = goals_model.score_matrix(expected_home_goals, expected_away_goals, max_goals=None)
+        else:
+            matrix = calculate_match_probabilities(expected_home_goals, expected_away_goals, max_goals=None,
+                                                   lambda_floor=config.lambda_floor)
+        markets, catalogue = calculate_markets(matrix), None
+
+    if head_to_head is None:
+        head_to_head = season_index.head_to_head(home_team, away_team)
+    markets['home_win'], markets['draw'], markets['away_win'] = adjust_probability_with_h2h(
+        markets['home_win'], markets['draw'], markets['away_win'], head_to_head, home_team,
+        h2h_weight=config.h2h_weight
+    )
+
+    return MatchAnalysis(
+        home_team, away_team, home_statistics, away_statistics, float(expected_home_goals),
+        float(expected_away_goals), goals_model is not None, matrix, markets, head_to_head, catalogue
+    )
+
+
+def analyse_matches(season_index, pairs, config, model=None, pricing_cache=None, scope=None):
+    """
+    Versão em lote de analyse_match para [(casa, fora)]: matrizes,
+    mercados e catálogo dos jogos fora do cache saem de uma única chamada
+    vetorizada por modelo, e o ajuste de H2H é aplicado ao lote inteiro
+    Retorna uma MatchAnalysis (ou None) por par, na mesma ordem
+    """
+    pricing_cache = pricing_cache if pricing_cache is not None else PricingCache()
+    goals = [_match_goals(season_index, home_team, away_team, config, model) for home_team, away_team in pairs]
+    analyses = [None] * len(pairs)
+    for goals_model in {id(item[4]): item[4] for item in goals if item is not None}.values():
+        positions = [position for position, item in enumerate(goals) if item is not None and item[4] is goals_model]
+        prices = pricing_cache.price_many(
+            [goals[position][2] for position in positions], [goals[position][3] for position in positions],
+            config, goals_model, scope
+        )
+        head_to_heads = [season_index.head_to_head(*pairs[position]) for position in positions]
+        counts = np.array([count_h2h_results(head_to_head, pairs[position][0]) if len(head_to_head) >= MIN_H2H_GAMES
+                           else (0, 0, 0) for position, head_to_head in zip(positions, head_to_heads)], dtype=float)
+        adjusted = blend_with_h2h(
+            [price.markets['home_win'] for price in prices], [price.markets['draw'] for price in prices],
+            [price.markets['away_win'] for price in prices], counts[:, 0], counts[:, 1], counts[:, 2],
+            h2h_weight=config.h2h_weight
+        )
+        for column, (position, price, head_to_head) in enumerate(zip(positions, prices, head_to_heads)):
+            home_statistics, away_statistics, expected_home_goals, expected_away_goals, _ = goals[position]
+            markets = dict(price.markets)
+            markets['home_win'], markets['draw'], markets['away_win'] = (float(values[column]) for values in adjusted)
+            analyses[position] = MatchAnalysis(
+                pairs[position][0], pairs[position][1], home_statistics, away_statistics, float(expected_home_goals),
+                float(expected_away_goals), goals_model is not None, price.matrix, markets, head_to_head,
+                price.catalogue
+            )
+    return analyses
+
+
+def evaluate_odds(analysis, odds, kelly_cap=None, only_value=True):
+    """
+    EV, Kelly e classificação de {mercado: odd} para um jogo analisado
+    Aceita chaves do modelo, chaves curtas do app e chaves do catálogo;
+    1X2 usa as probabilidades já ajustadas pelo H2H
+    Retorna apostas no formato do histórico (+ 'kelly'), maior EV primeiro
+    """
+    kelly_cap = DEFAULT_CONFIG.kelly_cap if kelly_cap is None else kelly_cap
+    catalogue = analysis.catalogue
+    bets = []
+    for market, odd in odds.items():
+        odd = float(odd)
+        key = normalize_market(market)
+        if key is not None:
+            probability = analysis.markets[key]
+            label, bet_key = market_label(key, analysis.home_team, analysis.away_team), MARKET_BET_KEYS[key]
+        else:
+            if catalogue is None:
+                catalogue = market_catalogue(analysis.matrix)
+            if market not in catalogue:
+                raise ValueError(f"Mercado desconhecido: {market}")
+            probability = catalogue[market]
+            label, bet_key = catalogue_label(market, analysis.home_team, analysis.away_team), market
+        if odd < 1.01:
+            continue
+        ev = calculate_ev(probability, odd)
+        if only_value and ev <= 0:
+            continue
+        bets.append({
+            'jogo': f"{analysis.home_team} vs {analysis.away_team}",
+            'mercado': label,
+            'prob': float(probability),
+            'odd': odd,
+            'ev': float(ev),
+            'kelly': float(calculate_kelly_criterion(probability, odd, kelly_cap)),
+            'classification': classify_bet(probability, odd, ev),
+            'key': bet_key,
+            'stake': 0,
+            'status': 'pendente'
+        })
+    bets.sort(key=lambda bet: -bet['ev'])
+    return bets
+
+
+def analysis_summary(analysis):
+    """Dicionário serializável (JSON) com gols esperados e mercados do jogo"""
+    return {
+        'home_team': analysis.home_team,
+        'away_team': analysis.away_team,
+        'expected_home_goals': round(analysis.expected_home_goals, 4),
+        'expected_away_goals': round(analysis.expected_away_goals, 4),
+        'model': 'dixon_coles' if analysis.model_goals else 'poisson',
+        'markets': {market: round(float(analysis.markets[market]), 6) for market in ODDS_MARKETS},
+    }
@@ -0,0 +1,295 @@
+"""
+Backtest walk-forward sobre jogos finalizados
+
+Cada jogo é precificado só com os jogos anteriores da mesma temporada,
+exatamente como a análise do app faria naquele dia. As janelas de
+"jogos anteriores" saem de somas acumuladas por grupo (time/mando e
+confronto), então a temporada inteira é processada em O(n log n) com
+NumPy em vez de reescanear os eventos a cada jogo.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from ev_core.betting import CLASSIFICATIONS, KELLY_CAP, calculate_ev_array, calculate_kelly_array, classify_bet_array
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.model import blend_with_h2h
+from ev_core.score_matrix import price_fixtures
+from ev_core.season_index import parse_score
+
+MARKETS = ('home_win', 'draw', 'away_win', 'over_2.5', 'under_2.5', 'btts_yes', 'btts_no')
+H2H_GAMES = 5
+PROBABILITY_FLOOR = 1e-15
+
+MatchData = namedtuple('MatchData', [
+    'event_ids', 'dates', 'segments', 'home', 'away', 'home_goals', 'away_goals', 'teams'
+])
+
+
+def _build_match_data(event_ids, dates, segment_labels, home_names, away_names, home_goals, away_goals):
+    teams = sorted(set(home_names) | set(away_names))
+    team_ids = {team: position for position, team in enumerate(teams)}
+    _, segments = np.unique(np.asarray(segment_labels, dtype=str), return_inverse=True)
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    order = np.argsort(dates, kind='stable')
+    return MatchData(
+        np.asarray(event_ids, dtype=object)[order],
+        dates[order],
+        segments.astype(np.int32)[order],
+        np.array([team_ids[team] for team in home_names], dtype=np.int32)[order],
+        np.array([team_ids[team] for team in away_names], dtype=np.int32)[order],
+        np.asarray(home_goals, dtype=np.int16)[order],
+        np.asarray(away_goals, dtype=np.int16)[order],
+        teams
+    )
+
+
+def prepare_matches(events):
+    """
+    Jogos finalizados do payload da API em ordem cronológica
+    Aceita várias temporadas juntas; strSeason separa as janelas
+    """
+    rows = []
+    for event in events:
+        home_goals = parse_score(event.get('intHomeScore'))
+        away_goals = parse_score(event.get('intAwayScore'))
+        if home_goals is None or away_goals is None:
+            continue
+        if not event.get('strHomeTeam') or not event.get('strAwayTeam') or not event.get('dateEvent'):
+            continue
+        rows.append((
+            event.get('idEvent') or '', event['dateEvent'], event.get('strSeason') or '',
+            event['strHomeTeam'], event['strAwayTeam'], home_goals, away_goals
+        ))
+    if not rows:
+        return _build_match_data([], [], [], [], [], [], [])
+    return _build_match_data(*zip(*rows))
+
+
+def prepare_from_store(store, leagues=None, seasons=None):
+    """Mesmo formato de prepare_matches a partir do EventStore colunar"""
+    games = store.query(leagues, seasons, played=True)
+    segments = np.char.add(np.char.add(games['league_id'].astype(str), '/'), games['season'].astype(str))
+    return _build_match_data(
+        games['event_id'], games['date'], segments, list(games['home_team']), list(games['away_team']),
+        games['home_score'], games['away_score']
+    )
+
+
+def _prior_window_sums(group_keys, values, window):
+    """
+    Para cada jogo (já em ordem cronológica): quantos jogos anteriores do
+    mesmo grupo existem, a soma de cada coluna de values sobre todos eles
+    e sobre os últimos `window`
+    """
+    size = len(group_keys)
+    order = np.lexsort((np.arange(size), group_keys))
+    sorted_keys = group_keys[order]
+    positions = np.arange(size)
+    is_start = np.ones(size, dtype=bool)
+    is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(is_start, positions, 0))
+    window_start = np.maximum(positions - window, group_start)
+
+    count = np.empty(size, dtype=np.int64)
+    count[order] = positions - group_start
+    totals = []
+    recents = []
+    for column in values:
+        cumulative = np.concatenate(([0.0], np.cumsum(column[order], dtype=float)))
+        total = np.empty(size)
+        recent = np.empty(size)
+        total[order] = cumulative[positions] - cumulative[group_start]
+        recent[order] = cumulative[positions] - cumulative[window_start]
+        totals.append(total)
+        recents.append(recent)
+    return count, totals, recents
+
+
+def _weighted_average(count, total, recent, recent_games, recent_weight):
+    """Mesma ponderação de summarize_games, vetorizada"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plain = total / count
+        recent_average = recent / recent_games
+        older_average = (total - recent) / (count - recent_games)
+        weighted = np.where(
+            count > recent_games,
+            recent_average * recent_weight + older_average * (1 - recent_weight),
+            recent_average
+        )
+    return np.where(count >= recent_games, weighted, plain)
+
+
+def walk_forward_probabilities(matches, config=DEFAULT_CONFIG, h2h_games=H2H_GAMES):
+    """
+    Probabilidades pré-jogo de cada partida usando só jogos anteriores
+    Retorna (máscara de jogos precificáveis, λ casa, λ fora, dict de mercados)
+    """
+    recent_games = config.recent_games
+    recent_weight = config.recent_weight
+    team_count = max(len(matches.teams), 1)
+    segments = matches.segments.astype(np.int64)
+    home = matches.home.astype(np.int64)
+    away = matches.away.astype(np.int64)
+    home_goals = matches.home_goals.astype(float)
+    away_goals = matches.away_goals.astype(float)
+
+    home_count, (home_scored, home_conceded), (home_scored_recent, home_conceded_recent) = _prior_window_sums(
+        segments * team_count + home, (home_goals, away_goals), recent_games
+    )
+    away_count, (away_scored, away_conceded), (away_scored_recent, away_conceded_recent) = _prior_window_sums(
+        segments * team_count + away, (away_goals, home_goals), recent_games
+    )
+    valid = (home_count > 0) & (away_count > 0)
+
+    home_scored_average = _weighted_average(home_count, home_scored, home_scored_recent, recent_games, recent_weight)
+    home_conceded_average = _weighted_average(home_count, home_conceded, home_conceded_recent, recent_games, recent_weight)
+    away_scored_average = _weighted_average(away_count, away_scored, away_scored_recent, recent_games, recent_weight)
+    away_conceded_average = _weighted_average(away_count, away_conceded, away_conceded_recent, recent_games, recent_weight)
+
+    expected_home_goals = np.where(valid, (home_scored_average + away_conceded_average) / 2, 1.0)
+    expected_away_goals = np.where(valid, (away_scored_average + home_conceded_average) / 2, 1.0)
+    markets = price_fixtures(expected_home_goals, expected_away_goals, lambda_floor=config.lambda_floor)
+
+    low_team = np.minimum(home, away)
+    high_team = np.maximum(home, away)
+    winner_is_low = np.where(home_goals > away_goals, home == low_team, away == low_team)
+    decided = home_goals != away_goals
+    _, _, (low_wins, draws, high_wins) = _prior_window_sums(
+        (segments * team_count + low_team) * team_count + high_team,
+        (decided & winner_is_low, ~decided, decided & ~winner_is_low),
+        h2h_games
+    )
+    home_is_low = home == low_team
+    h2h_home_wins = np.where(home_is_low, low_wins, high_wins)
+    h2h_away_wins = np.where(home_is_low, high_wins, low_wins)
+    markets['home_win'], markets['draw'], markets['away_win'] = blend_with_h2h(
+        markets['home_win'], markets['draw'], markets['away_win'],
+        h2h_home_wins, draws, h2h_away_wins, h2h_weight=config.h2h_weight
+    )
+    return valid, expected_home_goals, expected_away_goals, markets
+
+
+def market_outcomes(matches):
+    """Matriz booleana (jogos x MARKETS) com o resultado de cada mercado"""
+    home_goals = matches.home_goals.astype(np.int64)
+    away_goals = matches.away_goals.astype(np.int64)
+    over = home_goals + away_goals > 2.5
+    btts = (home_goals > 0) & (away_goals > 0)
+    return np.stack([
+        home_goals > away_goals, home_goals == away_goals, home_goals < away_goals,
+        over, ~over, btts, ~btts
+    ], axis=1)
+
+
+def odds_matrix(matches, odds):
+    """odds: {idEvent: {mercado: odd}} -> matriz (jogos x MARKETS) com NaN onde não há odd"""
+    matrix = np.full((len(matches.event_ids), len(MARKETS)), np.nan)
+    if not odds:
+        return matrix
+    market_columns = {market: column for column, market in enumerate(MARKETS)}
+    for row, event_id in enumerate(matches.event_ids):
+        event_odds = odds.get(event_id)
+        if not event_odds:
+            continue
+        for market, odd in event_odds.items():
+            column = market_columns.get(market)
+            if column is not None and odd:
+                matrix[row, column] = float(odd)
+    return matrix
+
+
+def _log_loss(probabilities, outcomes):
+    return float(-np.mean(np.log(np.clip(probabilities[outcomes], PROBABILITY_FLOOR, 1))))
+
+
+def score_probabilities(probabilities, outcomes):
+    """Log-loss e Brier para 1X2 (multiclasse), Over 2.5 e BTTS"""
+    if len(probabilities) == 0:
+        return {}
+    one_x_two = probabilities[:, :3]
+    return {
+        'log_loss_1x2': _log_loss(one_x_two, outcomes[:, :3]),
+        'brier_1x2': float(np.mean(np.sum((one_x_two - outcomes[:, :3]) ** 2, axis=1))),
+        'log_loss_over_2.5': _log_loss(probabilities[:, 3:5], outcomes[:, 3:5]),
+        'brier_over_2.5': float(np.mean((probabilities[:, 3] - outcomes[:, 3]) ** 2)),
+        'log_loss_btts': _log_loss(probabilities[:, 5:7], outcomes[:, 5:7]),
+        'brier_btts': float(np.mean((probabilities[:, 5] - outcomes[:, 5]) ** 2)),
+    }
+
+
+def simulate_staking(matches, probabilities, outcomes, odds, valid, bankroll=1000.0, kelly_cap=KELLY_CAP,
+                     kelly_multiplier=1.0, classifications=None, max_exposure=1.0):
+    """
+    Aposta em cada mercado com EV+ (ou só nas classificações pedidas) com
+    stake Kelly sobre a banca do início do dia; se a soma das frações de
+    um dia passar de max_exposure, todas são reduzidas proporcionalmente
+    """
+    ev = calculate_ev_array(probabilities, np.nan_to_num(odds))
+    classification = classify_bet_array(probabilities, np.nan_to_num(odds), ev)
+    allowed = [CLASSIFICATIONS.index(name) for name in (classifications or CLASSIFICATIONS[:-1])]
+    fractions = calculate_kelly_array(probabilities, np.nan_to_num(odds), kelly_cap) * kelly_multiplier
+    placed = valid[:, None] & ~np.isnan(odds) & np.isin(classification, allowed) & (fractions > 0)
+
+    bet_rows, bet_markets = np.nonzero(placed)
+    fractions = fractions[bet_rows, bet_markets]
+    bet_odds = odds[bet_rows, bet_markets]
+    returns = np.where(outcomes[bet_rows, bet_markets], bet_odds - 1, -1.0)
+
+    _, day = np.unique(matches.dates, return_inverse=True)
+    bet_day = day[bet_rows]
+    day_count = int(day.max()) + 1 if len(day) else 0
+    exposure = np.bincount(bet_day, weights=fractions, minlength=day_count)
+    scale = np.where(exposure > max_exposure, max_exposure / np.maximum(exposure, 1e-12), 1.0)
+    fractions = fractions * scale[bet_day]
+
+    growth = 1 + np.bincount(bet_day, weights=fractions * returns, minlength=day_count)
+    bankroll_path = bankroll * np.concatenate(([1.0], np.cumprod(growth)))
+    stakes = fractions * bankroll_path[bet_day]
+    peaks = np.maximum.accumulate(bankroll_path)
+    staked = float(stakes.sum())
+    profit = float(bankroll_path[-1] - bankroll)
+
+    return {
+        'bets': int(len(bet_rows)),
+        'staked': staked,
+        'profit': profit,
+        'roi': profit / staked * 100 if staked > 0 else 0.0,
+        'flat_roi': float(returns.mean() * 100) if len(returns) else 0.0,
+        'final_bankroll': float(bankroll_path[-1]),
+        'max_drawdown': float(np.max(1 - bankroll_path / peaks)) * 100,
+        'bankroll_path': bankroll_path,
+        'bet_rows': bet_rows,
+        'bet_markets': bet_markets,
+        'stakes': stakes,
+    }
+
+
+def run_backtest(matches, odds=None, config=DEFAULT_CONFIG, bankroll=1000.0, kelly_multiplier=1.0,
+                 classifications=None, max_exposure=1.0):
+    """
+    Replay cronológico completo: probabilidades walk-forward, log-loss/Brier
+    e, se odds históricas forem passadas, a simulação de banca com Kelly
+    """
+    if not isinstance(matches, MatchData):
+        matches = prepare_matches(matches)
+
+    valid, expected_home_goals, expected_away_goals, markets = walk_forward_probabilities(matches, config)
+    probabilities = np.stack([markets[market] for market in MARKETS], axis=1)
+    outcomes = market_outcomes(matches)
+
+    result = {'matches': int(valid.sum())}
+    result.update(score_probabilities(probabilities[valid], outcomes[valid]))
+    if odds is not None:
+        result.update(simulate_staking(
+            matches, probabilities, outcomes, odds_matrix(matches, odds) if isinstance(odds, dict) else odds,
+            valid, bankroll, config.kelly_cap, kelly_multiplier, classifications, max_exposure
+        ))
+    result['predictions'] = {
+        'event_id': matches.event_ids[valid],
+        'date': matches.dates[valid],
+        'expected_home_goals': expected_home_goals[valid],
+        'expected_away_goals': expected_away_goals[valid],
+        **{market: markets[market][valid] for market in MARKETS}
+    }
+    return result
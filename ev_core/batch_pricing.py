@@ -0,0 +1,282 @@
+"""
+Precificação em lote pela linha de comando
+
+Lê jogos e odds de arquivos ou stdin (CSV, JSON ou JSONL), analisa cada
+jogo com o mesmo fluxo do "ANALISAR JOGO" (analyse_match) e escreve uma
+linha JSON por aposta com EV+ assim que o jogo é precificado. Cada linha
+de entrada pode ser uma odd (event_id e/ou home_team/away_team, market,
+bookmaker, odd, como na importação em lote) ou um jogo inteiro
+({"home_team": ..., "away_team": ..., "odds": {"home_win": 2.1, ...}}).
+Linhas consecutivas do mesmo jogo viram uma única análise.
+
+Roda offline a partir do snapshot da temporada em disco (SeasonCache) ou
+de um payload JSON da API; com --workers N os jogos são divididos entre
+processos, e o índice da temporada e o modelo vão uma única vez para
+cada worker pelo initializer.
+
+    python -m ev_core.batch_pricing --league 4351 --season 2025 odds.csv > apostas.jsonl
+    cat jogos.jsonl | python -m ev_core.batch_pricing --league 4351 --season 2025 --workers 4 -
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ev_core.analysis import analyse_match, evaluate_odds
+from ev_core.config import DEFAULT_CONFIG_PATH, load_model_config
+from ev_core.dixon_coles import model_for_index
+from ev_core.odds_import import normalize_fields, normalize_market
+from ev_core.pricing_cache import PricingCache
+from ev_core.season_cache import DEFAULT_CACHE_DIR, SeasonCache, read_event_files, season_formats
+from ev_core.season_index import SeasonIndex
+
+CHUNK_SIZE = 16
+IN_FLIGHT_PER_WORKER = 2
+
+
+def _unwrap(document):
+    """Linhas de um documento JSON: lista, {"odds": [...]}/{"fixtures": [...]} ou uma linha só"""
+    if isinstance(document, list):
+        return document
+    for wrapper in ('odds', 'fixtures'):
+        if isinstance(document.get(wrapper), list):
+            return document[wrapper]
+    return [document]
+
+
+def read_rows(stream):
+    """Dicts de um CSV (vírgula, ponto e vírgula ou tab), JSON (lista ou {"odds": [...]}) ou JSONL, sob demanda"""
+    first_line = stream.readline()
+    while first_line and not first_line.strip():
+        first_line = stream.readline()
+    if not first_line:
+        return
+    stripped = first_line.lstrip('\ufeff').strip()
+    if stripped.startswith('{'):
+        try:
+            document = json.loads(stripped)
+        except ValueError:
+            yield from _unwrap(json.loads(stripped + stream.read()))
+            return
+        # JSON compacto numa linha só ({"odds": [...]}) também cai aqui
+        yield from _unwrap(document)
+        for line in stream:
+            if line.strip():
+                yield from _unwrap(json.loads(line))
+    elif stripped.startswith('['):
+        yield from json.loads(stripped + stream.read())
+    else:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=',;\t')
+        yield from csv.DictReader(itertools.chain([first_line.lstrip('\ufeff')], stream), dialect=dialect)
+
+
+def _parse_odd(value):
+    try:
+        return float(str(value).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def group_fixtures(rows):
+    """
+    Agrupa linhas consecutivas do mesmo jogo em
+    {'event_id', 'home_team', 'away_team', 'odds': {casa: {mercado: odd}}}
+    """
+    current = None
+    for row in rows:
+        row = normalize_fields(row)
+        fixture = {
+            'event_id': str(row.get('event_id') or '').strip(),
+            'home_team': str(row.get('home_team') or '').strip(),
+            'away_team': str(row.get('away_team') or '').strip(),
+        }
+        key = (fixture['event_id'], fixture['home_team'], fixture['away_team'])
+        if current is not None and current[0] != key:
+            yield current[1]
+            current = None
+        if current is None:
+            current = (key, dict(fixture, odds={}))
+
+        bookmaker = str(row.get('bookmaker') or '').strip()
+        # "odds" é sinônimo de "odd" em normalize_fields; um dict ali é o jogo inteiro
+        if isinstance(row.get('odd'), dict):
+            pairs = row['odd'].items()
+        elif row.get('market') is not None:
+            pairs = [(row['market'], row.get('odd'))]
+        else:
+            pairs = []
+        book_odds = current[1]['odds'].setdefault(bookmaker, {})
+        for market, odd in pairs:
+            odd = _parse_odd(odd)
+            if odd is not None and odd > 1:
+                market = normalize_market(market) or str(market).strip().lower()
+                book_odds[market] = odd
+    if current is not None:
+        yield current[1]
+
+
+def _init_worker(events, config, model):
+    global _worker_index, _worker_config, _worker_model, _worker_cache
+    _worker_index = SeasonIndex(events) if not isinstance(events, SeasonIndex) else events
+    _worker_config = config
+    _worker_model = model
+    _worker_cache = PricingCache()
+
+
+def _price_fixture(fixture, only_value=True):
+    """(linhas de saída, erro) de um jogo agrupado"""
+    home_team, away_team = fixture['home_team'], fixture['away_team']
+    if fixture['event_id'] and not (home_team and away_team):
+        row = _worker_index.row_by_id.get(fixture['event_id'])
+        if row is not None:
+            event = _worker_index.events[row]
+            home_team, away_team = event.get('strHomeTeam') or '', event.get('strAwayTeam') or ''
+    if not (home_team and away_team):
+        return [], f"jogo sem times: {fixture['event_id'] or '?'}"
+
+    analysis = analyse_match(_worker_index, home_team, away_team, _worker_config, _worker_model,
+                             pricing_cache=_worker_cache)
+    if analysis is None:
+        return [], f"sem histórico: {home_team} vs {away_team}"
+
+    lines = []
+    for bookmaker, odds in fixture['odds'].items():
+        try:
+            bets = evaluate_odds(analysis, odds, _worker_config.kelly_cap, only_value)
+        except ValueError as error:
+            return lines, f"{home_team} vs {away_team}: {error}"
+        for bet in bets:
+            lines.append({
+                'event_id': fixture['event_id'] or None,
+                'home_team': home_team,
+                'away_team': away_team,
+                'bookmaker': bookmaker or None,
+                'market': bet['key'],
+                'mercado': bet['mercado'],
+                'odd': bet['odd'],
+                'probability': round(bet['prob'], 6),
+                'ev': round(bet['ev'], 6),
+                'kelly': round(bet['kelly'], 6),
+                'classification': bet['classification'],
+                'expected_home_goals': round(analysis.expected_home_goals, 4),
+                'expected_away_goals': round(analysis.expected_away_goals, 4),
+                'model': 'dixon_coles' if analysis.model_goals else 'poisson',
+            })
+    return lines, None
+
+
+def _price_chunk(fixtures, only_value=True):
+    return [_price_fixture(fixture, only_value) for fixture in fixtures]
+
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def price_fixtures_stream(fixtures, events, config, model=None, workers=1, only_value=True, chunk_size=CHUNK_SIZE):
+    """
+    Gera (linhas, erro) por jogo na ordem de entrada; workers=1 roda no
+    próprio processo, senão em ProcessPoolExecutor com o índice enviado
+    uma vez por worker e uma janela limitada de blocos em andamento
+    """
+    if workers <= 1:
+        _init_worker(events, config, model)
+        for fixture in fixtures:
+            yield _price_fixture(fixture, only_value)
+        return
+
+    # no máximo in_flight blocos submetidos: a entrada é lida conforme a saída anda
+    in_flight = workers * IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(events, config, model)) as executor:
+        pending = deque()
+        for chunk in _chunks(fixtures, chunk_size):
+            pending.append(executor.submit(_price_chunk, chunk, only_value))
+            if len(pending) >= in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_season_events(args):
+    """Eventos do payload (--events) ou do snapshot em disco; nunca acessa a rede"""
+    if args.events:
+        return read_event_files(args.events)
+    cache = SeasonCache(args.cache)
+    for season in season_formats(args.season):
+        snapshot = cache.read(args.league, season)
+        if snapshot is not None:
+            return snapshot.events
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precifica jogos em lote e emite apostas com EV+ em JSONL")
+    parser.add_argument('inputs', nargs='*', default=['-'], help="arquivos de jogos/odds ('-' = stdin)")
+    parser.add_argument('--league', default='4351', help="liga do snapshot em disco")
+    parser.add_argument('--season', default='2025', help="temporada do snapshot em disco")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, help="diretório do SeasonCache")
+    parser.add_argument('--events', action='append', help="payload(s) JSON da API em vez do snapshot")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help="pesos do modelo (calibração)")
+    parser.add_argument('--dixon-coles', action='store_true', help="gols esperados pelo modelo Dixon-Coles")
+    parser.add_argument('--all', action='store_true', help="emite todos os mercados, não só EV+")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', help="arquivo de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    events = load_season_events(args)
+    if not events:
+        print("Nenhum snapshot da temporada em disco; rode o app uma vez ou use --events.", file=sys.stderr)
+        return 1
+
+    config = load_model_config(args.config)
+    season_index = SeasonIndex(events)
+    model = model_for_index(season_index) if args.dixon_coles else None
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+
+    def rows():
+        for path in args.inputs:
+            if path == '-':
+                yield from read_rows(sys.stdin)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as input_file:
+                    yield from read_rows(input_file)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.perf_counter()
+    fixtures = bets = failures = 0
+    try:
+        for lines, error in price_fixtures_stream(group_fixtures(rows()), season_index if workers <= 1 else events,
+                                                  config, model, workers, only_value=not args.all):
+            fixtures += 1
+            if error:
+                failures += 1
+                print(f"aviso: {error}", file=sys.stderr)
+            for line in lines:
+                output.write(json.dumps(line, ensure_ascii=False) + '\n')
+            bets += len(lines)
+            output.flush()
+    except BrokenPipeError:
+        sys.stderr.close()
+        return 0
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"{fixtures} jogos, {bets} apostas, {failures} com aviso em {time.perf_counter() - started:.2f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+EV, Kelly, classificação de apostas e distribuição da banca
+
+Versões escalares usadas pela interface e equivalentes vetorizadas
+(sufixo _array) para backtests e precificação em lote.
+"""
+import numpy as np
+
+KELLY_CAP = 0.25
+
+CLASSIFICATIONS = ("simple_high", "high_risk", "multiple", "simple_low", "no_value")
+
+RISK_PROFILES = {
+    "conservative": {"simple": 0.60, "multiple": 0.30, "high_risk": 0.10},
+    "balanced": {"simple": 0.50, "multiple": 0.35, "high_risk": 0.15},
+    "aggressive": {"simple": 0.40, "multiple": 0.40, "high_risk": 0.20}
+}
+
+
+def calculate_ev(probability, odd):
+    return (probability * odd) - 1 if odd > 0 else 0
+
+
+def calculate_kelly_criterion(probability, odd, kelly_cap=KELLY_CAP):
+    if odd <= 1:
+        return 0
+    kelly = (probability * odd - 1) / (odd - 1)
+    return max(0, min(kelly, kelly_cap))
+
+
+def classify_bet(probability, odd, ev):
+    if ev >= 0.10 and probability >= 0.40 and 1.50 <= odd <= 4.00:
+        return "simple_high"
+    elif ev >= 0.15 and odd >= 5.00:
+        return "high_risk"
+    elif 0.05 <= ev <= 0.15 and probability >= 0.30:
+        return "multiple"
+    elif ev > 0:
+        return "simple_low"
+    else:
+        return "no_value"
+
+
+def calculate_ev_array(probability, odd):
+    probability = np.asarray(probability, dtype=float)
+    odd = np.asarray(odd, dtype=float)
+    return np.where(odd > 0, probability * odd - 1, 0.0)
+
+
+def calculate_kelly_array(probability, odd, kelly_cap=KELLY_CAP):
+    probability = np.asarray(probability, dtype=float)
+    odd = np.asarray(odd, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kelly = (probability * odd - 1) / (odd - 1)
+    return np.where(odd > 1, np.clip(kelly, 0, kelly_cap), 0.0)
+
+
+def classify_bet_array(probability, odd, ev):
+    """Mesmas regras de classify_bet; retorna códigos em CLASSIFICATIONS"""
+    probability = np.asarray(probability, dtype=float)
+    odd = np.asarray(odd, dtype=float)
+    ev = np.asarray(ev, dtype=float)
+    conditions = [
+        (ev >= 0.10) & (probability >= 0.40) & (odd >= 1.50) & (odd <= 4.00),
+        (ev >= 0.15) & (odd >= 5.00),
+        (ev >= 0.05) & (ev <= 0.15) & (probability >= 0.30),
+        ev > 0,
+    ]
+    return np.select(conditions, [0, 1, 2, 3], default=4).astype(np.int8)
+
+
+def calculate_bankroll_distribution(total_bankroll, bets, risk_profile="balanced"):
+    simple_high_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "simple_high"]
+    multiple_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "multiple"]
+    high_risk_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "high_risk"]
+    simple_low_bets = [bet for bet in bets if classify_bet(bet['prob'], bet['odd'], bet['ev']) == "simple_low"]
+
+    profile = RISK_PROFILES[risk_profile]
+
+    simple_budget = total_bankroll * profile["simple"]
+    multiple_budget = total_bankroll * profile["multiple"]
+    high_risk_budget = total_bankroll * profile["high_risk"]
+
+    recommendations = {
+        "simple_high": simple_high_bets,
+        "simple_low": simple_low_bets,
+        "multiple": multiple_bets,
+        "high_risk": high_risk_bets,
+        "budgets": {
+            "simple_total": simple_budget,
+            "multiple_total": multiple_budget,
+            "high_risk_total": high_risk_budget
+        }
+    }
+
+    return recommendations
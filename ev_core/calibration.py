@@ -0,0 +1,183 @@
+"""
+Calibração dos pesos do modelo
+
+Varre combinações de ModelConfig (grade ou amostragem aleatória) com o
+backtest walk-forward sobre temporadas históricas e grava a melhor no
+arquivo que o app carrega. As combinações são avaliadas em paralelo num
+ProcessPoolExecutor; os jogos já convertidos em arrays (e a matriz de
+odds) vão uma única vez para cada worker pelo initializer, não a cada
+tarefa.
+
+    python -m ev_core.calibration --store data/store --league 4351 --workers 4
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ev_core.backtest import odds_matrix, prepare_from_store, prepare_matches, run_backtest
+from ev_core.config import DEFAULT_CONFIG, DEFAULT_CONFIG_PATH, ModelConfig, save_model_config
+from ev_core.event_store import DEFAULT_STORE_DIR, EventStore
+from ev_core.season_cache import read_event_files
+
+PARAMETER_GRID = {
+    'recent_games': (3, 4, 5, 6, 8),
+    'recent_weight': (0.5, 0.6, 0.7, 0.8, 0.9),
+    'h2h_weight': (0.0, 0.05, 0.10, 0.15, 0.25),
+    'lambda_floor': (0.3, 0.4, 0.5, 0.6),
+    'kelly_cap': (0.05, 0.10, 0.25, 0.50),
+}
+
+PARAMETER_RANGES = {
+    'recent_games': (3, 10),
+    'recent_weight': (0.4, 0.95),
+    'h2h_weight': (0.0, 0.35),
+    'lambda_floor': (0.2, 0.8),
+    'kelly_cap': (0.02, 0.50),
+}
+
+MAXIMIZE = ('roi', 'profit', 'final_bankroll', 'flat_roi')
+
+_SUMMARY_KEYS = (
+    'matches', 'log_loss_1x2', 'brier_1x2', 'log_loss_over_2.5', 'brier_over_2.5', 'log_loss_btts', 'brier_btts',
+    'bets', 'staked', 'profit', 'roi', 'flat_roi', 'final_bankroll', 'max_drawdown'
+)
+
+_worker_matches = None
+_worker_odds = None
+
+
+def grid_configs(grid=PARAMETER_GRID, with_odds=False):
+    """Produto cartesiano da grade; sem odds o kelly_cap não afeta nada e fica no padrão"""
+    fields = [field for field in ModelConfig._fields if with_odds or field != 'kelly_cap']
+    for values in itertools.product(*(grid[field] for field in fields)):
+        yield DEFAULT_CONFIG._replace(**dict(zip(fields, values)))
+
+
+def random_configs(samples, ranges=PARAMETER_RANGES, with_odds=False, seed=None):
+    """Amostras uniformes dentro de PARAMETER_RANGES (recent_games inteiro)"""
+    generator = random.Random(seed)
+    for _ in range(samples):
+        low, high = ranges['recent_games']
+        parameters = {'recent_games': generator.randint(low, high)}
+        for field in ('recent_weight', 'h2h_weight', 'lambda_floor', 'kelly_cap'):
+            if field == 'kelly_cap' and not with_odds:
+                continue
+            low, high = ranges[field]
+            parameters[field] = round(generator.uniform(low, high), 3)
+        yield DEFAULT_CONFIG._replace(**parameters)
+
+
+def _init_worker(matches, odds):
+    global _worker_matches, _worker_odds
+    _worker_matches = matches
+    _worker_odds = odds
+
+
+def _evaluate_chunk(configs):
+    results = []
+    for config in configs:
+        result = run_backtest(_worker_matches, _worker_odds, config)
+        results.append((config, {key: result[key] for key in _SUMMARY_KEYS if key in result}))
+    return results
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def calibrate(matches, configs, odds=None, objective='log_loss_1x2', workers=None, chunk_size=None):
+    """
+    Avalia cada configuração e retorna [(config, métricas)] da melhor para
+    a pior segundo objective (métricas de erro são minimizadas, as de
+    retorno em MAXIMIZE maximizadas); workers=1 roda no próprio processo
+    """
+    configs = list(configs)
+    if odds is not None and isinstance(odds, dict):
+        odds = odds_matrix(matches, odds)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(configs) // (workers * 4))
+
+    if workers == 1 or len(configs) <= chunk_size:
+        _init_worker(matches, odds)
+        results = _evaluate_chunk(configs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matches, odds)) as executor:
+            results = [item for chunk in executor.map(_evaluate_chunk, _chunks(configs, chunk_size)) for item in chunk]
+
+    sign = -1 if objective in MAXIMIZE else 1
+    scored = [(config, metrics) for config, metrics in results if np.isfinite(metrics.get(objective, np.nan))]
+    return sorted(scored, key=lambda item: sign * item[1][objective])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibra os pesos do modelo EV+ com backtest walk-forward")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help="diretório do EventStore")
+    parser.add_argument('--league', action='append', help="liga(s) do EventStore (padrão: todas)")
+    parser.add_argument('--season', action='append', help="temporada(s) do EventStore (padrão: todas)")
+    parser.add_argument('--events', action='append', help="payload(s) JSON da API em vez do EventStore")
+    parser.add_argument('--odds', help="JSON {idEvent: {mercado: odd}} para otimizar também o kelly_cap")
+    parser.add_argument('--search', choices=('grid', 'random'), default='grid')
+    parser.add_argument('--samples', type=int, default=200, help="combinações na busca aleatória")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--objective', default='log_loss_1x2')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--output', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--dry-run', action='store_true', help="só mostra o ranking, sem gravar")
+    args = parser.parse_args(argv)
+
+    if args.events:
+        matches = prepare_matches(read_event_files(args.events))
+    else:
+        matches = prepare_from_store(EventStore(args.store), args.league, args.season)
+    if len(matches.event_ids) == 0:
+        print("Nenhum jogo finalizado encontrado.", file=sys.stderr)
+        return 1
+
+    odds = None
+    if args.odds:
+        with open(args.odds, encoding='utf-8') as odds_file:
+            odds = json.load(odds_file)
+
+    if args.search == 'grid':
+        configs = grid_configs(with_odds=odds is not None)
+    else:
+        configs = random_configs(args.samples, with_odds=odds is not None, seed=args.seed)
+
+    started = time.perf_counter()
+    ranking = calibrate(matches, configs, odds, args.objective, args.workers)
+    elapsed = time.perf_counter() - started
+    if not ranking:
+        print(f"Nenhuma configuração produziu {args.objective}.", file=sys.stderr)
+        return 1
+
+    print(f"{len(ranking)} configurações em {elapsed:.1f}s sobre {len(matches.event_ids)} jogos")
+    baseline = calibrate(matches, [DEFAULT_CONFIG], odds, args.objective, workers=1)
+    if baseline:
+        print(f"padrão: {args.objective}={baseline[0][1][args.objective]:.5f}")
+    for config, metrics in ranking[:10]:
+        print(f"{args.objective}={metrics[args.objective]:.5f}  {dict(config._asdict())}")
+
+    best_config, best_metrics = ranking[0]
+    if not args.dry_run:
+        save_model_config(best_config, args.output, {
+            'objective': args.objective,
+            'metrics': best_metrics,
+            'matches': len(matches.event_ids),
+            'search': args.search,
+            'evaluated': len(ranking),
+            'calibrated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        print(f"Configuração gravada em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Parâmetros do modelo
+
+Os valores padrão são os do app original (70/30 nos últimos 5 jogos,
+15% de H2H, λ mínimo 0.5 e Kelly limitado a 25%). A calibração grava a
+melhor combinação num JSON que o app carrega na inicialização.
+"""
+import json
+import os
+from collections import namedtuple
+
+from ev_core.betting import KELLY_CAP
+from ev_core.model import H2H_WEIGHT
+from ev_core.score_matrix import LAMBDA_FLOOR
+from ev_core.season_index import RECENT_GAMES, RECENT_WEIGHT
+
+DEFAULT_CONFIG_PATH = os.environ.get('EV_MODEL_CONFIG', os.path.join('data', 'model_config.json'))
+
+ModelConfig = namedtuple(
+    'ModelConfig',
+    ['recent_games', 'recent_weight', 'h2h_weight', 'lambda_floor', 'kelly_cap'],
+    defaults=(RECENT_GAMES, RECENT_WEIGHT, H2H_WEIGHT, LAMBDA_FLOOR, KELLY_CAP)
+)
+
+DEFAULT_CONFIG = ModelConfig()
+
+
+def load_model_config(path=DEFAULT_CONFIG_PATH):
+    """Configuração salva pela calibração; padrão se o arquivo não existir ou for inválido"""
+    try:
+        with open(path, encoding='utf-8') as config_file:
+            stored = json.load(config_file)
+    except (OSError, ValueError):
+        return DEFAULT_CONFIG
+    parameters = stored.get('parameters') if isinstance(stored, dict) else None
+    if not isinstance(parameters, dict):
+        return DEFAULT_CONFIG
+    try:
+        return DEFAULT_CONFIG._replace(**{
+            field: type(getattr(DEFAULT_CONFIG, field))(parameters[field])
+            for field in ModelConfig._fields if field in parameters
+        })
+    except (TypeError, ValueError):
+        return DEFAULT_CONFIG
+
+
+def save_model_config(config, path=DEFAULT_CONFIG_PATH, metadata=None):
+    """Grava de forma atômica junto com métricas/origem da calibração"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as config_file:
+        json.dump({'parameters': config._asdict(), 'metadata': metadata or {}}, config_file, indent=2)
+    os.replace(temporary_path, path)
@@ -0,0 +1,238 @@
+"""
+Modelo Dixon-Coles (ataque/defesa por time)
+
+λ casa = vantagem de mando × ataque[casa] × defesa[fora] e
+μ fora = ataque[fora] × defesa[casa], com a correção τ de Dixon-Coles
+nos placares 0x0, 1x0, 0x1 e 1x1. Os ratings saem de máxima
+verossimilhança ponderada por recência: cada bloco (ataques, defesas,
+mando) tem maximizador fechado dado os outros, então cada iteração são
+alguns np.bincount sobre todos os jogos; ρ é estimado em seguida por
+busca de seção áurea com os ratings fixos (a aproximação em dois
+estágios usual). O ajuste é feito uma vez por índice de temporada — o
+ingestor cria um índice novo a cada snapshot — e a precificação de um
+jogo vira uma consulta de parâmetros.
+"""
+import threading
+import weakref
+
+import numpy as np
+
+from ev_core.score_matrix import MAX_GOALS, calculate_match_probabilities, calculate_markets
+
+DECAY_RATE = 0.0019
+SMOOTHING_GAMES = 1.0
+MAX_ITERATIONS = 200
+TOLERANCE = 1e-8
+
+_GOLDEN_RATIO = (np.sqrt(5) - 1) / 2
+
+
+def dixon_coles_tau(home_goals, away_goals, home_lambdas, away_lambdas, rho):
+    """Fator de correção τ de cada jogo (1 fora dos placares 0x0, 1x0, 0x1 e 1x1)"""
+    tau = np.ones(np.broadcast(home_goals, away_goals, home_lambdas, away_lambdas).shape)
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - home_lambdas * away_lambdas * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + home_lambdas * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + away_lambdas * rho, tau)
+    return np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+
+
+def adjust_score_matrix(probability_matrix, home_lambdas, away_lambdas, rho):
+    """Aplica τ às células de placar baixo; a massa total não muda"""
+    adjusted = np.array(probability_matrix, dtype=float)
+    home_lambdas = np.asarray(home_lambdas, dtype=float)
+    away_lambdas = np.asarray(away_lambdas, dtype=float)
+    adjusted[..., 0, 0] *= 1 - home_lambdas * away_lambdas * rho
+    adjusted[..., 0, 1] *= 1 + home_lambdas * rho
+    adjusted[..., 1, 0] *= 1 + away_lambdas * rho
+    adjusted[..., 1, 1] *= 1 - rho
+    return adjusted
+
+
+def _rho_bounds(home_lambdas, away_lambdas):
+    """Intervalo em que todos os τ ficam positivos"""
+    margin = 1e-6
+    low = max(-1 / home_lambdas.max(), -1 / away_lambdas.max(), -1.0) + margin
+    high = min(1 / (home_lambdas * away_lambdas).max(), 1.0) - margin
+    return low, high
+
+
+def _fit_rho(home_goals, away_goals, home_lambdas, away_lambdas, weights, iterations=60):
+    low_scores = (home_goals <= 1) & (away_goals <= 1)
+    if not low_scores.any():
+        return 0.0
+    x, y = home_goals[low_scores], away_goals[low_scores]
+    lam, mu, w = home_lambdas[low_scores], away_lambdas[low_scores], weights[low_scores]
+
+    def objective(rho):
+        return float(np.sum(w * np.log(dixon_coles_tau(x, y, lam, mu, rho))))
+
+    low, high = _rho_bounds(lam, mu)
+    left = high - _GOLDEN_RATIO * (high - low)
+    right = low + _GOLDEN_RATIO * (high - low)
+    left_value, right_value = objective(left), objective(right)
+    for _ in range(iterations):
+        if left_value < right_value:
+            low, left, left_value = left, right, right_value
+            right = low + _GOLDEN_RATIO * (high - low)
+            right_value = objective(right)
+        else:
+            high, right, right_value = right, left, left_value
+            left = high - _GOLDEN_RATIO * (high - low)
+            left_value = objective(left)
+    return (low + high) / 2
+
+
+def _log_likelihood(home_goals, away_goals, home_lambdas, away_lambdas, rho, weights):
+    """Log-verossimilhança ponderada (sem os termos constantes de fatorial)"""
+    tau = dixon_coles_tau(home_goals, away_goals, home_lambdas, away_lambdas, rho)
+    return float(np.sum(weights * (
+        np.log(tau) + home_goals * np.log(home_lambdas) - home_lambdas
+        + away_goals * np.log(away_lambdas) - away_lambdas
+    )))
+
+
+class DixonColesModel:
+    def __init__(self, teams, attack, defence, home_advantage, rho, log_likelihood=None, matches=0, iterations=0):
+        self.teams = list(teams)
+        self.team_ids = {team: position for position, team in enumerate(self.teams)}
+        self.attack = np.asarray(attack, dtype=float)
+        self.defence = np.asarray(defence, dtype=float)
+        self.home_advantage = float(home_advantage)
+        self.rho = float(rho)
+        self.log_likelihood = log_likelihood
+        self.matches = matches
+        self.iterations = iterations
+
+    def __contains__(self, team_name):
+        return team_name in self.team_ids
+
+    def expected_goals(self, home_team, away_team):
+        """(λ casa, μ fora) do confronto; None se algum time não estava no ajuste"""
+        home_id = self.team_ids.get(home_team)
+        away_id = self.team_ids.get(away_team)
+        if home_id is None or away_id is None:
+            return None
+        return (
+            float(self.home_advantage * self.attack[home_id] * self.defence[away_id]),
+            float(self.attack[away_id] * self.defence[home_id])
+        )
+
+    def expected_goals_array(self, home_ids, away_ids):
+        """Versão vetorizada por índices em self.teams"""
+        home_ids = np.asarray(home_ids, dtype=np.int64)
+        away_ids = np.asarray(away_ids, dtype=np.int64)
+        return (
+            self.home_advantage * self.attack[home_ids] * self.defence[away_ids],
+            self.attack[away_ids] * self.defence[home_ids]
+        )
+
+    def score_matrix(self, home_expected_goals, away_expected_goals, max_goals=MAX_GOALS):
+        """Matriz de placares Poisson com a correção τ (escalar ou lote)"""
+        return adjust_score_matrix(
+            calculate_match_probabilities(home_expected_goals, away_expected_goals, max_goals),
+            home_expected_goals, away_expected_goals, self.rho
+        )
+
+    def price_fixtures(self, home_expected_goals, away_expected_goals, max_goals=MAX_GOALS):
+        """Mesmo retorno de score_matrix.price_fixtures, com a correção τ"""
+        return calculate_markets(self.score_matrix(
+            np.atleast_1d(home_expected_goals), np.atleast_1d(away_expected_goals), max_goals
+        ))
+
+    def ratings(self):
+        """[(time, ataque, defesa)] do melhor ataque para o pior"""
+        order = np.argsort(-self.attack, kind='stable')
+        return [(self.teams[team], float(self.attack[team]), float(self.defence[team])) for team in order]
+
+
+def fit_dixon_coles(teams, home_ids, away_ids, home_goals, away_goals, dates=None, decay_rate=DECAY_RATE,
+                    smoothing_games=SMOOTHING_GAMES, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    """
+    Ajusta o modelo aos jogos finalizados informados
+    Jogos pesam exp(-decay_rate × dias antes do último jogo); smoothing_games
+    jogos fictícios na média da liga evitam ratings zerados para times com
+    poucos jogos
+    """
+    team_count = len(teams)
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+    home_goals = np.asarray(home_goals, dtype=float)
+    away_goals = np.asarray(away_goals, dtype=float)
+    if len(home_ids) == 0:
+        return DixonColesModel(teams, np.ones(team_count), np.ones(team_count), 1.0, 0.0)
+
+    weights = np.ones(len(home_ids))
+    if dates is not None and decay_rate:
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        days_before = (np.nanmax(dates) - dates).astype(float) if not np.isnat(dates).all() else np.zeros(len(dates))
+        weights = np.exp(-decay_rate * np.nan_to_num(days_before, nan=0.0))
+
+    rate = np.sum(weights * (home_goals + away_goals)) / (2 * np.sum(weights))
+    rate = max(rate, 1e-3)
+    pseudo_goals = smoothing_games * rate
+    home_goals_for = np.bincount(home_ids, weights * home_goals, team_count)
+    away_goals_for = np.bincount(away_ids, weights * away_goals, team_count)
+    goals_for = home_goals_for + away_goals_for
+    goals_against = np.bincount(away_ids, weights * home_goals, team_count) + \
+        np.bincount(home_ids, weights * away_goals, team_count)
+
+    attack = np.ones(team_count)
+    defence = np.full(team_count, rate)
+    home_advantage = 1.0
+    rho = 0.0
+    previous = -np.inf
+    log_likelihood = previous
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        exposure = np.bincount(home_ids, weights * home_advantage * defence[away_ids], team_count) + \
+            np.bincount(away_ids, weights * defence[home_ids], team_count)
+        attack = (goals_for + pseudo_goals) / (exposure + pseudo_goals)
+        attack /= np.exp(np.mean(np.log(attack)))
+
+        exposure = np.bincount(away_ids, weights * home_advantage * attack[home_ids], team_count) + \
+            np.bincount(home_ids, weights * attack[away_ids], team_count)
+        defence = (goals_against + pseudo_goals) / (exposure + smoothing_games)
+
+        home_advantage = max(home_goals_for.sum(), 1e-9) / np.sum(weights * attack[home_ids] * defence[away_ids])
+
+        home_lambdas = home_advantage * attack[home_ids] * defence[away_ids]
+        away_lambdas = attack[away_ids] * defence[home_ids]
+        rho = _fit_rho(home_goals, away_goals, home_lambdas, away_lambdas, weights)
+        log_likelihood = _log_likelihood(home_goals, away_goals, home_lambdas, away_lambdas, rho, weights)
+        if abs(log_likelihood - previous) <= tolerance * max(1.0, abs(log_likelihood)):
+            break
+        previous = log_likelihood
+
+    return DixonColesModel(teams, attack, defence, home_advantage, rho, log_likelihood, len(home_ids), iteration)
+
+
+def fit_matches(matches, **options):
+    """Ajuste sobre um MatchData do backtest (várias temporadas juntas)"""
+    return fit_dixon_coles(
+        matches.teams, matches.home, matches.away, matches.home_goals, matches.away_goals, matches.dates, **options
+    )
+
+
+def fit_season_index(season_index, **options):
+    """Ajuste sobre os jogos finalizados de um SeasonIndex"""
+    rows = np.flatnonzero(season_index.played)
+    dates = np.array([date or 'NaT' for date in season_index.dates[rows]], dtype='datetime64[D]')
+    return fit_dixon_coles(
+        season_index.team_list, season_index.home_ids[rows], season_index.away_ids[rows],
+        season_index.home_scores[rows], season_index.away_scores[rows], dates, **options
+    )
+
+
+_fitted = weakref.WeakKeyDictionary()
+_fitted_lock = threading.Lock()
+
+
+def model_for_index(season_index):
+    """Modelo ajustado uma única vez por índice (um índice novo a cada atualização de dados)"""
+    with _fitted_lock:
+        model = _fitted.get(season_index)
+    if model is None:
+        model = fit_season_index(season_index)
+        with _fitted_lock:
+            model = _fitted.setdefault(season_index, model)
+    return model
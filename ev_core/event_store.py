@@ -0,0 +1,255 @@
+"""
+Armazenamento colunar de eventos por liga e temporada
+
+Cada partição (league=<id>/season=<temporada>) guarda uma coluna por
+arquivo .npy: times como códigos inteiros de um dicionário da partição,
+placares int16 (-1 = não disputado) e datas datetime64. Um _meta.json
+com contagem e datas mínima/máxima permite podar partições antes de
+abrir qualquer coluna, e as colunas são lidas via memory-map, então
+vários anos de histórico não ocupam memória além do que a consulta toca.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ev_core.season_index import RECENT_GAMES, RECENT_WEIGHT, parse_score, summarize_games
+
+DEFAULT_STORE_DIR = os.environ.get('EV_STORE_DIR', os.path.join('data', 'store'))
+
+COLUMNS = ('event_id', 'date', 'round', 'home', 'away', 'home_score', 'away_score')
+
+
+def _parse_date(value):
+    """dateEvent ('AAAA-MM-DD', com ou sem hora) como datetime64[D]; vazio ou malformado vira NaT"""
+    try:
+        return np.datetime64(str(value).strip()[:10], 'D') if value else np.datetime64('NaT', 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+
+def _recent_first(dates):
+    """Posições do jogo mais recente ao mais antigo; jogos sem data (NaT) por último"""
+    keys = np.where(np.isnat(dates), np.iinfo(np.int64).max, -dates.astype('int64'))
+    return np.argsort(keys, kind='stable')
+
+
+def events_to_columns(events):
+    """Converte o payload da API nas colunas tipadas de uma partição"""
+    teams = sorted({
+        team for event in events
+        for team in (event.get('strHomeTeam'), event.get('strAwayTeam')) if team
+    })
+    team_codes = {team: code for code, team in enumerate(teams)}
+
+    size = len(events)
+    home_score = np.full(size, -1, dtype=np.int16)
+    away_score = np.full(size, -1, dtype=np.int16)
+    for row, event in enumerate(events):
+        home = parse_score(event.get('intHomeScore'))
+        away = parse_score(event.get('intAwayScore'))
+        if home is not None and away is not None:
+            home_score[row] = home
+            away_score[row] = away
+
+    columns = {
+        'event_id': np.array([event.get('idEvent') or '' for event in events], dtype=str),
+        'date': np.array([_parse_date(event.get('dateEvent')) for event in events], dtype='datetime64[D]'),
+        'round': np.array([parse_score(event.get('intRound')) or 0 for event in events], dtype=np.int16),
+        'home': np.array([team_codes.get(event.get('strHomeTeam'), -1) for event in events], dtype=np.int32),
+        'away': np.array([team_codes.get(event.get('strAwayTeam'), -1) for event in events], dtype=np.int32),
+        'home_score': home_score,
+        'away_score': away_score,
+    }
+    return columns, np.array(teams, dtype=str)
+
+
+class EventStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR, max_open_partitions=8):
+        self.directory = directory
+        self.max_open_partitions = max_open_partitions
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _partition_path(self, league_id, season):
+        return os.path.join(self.directory, f"league={league_id}", f"season={season}")
+
+    def write_partition(self, league_id, season, events):
+        """Regrava a partição inteira de forma atômica"""
+        columns, teams = events_to_columns(events)
+        path = self._partition_path(league_id, season)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(temporary_path)
+
+        for name, values in columns.items():
+            np.save(os.path.join(temporary_path, f"{name}.npy"), values)
+        np.save(os.path.join(temporary_path, "teams.npy"), teams)
+
+        valid_dates = columns['date'][~np.isnat(columns['date'])]
+        meta = {
+            'league_id': league_id,
+            'season': season,
+            'rows': len(events),
+            'played': int((columns['home_score'] >= 0).sum()),
+            'min_date': str(valid_dates.min()) if len(valid_dates) else None,
+            'max_date': str(valid_dates.max()) if len(valid_dates) else None,
+            'written_at': time.time(),
+        }
+        with open(os.path.join(temporary_path, "_meta.json"), 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+
+        old_path = f"{path}.{os.getpid()}.{threading.get_ident()}.old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(temporary_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return meta
+
+    def partitions(self, leagues=None, seasons=None):
+        """Metadados das partições que passam pelos filtros de liga/temporada"""
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        for league_dir in sorted(os.listdir(self.directory)):
+            if not league_dir.startswith('league='):
+                continue
+            league_id = league_dir[len('league='):]
+            if leagues is not None and league_id not in leagues:
+                continue
+            for season_dir in sorted(os.listdir(os.path.join(self.directory, league_dir))):
+                if not season_dir.startswith('season=') or season_dir.endswith(('.tmp', '.old')):
+                    continue
+                season = season_dir[len('season='):]
+                if seasons is not None and season not in seasons:
+                    continue
+                meta_path = os.path.join(self.directory, league_dir, season_dir, "_meta.json")
+                try:
+                    with open(meta_path, encoding='utf-8') as meta_file:
+                        found.append(json.load(meta_file))
+                except (OSError, ValueError):
+                    continue
+        return found
+
+    def _load_partition(self, meta):
+        """Colunas memory-mapped da partição, com LRU de partições abertas"""
+        path = self._partition_path(meta['league_id'], meta['season'])
+        key = (path, meta['written_at'])
+        with self._lock:
+            if key in self._open:
+                self._open.move_to_end(key)
+                return self._open[key]
+
+        partition = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        partition['teams'] = np.load(os.path.join(path, "teams.npy"))
+        partition['team_codes'] = {str(team): code for code, team in enumerate(partition['teams'])}
+        # código -1 (time ausente no evento) cai no '' acrescentado ao fim
+        partition['team_names'] = np.append(partition['teams'], '')
+
+        with self._lock:
+            self._open[key] = partition
+            while len(self._open) > self.max_open_partitions:
+                self._open.popitem(last=False)
+        return partition
+
+    def query(self, leagues=None, seasons=None, team=None, venue=None, opponent=None,
+              played=None, date_from=None, date_to=None):
+        """
+        Filtra eventos empurrando os predicados para baixo:
+        liga/temporada e datas podam partições pelo _meta.json, times são
+        resolvidos no dicionário da partição (time ausente = partição
+        ignorada sem ler colunas) e o resto vira uma máscara vetorizada
+        venue: 'home', 'away' ou None (qualquer mando); opponent restringe
+        ao confronto direto com team
+        """
+        date_from = np.datetime64(date_from, 'D') if date_from is not None else None
+        date_to = np.datetime64(date_to, 'D') if date_to is not None else None
+
+        pieces = []
+        for meta in self.partitions(leagues, seasons):
+            if meta['rows'] == 0:
+                continue
+            if date_from is not None and meta['max_date'] and np.datetime64(meta['max_date']) < date_from:
+                continue
+            if date_to is not None and meta['min_date'] and np.datetime64(meta['min_date']) > date_to:
+                continue
+            if played is True and meta['played'] == 0:
+                continue
+
+            partition = self._load_partition(meta)
+            codes = partition['team_codes']
+            if (team is not None and team not in codes) or (opponent is not None and opponent not in codes):
+                continue
+
+            mask = np.ones(meta['rows'], dtype=bool)
+            if team is not None:
+                team_code = codes[team]
+                opponent_code = codes[opponent] if opponent is not None else None
+                home_match = partition['home'] == team_code
+                away_match = partition['away'] == team_code
+                if opponent_code is not None:
+                    home_match &= partition['away'] == opponent_code
+                    away_match &= partition['home'] == opponent_code
+                if venue == 'home':
+                    mask &= home_match
+                elif venue == 'away':
+                    mask &= away_match
+                else:
+                    mask &= home_match | away_match
+            if played is not None:
+                mask &= (partition['home_score'] >= 0) == played
+            if date_from is not None:
+                mask &= partition['date'] >= date_from
+            if date_to is not None:
+                mask &= partition['date'] <= date_to
+
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                continue
+            piece = {name: np.asarray(partition[name][rows]) for name in COLUMNS}
+            piece['home_team'] = partition['team_names'][piece.pop('home')]
+            piece['away_team'] = partition['team_names'][piece.pop('away')]
+            piece['league_id'] = np.full(len(rows), meta['league_id'])
+            piece['season'] = np.full(len(rows), meta['season'])
+            pieces.append(piece)
+
+        if not pieces:
+            return {
+                'event_id': np.array([], dtype=str), 'date': np.array([], dtype='datetime64[D]'),
+                'round': np.array([], dtype=np.int16), 'home_score': np.array([], dtype=np.int16),
+                'away_score': np.array([], dtype=np.int16), 'home_team': np.array([], dtype=str),
+                'away_team': np.array([], dtype=str), 'league_id': np.array([], dtype=str),
+                'season': np.array([], dtype=str),
+            }
+        return {name: np.concatenate([piece[name] for piece in pieces]) for name in pieces[0]}
+
+    def team_stats(self, team_name, venue='home', use_recent=True, leagues=None, seasons=None,
+                   recent_games=RECENT_GAMES, recent_weight=RECENT_WEIGHT):
+        """Mesmas estatísticas de SeasonIndex.team_stats sobre qualquer recorte do histórico"""
+        games = self.query(leagues, seasons, team=team_name, venue=venue, played=True)
+        order = _recent_first(games['date'])
+        if venue == 'home':
+            scored, conceded = games['home_score'][order], games['away_score'][order]
+        else:
+            scored, conceded = games['away_score'][order], games['home_score'][order]
+        return summarize_games(scored, conceded, games['date'][order], use_recent, recent_games, recent_weight)
+
+    def head_to_head(self, home_team, away_team, limit=5, leagues=None, seasons=None):
+        """Confrontos diretos (mais recentes primeiro) em todas as partições filtradas"""
+        games = self.query(leagues, seasons, team=home_team, opponent=away_team, played=True)
+        order = _recent_first(games['date'])[:limit]
+        return [
+            {
+                'date': str(games['date'][row]),
+                'home': str(games['home_team'][row]),
+                'away': str(games['away_team'][row]),
+                'score_home': int(games['home_score'][row]),
+                'score_away': int(games['away_score'][row])
+            }
+            for row in order
+        ]
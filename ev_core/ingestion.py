@@ -0,0 +1,47 @@
+"""
+Ingestão incremental dos snapshots da temporada
+
+Guarda o índice atual de cada temporada e, quando chega um snapshot
+novo, aplica só os jogos novos ou alterados (por idEvent). O custo da
+atualização acompanha o número de jogos desde a última coleta, não o
+tamanho da temporada. Com um EventStore configurado, cada snapshot novo
+também é gravado na partição colunar da liga/temporada.
+"""
+import threading
+from collections import namedtuple
+
+from ev_core.season_index import SeasonIndex
+
+IngestionResult = namedtuple('IngestionResult', ['index', 'changed', 'full_rebuild'])
+
+
+class SeasonIngestor:
+    def __init__(self, store=None):
+        self.store = store
+        self._current = {}
+        self._lock = threading.Lock()
+        self.last_result = None
+
+    def ingest(self, league_id, season, fetched_at, events):
+        """Índice para o snapshot (liga, temporada, fetched_at); reutiliza o anterior"""
+        key = (league_id, season)
+        with self._lock:
+            current = self._current.get(key)
+            if current is not None and current[0] == fetched_at:
+                return current[1]
+
+            if current is None:
+                result = IngestionResult(SeasonIndex(events), len(events), True)
+            else:
+                previous_index = current[1]
+                changes = previous_index.diff(events)
+                if changes is None:
+                    result = IngestionResult(SeasonIndex(events), len(events), True)
+                else:
+                    result = IngestionResult(previous_index.apply_changes(changes), len(changes), False)
+
+            self._current[key] = (fetched_at, result.index)
+            self.last_result = result
+            if self.store is not None and result.changed:
+                self.store.write_partition(league_id, season, events)
+            return result.index
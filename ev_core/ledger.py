@@ -0,0 +1,336 @@
+"""
+Histórico de apostas persistente (SQLite local)
+
+Substitui st.session_state.bets_history: sobrevive a refresh e restart,
+é compartilhado entre workers (WAL + busy timeout) e usa chave primária
+estável. Os totais usados no ROI ficam numa tabela de uma linha mantida
+por triggers na mesma transação de cada escrita, então o dashboard lê os
+indicadores em O(1) independentemente do tamanho do histórico. A odd de
+fechamento de cada aposta é gravada uma única vez, depois do kickoff, e
+o CLV médio entra nos mesmos totais.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_DB_PATH = os.environ.get('EV_LEDGER_PATH', os.path.join('data', 'apostas.db'))
+
+BET_STATUSES = ('pendente', 'ganhou', 'perdeu')
+
+BET_COLUMNS = ('id', 'timestamp', 'jogo', 'mercado', 'odd', 'stake', 'status', 'prob', 'ev', 'classification', 'key',
+               'event_id', 'kickoff', 'closing_odd')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    jogo TEXT NOT NULL,
+    mercado TEXT NOT NULL,
+    odd REAL NOT NULL,
+    stake REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    prob REAL,
+    ev REAL,
+    classification TEXT,
+    market_key TEXT,
+    event_id TEXT,
+    kickoff TEXT,
+    closing_odd REAL
+);
+CREATE INDEX IF NOT EXISTS idx_bets_status ON bets (status);
+CREATE INDEX IF NOT EXISTS idx_bets_timestamp ON bets (timestamp);
+CREATE INDEX IF NOT EXISTS idx_bets_status_timestamp ON bets (status, timestamp);
+
+CREATE TABLE IF NOT EXISTS ledger_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_bets INTEGER NOT NULL DEFAULT 0,
+    finalized INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    total_invested REAL NOT NULL DEFAULT 0,
+    total_returned REAL NOT NULL DEFAULT 0,
+    clv_count INTEGER NOT NULL DEFAULT 0,
+    clv_sum REAL NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS bets_totals_insert AFTER INSERT ON bets BEGIN
+    UPDATE ledger_totals SET
+        total_bets = total_bets + 1,
+        finalized = finalized + (NEW.status IN ('ganhou', 'perdeu')),
+        wins = wins + (NEW.status = 'ganhou'),
+        total_invested = total_invested + CASE WHEN NEW.status IN ('ganhou', 'perdeu') THEN NEW.stake ELSE 0 END,
+        total_returned = total_returned + CASE WHEN NEW.status = 'ganhou' THEN NEW.stake * NEW.odd ELSE 0 END
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bets_totals_update AFTER UPDATE OF status, stake, odd ON bets BEGIN
+    UPDATE ledger_totals SET
+        finalized = finalized - (OLD.status IN ('ganhou', 'perdeu')) + (NEW.status IN ('ganhou', 'perdeu')),
+        wins = wins - (OLD.status = 'ganhou') + (NEW.status = 'ganhou'),
+        total_invested = total_invested
+            - CASE WHEN OLD.status IN ('ganhou', 'perdeu') THEN OLD.stake ELSE 0 END
+            + CASE WHEN NEW.status IN ('ganhou', 'perdeu') THEN NEW.stake ELSE 0 END,
+        total_returned = total_returned
+            - CASE WHEN OLD.status = 'ganhou' THEN OLD.stake * OLD.odd ELSE 0 END
+            + CASE WHEN NEW.status = 'ganhou' THEN NEW.stake * NEW.odd ELSE 0 END
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bets_totals_delete AFTER DELETE ON bets BEGIN
+    UPDATE ledger_totals SET
+        total_bets = total_bets - 1,
+        finalized = finalized - (OLD.status IN ('ganhou', 'perdeu')),
+        wins = wins - (OLD.status = 'ganhou'),
+        total_invested = total_invested - CASE WHEN OLD.status IN ('ganhou', 'perdeu') THEN OLD.stake ELSE 0 END,
+        total_returned = total_returned - CASE WHEN OLD.status = 'ganhou' THEN OLD.stake * OLD.odd ELSE 0 END
+    WHERE id = 1;
+END;
+"""
+
+# closing_odd: NULL = ainda não resolvida, 0 = sem snapshot antes do jogo
+CLOSING_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_bets_closing_pending ON bets (kickoff)
+    WHERE closing_odd IS NULL AND kickoff IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS bets_clv_insert AFTER INSERT ON bets WHEN NEW.closing_odd > 0 BEGIN
+    UPDATE ledger_totals SET clv_count = clv_count + 1, clv_sum = clv_sum + NEW.odd / NEW.closing_odd - 1
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bets_clv_update AFTER UPDATE OF closing_odd, odd ON bets BEGIN
+    UPDATE ledger_totals SET
+        clv_count = clv_count - (COALESCE(OLD.closing_odd, 0) > 0) + (COALESCE(NEW.closing_odd, 0) > 0),
+        clv_sum = clv_sum
+            - CASE WHEN OLD.closing_odd > 0 THEN OLD.odd / OLD.closing_odd - 1 ELSE 0 END
+            + CASE WHEN NEW.closing_odd > 0 THEN NEW.odd / NEW.closing_odd - 1 ELSE 0 END
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS bets_clv_delete AFTER DELETE ON bets WHEN OLD.closing_odd > 0 BEGIN
+    UPDATE ledger_totals SET clv_count = clv_count - 1, clv_sum = clv_sum - (OLD.odd / OLD.closing_odd - 1)
+    WHERE id = 1;
+END;
+"""
+
+_REBUILD_TOTALS = """
+INSERT OR REPLACE INTO ledger_totals (id, total_bets, finalized, wins, total_invested, total_returned, clv_count, clv_sum)
+SELECT 1,
+    COUNT(*),
+    COALESCE(SUM(status IN ('ganhou', 'perdeu')), 0),
+    COALESCE(SUM(status = 'ganhou'), 0),
+    COALESCE(SUM(CASE WHEN status IN ('ganhou', 'perdeu') THEN stake ELSE 0 END), 0),
+    COALESCE(SUM(CASE WHEN status = 'ganhou' THEN stake * odd ELSE 0 END), 0),
+    COALESCE(SUM(closing_odd > 0), 0),
+    COALESCE(SUM(CASE WHEN closing_odd > 0 THEN odd / closing_odd - 1 ELSE 0 END), 0)
+FROM bets
+"""
+
+_SELECT_BETS = """
+SELECT id, timestamp, jogo, mercado, odd, stake, status, prob, ev, classification, market_key, event_id, kickoff,
+    closing_odd
+FROM bets
+"""
+
+
+def _filter_clause(statuses=None, market=None, date_from=None, date_to=None):
+    """Monta o WHERE dos filtros do histórico (datas inclusivas, objetos date)"""
+    conditions = []
+    params = []
+    if statuses:
+        conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if market:
+        conditions.append("mercado LIKE ?")
+        params.append(f"%{market}%")
+    if date_from:
+        conditions.append("timestamp >= ?")
+        params.append(date_from.strftime('%Y-%m-%d'))
+    if date_to:
+        conditions.append("timestamp < ?")
+        params.append((date_to + timedelta(days=1)).strftime('%Y-%m-%d'))
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    return where, params
+
+
+class BetLedger:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        rebuild = self._migrate()
+        self._connection.executescript(CLOSING_SCHEMA)
+        with self._connection:
+            if rebuild or self._connection.execute("SELECT 1 FROM ledger_totals WHERE id = 1").fetchone() is None:
+                self._connection.execute(_REBUILD_TOTALS)
+
+    def _migrate(self):
+        """Adiciona colunas novas em bancos criados por versões anteriores; True se os totais precisam ser refeitos"""
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(bets)")}
+        existing_totals = {row[1] for row in self._connection.execute("PRAGMA table_info(ledger_totals)")}
+        with self._connection:
+            for column, column_type in (('event_id', 'TEXT'), ('kickoff', 'TEXT'), ('closing_odd', 'REAL')):
+                if column not in existing:
+                    self._connection.execute(f"ALTER TABLE bets ADD COLUMN {column} {column_type}")
+            for column, column_type in (('clv_count', 'INTEGER'), ('clv_sum', 'REAL')):
+                if column not in existing_totals:
+                    self._connection.execute(
+                        f"ALTER TABLE ledger_totals ADD COLUMN {column} {column_type} NOT NULL DEFAULT 0"
+                    )
+        return 'clv_count' not in existing_totals
+
+    def close(self):
+        self._connection.close()
+
+    def save_bet(self, bet_data):
+        """Grava a aposta e retorna o id gerado pelo banco"""
+        status = bet_data.get('status', 'pendente')
+        if status not in BET_STATUSES:
+            raise ValueError(f"Status inválido: {status}")
+        timestamp = bet_data.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO bets (timestamp, jogo, mercado, odd, stake, status, prob, ev, classification, market_key, "
+                "event_id, kickoff) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    timestamp, bet_data['jogo'], bet_data['mercado'], float(bet_data['odd']),
+                    float(bet_data.get('stake', 0)), status, bet_data.get('prob'), bet_data.get('ev'),
+                    bet_data.get('classification'), bet_data.get('key'), bet_data.get('event_id'),
+                    bet_data.get('kickoff')
+                )
+            )
+        return cursor.lastrowid
+
+    def get_bet(self, bet_id):
+        with self._lock:
+            row = self._connection.execute(_SELECT_BETS + "WHERE id = ?", (bet_id,)).fetchone()
+        return dict(zip(BET_COLUMNS, row)) if row else None
+
+    def update_status(self, bet_id, new_status):
+        """Atualiza o status pela chave primária; retorna False se a aposta não existe"""
+        if new_status not in BET_STATUSES:
+            raise ValueError(f"Status inválido: {new_status}")
+        with self._lock, self._connection:
+            cursor = self._connection.execute("UPDATE bets SET status = ? WHERE id = ?", (new_status, bet_id))
+        return cursor.rowcount > 0
+
+    def bulk_update_status(self, bet_ids, new_status):
+        """Atualiza várias apostas numa única transação; retorna quantas mudaram"""
+        if new_status not in BET_STATUSES:
+            raise ValueError(f"Status inválido: {new_status}")
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                "UPDATE bets SET status = ? WHERE id = ?", [(new_status, bet_id) for bet_id in bet_ids]
+            )
+        return cursor.rowcount
+
+    def update_status_where(self, new_status, statuses=None, market=None, date_from=None, date_to=None):
+        """Atualiza todas as apostas que passam pelos filtros do histórico"""
+        if new_status not in BET_STATUSES:
+            raise ValueError(f"Status inválido: {new_status}")
+        where, params = _filter_clause(statuses, market, date_from, date_to)
+        with self._lock, self._connection:
+            cursor = self._connection.execute(f"UPDATE bets SET status = ? {where}", [new_status] + params)
+        return cursor.rowcount
+
+    def pending_closing(self, now=None):
+        """Apostas com kickoff até now ('YYYY-MM-DD HH:MM:SS' UTC, padrão agora) sem odd de fechamento resolvida"""
+        now = now or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            rows = self._connection.execute(
+                _SELECT_BETS + "WHERE closing_odd IS NULL AND kickoff IS NOT NULL AND kickoff <= ?", (now,)
+            ).fetchall()
+        return [dict(zip(BET_COLUMNS, row)) for row in rows]
+
+    def set_closing_odds(self, closing_odds):
+        """Grava {id: odd de fechamento} (0 = sem snapshot antes do jogo); retorna quantas mudaram"""
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                "UPDATE bets SET closing_odd = ? WHERE id = ?",
+                [(float(odd), bet_id) for bet_id, odd in closing_odds.items()]
+            )
+        return cursor.rowcount
+
+    def delete_bet(self, bet_id):
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM bets WHERE id = ?", (bet_id,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM bets")
+            self._connection.execute(_REBUILD_TOTALS)
+
+    def rebuild_totals(self):
+        """Recalcula os totais do zero (corrige eventual deriva de ponto flutuante)"""
+        with self._lock, self._connection:
+            self._connection.execute(_REBUILD_TOTALS)
+
+    def totals(self):
+        """Totais mantidos pelos triggers: apostas, finalizadas, vitórias, investido, retornado"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT total_bets, finalized, wins, total_invested, total_returned, clv_count, clv_sum "
+                "FROM ledger_totals WHERE id = 1"
+            ).fetchone()
+        return dict(zip(('total_bets', 'finalized', 'wins', 'total_invested', 'total_returned', 'clv_count', 'clv_sum'),
+                        row))
+
+    def list_bets(self):
+        """Todas as apostas em ordem de registro"""
+        with self._lock:
+            rows = self._connection.execute(_SELECT_BETS + "ORDER BY timestamp, id").fetchall()
+        return [dict(zip(BET_COLUMNS, row)) for row in rows]
+
+    def query_bets(self, statuses=None, market=None, date_from=None, date_to=None, limit=25, offset=0):
+        """Uma página do histórico filtrado, mais recentes primeiro"""
+        where, params = _filter_clause(statuses, market, date_from, date_to)
+        with self._lock:
+            rows = self._connection.execute(
+                _SELECT_BETS + where + "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(zip(BET_COLUMNS, row)) for row in rows]
+
+    def count_bets(self, statuses=None, market=None, date_from=None, date_to=None):
+        """Quantidade de apostas que passam pelos filtros"""
+        if not (statuses or market or date_from or date_to):
+            return self.count()
+        where, params = _filter_clause(statuses, market, date_from, date_to)
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM bets " + where, params).fetchone()[0]
+
+    def count(self):
+        return self.totals()['total_bets']
+
+    def calculate_roi(self, statuses=None, market=None, date_from=None, date_to=None):
+        """Retorna (roi %, lucro, taxa de acerto %) das apostas finalizadas que passam pelos filtros"""
+        if statuses or market or date_from or date_to:
+            where, params = _filter_clause(statuses, market, date_from, date_to)
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT COALESCE(SUM(status IN ('ganhou', 'perdeu')), 0), COALESCE(SUM(status = 'ganhou'), 0), "
+                    "COALESCE(SUM(CASE WHEN status IN ('ganhou', 'perdeu') THEN stake ELSE 0 END), 0), "
+                    "COALESCE(SUM(CASE WHEN status = 'ganhou' THEN stake * odd ELSE 0 END), 0) FROM bets " + where,
+                    params
+                ).fetchone()
+            totals = dict(zip(('finalized', 'wins', 'total_invested', 'total_returned'), row))
+        else:
+            totals = self.totals()
+        if not totals['finalized']:
+            return 0, 0, 0
+
+        profit = totals['total_returned'] - totals['total_invested']
+        roi = (profit / totals['total_invested'] * 100) if totals['total_invested'] > 0 else 0
+        win_rate = totals['wins'] / totals['finalized'] * 100
+        return roi, profit, win_rate
+
+    def average_clv(self):
+        """Retorna (CLV médio, apostas com odd de fechamento) pelos totais mantidos pelos triggers"""
+        totals = self.totals()
+        if not totals['clv_count']:
+            return None, 0
+        return totals['clv_sum'] / totals['clv_count'], totals['clv_count']
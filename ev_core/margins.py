@@ -0,0 +1,187 @@
+"""
+Melhor preço entre casas, margem e probabilidades justas
+
+Para cada jogo x casa x grupo de mercado completo (1X2, Over/Under 2.5,
+BTTS) calcula a margem (overround = Σ 1/odd - 1) e remove a margem por
+três métodos: proporcional, Shin e potência. Shin e potência resolvem
+uma equação por linha; as raízes saem de bisseção vetorizada sobre todas
+as linhas ao mesmo tempo. O consenso de cada jogo x mercado é a média
+das probabilidades justas das casas, e o modelo é sinalizado quando se
+afasta do consenso.
+"""
+import numpy as np
+
+from ev_core.odds_import import ODDS_MARKETS, match_fixtures
+
+MARKET_GROUPS = {
+    '1x2': ('home_win', 'draw', 'away_win'),
+    'over_under_2.5': ('over_2.5', 'under_2.5'),
+    'btts': ('btts_yes', 'btts_no'),
+}
+DEVIG_METHODS = ('proportional', 'shin', 'power')
+DISAGREEMENT_THRESHOLD = 0.05
+BISECTION_STEPS = 60
+
+_GROUP_NAMES = tuple(MARKET_GROUPS)
+_MARKET_GROUP = {market: _GROUP_NAMES.index(group) for group, markets in MARKET_GROUPS.items() for market in markets}
+_MARKET_POSITION = {market: position for markets in MARKET_GROUPS.values() for position, market in enumerate(markets)}
+_MAX_OUTCOMES = max(len(markets) for markets in MARKET_GROUPS.values())
+
+
+def devig_proportional(implied):
+    """implied: (linhas, resultados) com NaN nas posições não usadas"""
+    return implied / np.nansum(implied, axis=1, keepdims=True)
+
+
+def _bisect(function, low, high, steps=BISECTION_STEPS):
+    """Raiz de function (decrescente no parâmetro) em cada linha, com limites por linha"""
+    low = np.array(low, dtype=float)
+    high = np.array(high, dtype=float)
+    for _ in range(steps):
+        middle = (low + high) / 2
+        positive = function(middle) > 0
+        low = np.where(positive, middle, low)
+        high = np.where(positive, high, middle)
+    return (low + high) / 2
+
+
+def devig_power(implied):
+    """p = q^k com k por linha tal que Σ p = 1"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = _bisect(
+            lambda k: np.nansum(implied ** k[:, None], axis=1) - 1,
+            np.full(len(implied), 0.1), np.full(len(implied), 10.0)
+        )
+    return implied ** exponent[:, None]
+
+
+def shin_probabilities(implied, insider_share):
+    total = np.nansum(implied, axis=1, keepdims=True)
+    z = insider_share[:, None]
+    return (np.sqrt(z ** 2 + 4 * (1 - z) * implied ** 2 / total) - z) / (2 * (1 - z))
+
+
+def devig_shin(implied):
+    """Modelo de Shin: z (parcela de apostadores informados) por linha tal que Σ p = 1"""
+    insider_share = _bisect(
+        lambda z: np.nansum(shin_probabilities(implied, z), axis=1) - 1,
+        np.zeros(len(implied)), np.full(len(implied), 0.99)
+    )
+    return shin_probabilities(implied, insider_share)
+
+
+def book_margins(odds_table, fixture_keys):
+    """
+    Uma linha por jogo x casa x grupo de mercado com todas as odds do
+    grupo: overround e as probabilidades justas de cada método
+    Retorna (dict de colunas, índice da linha do grupo de cada odd ou -1)
+    """
+    group = np.array([_MARKET_GROUP[market] for market in odds_table.market], dtype=np.int64)
+    position = np.array([_MARKET_POSITION[market] for market in odds_table.market], dtype=np.int64)
+    _, fixture_code = np.unique(fixture_keys, return_inverse=True)
+    _, book_code = np.unique(odds_table.bookmaker.astype(str), return_inverse=True)
+    cells, cell = np.unique(np.stack([fixture_code, book_code, group], axis=1), axis=0, return_inverse=True)
+    cell = cell.ravel()
+
+    odds = np.full((len(cells), _MAX_OUTCOMES), np.nan)
+    np.fmax.at(odds, (cell, position), odds_table.odd)
+    sizes = np.array([len(MARKET_GROUPS[name]) for name in _GROUP_NAMES])[cells[:, 2]]
+    used = np.arange(_MAX_OUTCOMES)[None, :] < sizes[:, None]
+    complete = np.all(~np.isnan(odds) | ~used, axis=1)
+
+    odds, used, cells = odds[complete], used[complete], cells[complete]
+    implied = np.where(used, 1 / odds, np.nan)
+    representative = np.full(len(complete), -1, dtype=np.int64)
+    representative[np.flatnonzero(complete)] = np.arange(complete.sum())
+    row_cell = representative[cell]
+
+    sample_rows = np.zeros(len(cells), dtype=np.int64)
+    sample_rows[row_cell[row_cell >= 0]] = np.flatnonzero(row_cell >= 0)
+    return {
+        'fixture': np.asarray(fixture_keys, dtype=object)[sample_rows],
+        'bookmaker': odds_table.bookmaker[sample_rows],
+        'group': np.array(_GROUP_NAMES, dtype=object)[cells[:, 2]],
+        'odds': odds,
+        'overround': np.nansum(implied, axis=1) - 1,
+        'proportional': devig_proportional(implied),
+        'shin': devig_shin(implied),
+        'power': devig_power(implied),
+    }, row_cell
+
+
+def compare_prices(odds_table, round_prices=None, consensus_method='shin', threshold=DISAGREEMENT_THRESHOLD):
+    """
+    Uma linha por jogo x mercado: melhor odd e casa, número de casas,
+    margem média, probabilidade justa de consenso por método e, com
+    round_prices, a probabilidade do modelo, o EV no melhor preço e a
+    sinalização de divergência |modelo - consenso| > threshold
+    """
+    if round_prices is not None:
+        matched = match_fixtures(odds_table, round_prices)
+        fixture_keys = np.where(matched >= 0, matched.astype(str), '')
+        fixture_keys = np.array([
+            key if key else (f"{home}|{away}" if home and away else event_id)
+            for key, event_id, home, away in zip(fixture_keys, odds_table.event_id, odds_table.home_team, odds_table.away_team)
+        ], dtype=object)
+    else:
+        matched = np.full(len(odds_table.odd), -1)
+        fixture_keys = np.array([
+            f"{home}|{away}" if home and away else event_id
+            for event_id, home, away in zip(odds_table.event_id, odds_table.home_team, odds_table.away_team)
+        ], dtype=object)
+
+    margins, row_cell = book_margins(odds_table, fixture_keys)
+    position = np.array([_MARKET_POSITION[market] for market in odds_table.market], dtype=np.int64)
+
+    fixture_market = np.char.add(np.char.add(fixture_keys.astype(str), '#'), odds_table.market.astype(str))
+    _, pair_first, pair = np.unique(fixture_market, return_index=True, return_inverse=True)
+    pair = pair.ravel()
+    pair_count = len(pair_first)
+
+    order = np.lexsort((-odds_table.odd, pair))
+    best_rows = order[np.concatenate(([True], pair[order][1:] != pair[order][:-1]))]
+
+    # Uma contribuição por casa: linhas repetidas da mesma casa contam uma vez
+    complete_rows = np.flatnonzero(row_cell >= 0)
+    _, unique_positions = np.unique(
+        pair[complete_rows] * max(len(margins['overround']), 1) + row_cell[complete_rows], return_index=True
+    )
+    book_rows = complete_rows[unique_positions]
+    books = np.bincount(pair[book_rows], minlength=pair_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        consensus = {
+            method: np.bincount(pair[book_rows], margins[method][row_cell[book_rows], position[book_rows]], pair_count) / books
+            for method in DEVIG_METHODS
+        }
+        overround = np.bincount(pair[book_rows], margins['overround'][row_cell[book_rows]], pair_count) / books
+
+    result = {
+        'event_id': odds_table.event_id[pair_first],
+        'home_team': odds_table.home_team[pair_first],
+        'away_team': odds_table.away_team[pair_first],
+        'market': odds_table.market[pair_first],
+        'best_odd': odds_table.odd[best_rows],
+        'best_bookmaker': odds_table.bookmaker[best_rows],
+        'books': books,
+        'overround': overround,
+        **{f'fair_{method}': values for method, values in consensus.items()},
+    }
+    result['fair_odd'] = 1 / result[f'fair_{consensus_method}']
+
+    if round_prices is not None:
+        rows = matched[pair_first]
+        has_model = rows >= 0
+        probability = np.full(pair_count, np.nan)
+        # Sem jogos precificados (rodada vazia) nada casa e as colunas do modelo ficam NaN
+        if has_model.any():
+            market_index = np.array([ODDS_MARKETS.index(market) for market in result['market']], dtype=np.int64)
+            probability_matrix = np.stack([np.asarray(round_prices[market], dtype=float) for market in ODDS_MARKETS], axis=1)
+            probability[has_model] = probability_matrix[rows[has_model], market_index[has_model]]
+            for column in ('home_team', 'away_team', 'event_id'):
+                result[column] = np.where(has_model, np.asarray(round_prices[column], dtype=object)[np.maximum(rows, 0)],
+                                          result[column])
+        result['model_probability'] = probability
+        result['ev'] = probability * result['best_odd'] - 1
+        result['disagreement'] = probability - result[f'fair_{consensus_method}']
+        result['flag'] = np.abs(result['disagreement']) > threshold
+    return result
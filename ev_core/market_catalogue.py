@@ -0,0 +1,270 @@
+"""
+Catálogo completo de mercados a partir de uma única matriz de placares
+
+Um só produto matricial projeta a matriz nas distribuições de gols da
+casa, do visitante, do total e da diferença (casa - fora); depois disso
+todo mercado é uma consulta a somas acumuladas dessas distribuições:
+over/under e totais asiáticos saem da acumulada do total, handicaps,
+dupla chance, empate anula e margem de vitória da acumulada da
+diferença, e totais por time das marginais. Incluir linhas custa O(G)
+por linha, nunca outra passada sobre a matriz.
+
+Mercados com devolução (linhas inteiras, quartos de linha e empate
+anula) são reportados pela probabilidade efetiva W / (W + L), com W e L
+as chances médias de ganho e perda das duas metades da aposta: 1/p é a
+odd justa e calculate_ev(p, odd) tem o mesmo sinal do EV real.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from ev_core.score_matrix import MARKET_ALIASES, MARKET_KEYS
+from ev_core.score_matrix import market_cells as base_market_cells
+
+TOTAL_LINES = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5)
+ASIAN_TOTAL_LINES = tuple(line for line in np.arange(0.75, 5.51, 0.25).round(2) if line % 1 != 0.5)
+HANDICAP_LINES = tuple(np.arange(-3.0, 3.01, 0.25).round(2))
+TEAM_TOTAL_LINES = (0.5, 1.5, 2.5, 3.5)
+CORRECT_SCORE_MAX = 4
+MARGIN_MAX = 3
+
+
+def _line_text(line):
+    return f"{line:+g}" if line else "0"
+
+
+def _catalogue_keys():
+    """Chaves do catálogo em ordem de exibição, agrupadas por tipo de mercado"""
+    keys = {
+        'Resultado': ['home_win', 'draw', 'away_win'],
+        'Dupla Chance': ['dc_1x', 'dc_x2', 'dc_12'],
+        'Empate Anula': ['dnb_home', 'dnb_away'],
+        'Gols': [f'{side}_{line:g}' for line in TOTAL_LINES for side in ('over', 'under')],
+        'Gols Asiático': [f'asian_{side}_{line:g}' for line in ASIAN_TOTAL_LINES for side in ('over', 'under')],
+        'Handicap Asiático': [f'ah_{side}_{_line_text(line)}' for line in HANDICAP_LINES for side in ('home', 'away')],
+        'Ambas Marcam': ['btts_yes', 'btts_no'],
+        'Gols por Time': [f'{team}_{side}_{line:g}' for team in ('home', 'away')
+                          for line in TEAM_TOTAL_LINES for side in ('over', 'under')],
+        'Margem': [f'margin_home_{goals}' for goals in range(1, MARGIN_MAX)] + [f'margin_home_{MARGIN_MAX}+']
+                  + [f'margin_away_{goals}' for goals in range(1, MARGIN_MAX)] + [f'margin_away_{MARGIN_MAX}+'],
+        'Placar Exato': [f'cs_{home}-{away}' for home in range(CORRECT_SCORE_MAX + 1)
+                         for away in range(CORRECT_SCORE_MAX + 1)] + ['cs_other'],
+    }
+    return keys
+
+
+CATALOGUE_GROUPS = _catalogue_keys()
+CATALOGUE_KEYS = tuple(key for group in CATALOGUE_GROUPS.values() for key in group)
+
+
+@lru_cache(maxsize=None)
+def _projection(max_goals):
+    """
+    Matriz (células x distribuições) que leva a matriz achatada em
+    [gols casa | gols fora | total 0..2G | diferença -G..G] num só produto
+    """
+    size = max_goals + 1
+    home_goals, away_goals = (goals.ravel() for goals in np.indices((size, size)))
+    width = 2 * size + 2 * (2 * max_goals + 1)
+    projection = np.zeros((size * size, width))
+    cells = np.arange(size * size)
+    projection[cells, home_goals] = 1
+    projection[cells, size + away_goals] = 1
+    projection[cells, 2 * size + home_goals + away_goals] = 1
+    projection[cells, 2 * size + (2 * max_goals + 1) + home_goals - away_goals + max_goals] = 1
+    return projection
+
+
+def goal_distributions(probability_matrix):
+    """(gols casa, gols fora, total 0..2G, diferença -G..G) de uma matriz ou lote de matrizes"""
+    probability_matrix = np.asarray(probability_matrix, dtype=float)
+    size = probability_matrix.shape[-1]
+    max_goals = size - 1
+    flat = probability_matrix.reshape(probability_matrix.shape[:-2] + (size * size,))
+    projected = flat @ _projection(max_goals)
+    span = 2 * max_goals + 1
+    return (
+        projected[..., :size], projected[..., size:2 * size],
+        projected[..., 2 * size:2 * size + span], projected[..., 2 * size + span:]
+    )
+
+
+def _cdf_at(cdf, values, offset):
+    """F(valor) para valores inteiros, com 0 abaixo do suporte e 1 acima"""
+    values = np.asarray(values, dtype=np.int64) - offset
+    clipped = np.clip(values, 0, cdf.shape[-1] - 1)
+    return np.where(values < 0, 0.0, np.where(values >= cdf.shape[-1], 1.0, cdf[..., clipped]))
+
+
+def _over_outcomes(cdf, offset, lines):
+    """
+    (ganho, perda) médios de "acima da linha" para cada linha, dividindo
+    quartos de linha nas duas linhas vizinhas
+    Componente c: ganho = P(X > c) = 1 - F(piso c), perda = P(X < c) = F(teto c - 1)
+    """
+    lines = np.asarray(lines, dtype=float)
+    quarter = (lines * 4) % 2 == 1
+    components = np.stack([np.where(quarter, lines - 0.25, lines), np.where(quarter, lines + 0.25, lines)])
+    wins = 1 - _cdf_at(cdf, np.floor(components).ravel(), offset)
+    losses = _cdf_at(cdf, np.ceil(components).ravel() - 1, offset)
+    shape = cdf.shape[:-1] + components.shape
+    wins = wins.reshape(shape).mean(axis=-2)
+    losses = losses.reshape(shape).mean(axis=-2)
+    return wins, losses
+
+
+def _effective_probability(wins, losses):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return wins / (wins + losses)
+
+
+def market_catalogue(probability_matrix):
+    """
+    Todas as chaves de CATALOGUE_KEYS a partir da matriz de placares
+    Matriz 2D retorna floats; lote (n, G, G) retorna arrays de tamanho n
+    """
+    probability_matrix = np.asarray(probability_matrix, dtype=float)
+    max_goals = probability_matrix.shape[-1] - 1
+    home_pmf, away_pmf, total_pmf, difference_pmf = goal_distributions(probability_matrix)
+    home_cdf, away_cdf = np.cumsum(home_pmf, axis=-1), np.cumsum(away_pmf, axis=-1)
+    total_cdf, difference_cdf = np.cumsum(total_pmf, axis=-1), np.cumsum(difference_pmf, axis=-1)
+    markets = {}
+
+    home_lose_or_draw = _cdf_at(difference_cdf, [0], -max_goals)[..., 0]
+    away_win = _cdf_at(difference_cdf, [-1], -max_goals)[..., 0]
+    markets['home_win'] = 1 - home_lose_or_draw
+    markets['draw'] = home_lose_or_draw - away_win
+    markets['away_win'] = away_win
+    markets['dc_1x'] = 1 - away_win
+    markets['dc_x2'] = home_lose_or_draw
+    markets['dc_12'] = 1 - markets['draw']
+    markets['dnb_home'] = _effective_probability(markets['home_win'], away_win)
+    markets['dnb_away'] = _effective_probability(away_win, markets['home_win'])
+
+    wins, losses = _over_outcomes(total_cdf, 0, TOTAL_LINES)
+    for column, line in enumerate(TOTAL_LINES):
+        markets[f'over_{line:g}'] = wins[..., column]
+        markets[f'under_{line:g}'] = losses[..., column]
+
+    wins, losses = _over_outcomes(total_cdf, 0, ASIAN_TOTAL_LINES)
+    for column, line in enumerate(ASIAN_TOTAL_LINES):
+        markets[f'asian_over_{line:g}'] = _effective_probability(wins[..., column], losses[..., column])
+        markets[f'asian_under_{line:g}'] = _effective_probability(losses[..., column], wins[..., column])
+
+    # Casa com handicap h vence se D + h > 0 (D acima de -h); visitante com h vence se D < h
+    wins, losses = _over_outcomes(difference_cdf, -max_goals, -np.asarray(HANDICAP_LINES))
+    away_losses, away_wins = _over_outcomes(difference_cdf, -max_goals, HANDICAP_LINES)
+    for column, line in enumerate(HANDICAP_LINES):
+        markets[f'ah_home_{_line_text(line)}'] = _effective_probability(wins[..., column], losses[..., column])
+        markets[f'ah_away_{_line_text(line)}'] = _effective_probability(away_wins[..., column], away_losses[..., column])
+
+    zero_zero = probability_matrix[..., 0, 0]
+    markets['btts_yes'] = 1 - home_pmf[..., 0] - away_pmf[..., 0] + zero_zero
+    markets['btts_no'] = 1 - markets['btts_yes']
+
+    for team, cdf in (('home', home_cdf), ('away', away_cdf)):
+        wins, losses = _over_outcomes(cdf, 0, TEAM_TOTAL_LINES)
+        for column, line in enumerate(TEAM_TOTAL_LINES):
+            markets[f'{team}_over_{line:g}'] = wins[..., column]
+            markets[f'{team}_under_{line:g}'] = losses[..., column]
+
+    for goals in range(1, MARGIN_MAX):
+        markets[f'margin_home_{goals}'] = difference_pmf[..., max_goals + goals]
+        markets[f'margin_away_{goals}'] = difference_pmf[..., max_goals - goals]
+    markets[f'margin_home_{MARGIN_MAX}+'] = 1 - _cdf_at(difference_cdf, [MARGIN_MAX - 1], -max_goals)[..., 0]
+    markets[f'margin_away_{MARGIN_MAX}+'] = _cdf_at(difference_cdf, [-MARGIN_MAX], -max_goals)[..., 0]
+
+    shown = min(CORRECT_SCORE_MAX, max_goals - 1)
+    correct_scores = 0
+    for home in range(CORRECT_SCORE_MAX + 1):
+        for away in range(CORRECT_SCORE_MAX + 1):
+            cell = probability_matrix[..., home, away] if home <= shown and away <= shown else \
+                np.zeros(probability_matrix.shape[:-2])
+            markets[f'cs_{home}-{away}'] = cell
+            correct_scores = correct_scores + cell
+    markets['cs_other'] = 1 - correct_scores
+
+    if probability_matrix.ndim == 2:
+        return {key: float(markets[key]) for key in CATALOGUE_KEYS}
+    return {key: markets[key] for key in CATALOGUE_KEYS}
+
+
+def has_push(market_key):
+    """Mercados com devolução não viram máscara de placares (parlay/carteira)"""
+    if market_key.startswith('dnb_'):
+        return True
+    if market_key.startswith(('asian_', 'ah_')):
+        line = float(market_key.rsplit('_', 1)[1])
+        return (line * 2) % 2 != 1
+    return False
+
+
+def market_cells(market_key, max_goals):
+    """
+    Máscara booleana (gols_casa, gols_fora) de qualquer mercado sem
+    devolução do catálogo; os mercados básicos seguem score_matrix
+    """
+    market_key = MARKET_ALIASES.get(market_key, market_key)
+    if market_key in MARKET_KEYS or market_key in ('under_2.5', 'btts_no'):
+        return base_market_cells(market_key, max_goals)
+    if has_push(market_key):
+        raise ValueError(f"Mercado com devolução não tem máscara de placares: {market_key}")
+
+    home_goals, away_goals = np.indices((max_goals + 1, max_goals + 1))
+    difference, total = home_goals - away_goals, home_goals + away_goals
+    parts = market_key.split('_')
+    if market_key == 'dc_1x':
+        return difference >= 0
+    if market_key == 'dc_x2':
+        return difference <= 0
+    if market_key == 'dc_12':
+        return difference != 0
+    if parts[0] in ('over', 'under'):
+        return total > float(parts[1]) if parts[0] == 'over' else total < float(parts[1])
+    if parts[0] in ('asian', 'ah'):
+        line = float(parts[2])
+        if parts[0] == 'asian':
+            return total > line if parts[1] == 'over' else total < line
+        return difference + line > 0 if parts[1] == 'home' else -difference + line > 0
+    if parts[0] in ('home', 'away') and len(parts) == 3:
+        goals = home_goals if parts[0] == 'home' else away_goals
+        return goals > float(parts[2]) if parts[1] == 'over' else goals < float(parts[2])
+    if parts[0] == 'margin':
+        margin = difference if parts[1] == 'home' else -difference
+        if parts[2].endswith('+'):
+            return margin >= int(parts[2][:-1])
+        return margin == int(parts[2])
+    if parts[0] == 'cs':
+        if parts[1] == 'other':
+            return (home_goals > CORRECT_SCORE_MAX) | (away_goals > CORRECT_SCORE_MAX)
+        home, away = (int(goals) for goals in parts[1].split('-'))
+        return (home_goals == home) & (away_goals == away)
+    raise ValueError(f"Mercado desconhecido: {market_key}")
+
+
+def catalogue_label(market_key, home_team, away_team):
+    """Rótulo em português de uma chave do catálogo"""
+    parts = market_key.split('_')
+    team = {'home': home_team, 'away': away_team}
+    if market_key in ('home_win', 'draw', 'away_win'):
+        return {'home_win': f'Vitória {home_team}', 'draw': 'Empate', 'away_win': f'Vitória {away_team}'}[market_key]
+    if parts[0] == 'dc':
+        return {'dc_1x': f'{home_team} ou Empate', 'dc_x2': f'Empate ou {away_team}',
+                'dc_12': f'{home_team} ou {away_team}'}[market_key]
+    if parts[0] == 'dnb':
+        return f'Empate Anula - {team[parts[1]]}'
+    if parts[0] in ('over', 'under'):
+        return f"{'Mais' if parts[0] == 'over' else 'Menos'} de {parts[1]}"
+    if parts[0] == 'asian':
+        return f"{'Mais' if parts[1] == 'over' else 'Menos'} de {parts[2]} (asiático)"
+    if parts[0] == 'ah':
+        return f'{team[parts[1]]} {parts[2]}'
+    if parts[0] == 'btts':
+        return 'Ambas Marcam - Sim' if parts[1] == 'yes' else 'Ambas Marcam - Não'
+    if parts[0] in ('home', 'away'):
+        return f"{team[parts[0]]} {'Mais' if parts[1] == 'over' else 'Menos'} de {parts[2]} gols"
+    if parts[0] == 'margin':
+        return f'{team[parts[1]]} por {parts[2]} gol' + ('s' if parts[2] != '1' else '')
+    if parts[0] == 'cs':
+        return 'Outro placar' if parts[1] == 'other' else f"Placar {parts[1].replace('-', ' x ')}"
+    return market_key
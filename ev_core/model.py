@@ -0,0 +1,80 @@
+"""
+Modelo de gols esperados e ajuste por confrontos diretos
+
+As funções de ajuste trabalham tanto com floats quanto com arrays, para
+que a análise de um jogo e a precificação da rodada usem a mesma conta.
+"""
+import numpy as np
+
+H2H_WEIGHT = 0.15
+MIN_H2H_GAMES = 2
+
+
+def expected_goals(home_statistics, away_statistics):
+    """Média entre gols marcados de um time e sofridos do adversário"""
+    expected_home_goals = (home_statistics['scored_average'] + away_statistics['conceded_average']) / 2
+    expected_away_goals = (away_statistics['scored_average'] + home_statistics['conceded_average']) / 2
+    return expected_home_goals, expected_away_goals
+
+
+def count_h2h_results(h2h_data, home_team):
+    """Conta (vitórias do mandante, empates, vitórias do visitante) nos confrontos"""
+    h2h_home_wins = 0
+    h2h_draws = 0
+    h2h_away_wins = 0
+
+    for match in h2h_data:
+        if match['score_home'] > match['score_away']:
+            if match['home'] == home_team:
+                h2h_home_wins += 1
+            else:
+                h2h_away_wins += 1
+        elif match['score_home'] < match['score_away']:
+            if match['away'] == home_team:
+                h2h_home_wins += 1
+            else:
+                h2h_away_wins += 1
+        else:
+            h2h_draws += 1
+
+    return h2h_home_wins, h2h_draws, h2h_away_wins
+
+
+def blend_with_h2h(base_prob_home, base_prob_draw, base_prob_away, h2h_home_wins, h2h_draws, h2h_away_wins,
+                   h2h_weight=H2H_WEIGHT):
+    """
+    Versão vetorizada do ajuste por H2H (peso 15% H2H, 85% estatísticas)
+    Jogos com menos de 2 confrontos mantêm as probabilidades base
+    """
+    base = np.stack(np.broadcast_arrays(
+        np.asarray(base_prob_home, dtype=float),
+        np.asarray(base_prob_draw, dtype=float),
+        np.asarray(base_prob_away, dtype=float)
+    ))
+    counts = np.stack(np.broadcast_arrays(
+        np.asarray(h2h_home_wins, dtype=float),
+        np.asarray(h2h_draws, dtype=float),
+        np.asarray(h2h_away_wins, dtype=float)
+    ))
+    total_h2h = counts.sum(axis=0)
+    h2h_probs = counts / np.maximum(total_h2h, 1)
+
+    adjusted = base * (1 - h2h_weight) + h2h_probs * h2h_weight
+    adjusted = adjusted / adjusted.sum(axis=0)
+    adjusted = np.where(total_h2h >= MIN_H2H_GAMES, adjusted, base)
+    return adjusted[0], adjusted[1], adjusted[2]
+
+
+def adjust_probability_with_h2h(base_prob_home, base_prob_draw, base_prob_away, h2h_data, home_team,
+                                h2h_weight=H2H_WEIGHT):
+    """
+    Ajusta probabilidades baseado em confrontos diretos
+    Peso: 15% H2H, 85% estatísticas gerais
+    """
+    if not h2h_data or len(h2h_data) < MIN_H2H_GAMES:
+        return base_prob_home, base_prob_draw, base_prob_away
+
+    adjusted = blend_with_h2h(
+        base_prob_home, base_prob_draw, base_prob_away, *count_h2h_results(h2h_data, home_team), h2h_weight=h2h_weight
+    )
+    return tuple(float(value) for value in adjusted)
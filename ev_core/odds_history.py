@@ -0,0 +1,261 @@
+"""
+Série temporal de odds (somente inserção) e closing line value
+
+Cada cotação vira um snapshot (série, instante, odd) numa tabela SQLite
+WITHOUT ROWID com chave (série, instante): fixture/mercado/casa ficam
+numa tabela de séries e cada snapshot ocupa só inteiros (epoch em
+segundos e odd em milésimos). Só mudanças de preço são gravadas, então
+reimportar o mesmo arquivo não cresce o banco, e consultas por intervalo
+ou "último preço antes do jogo" são buscas na chave primária.
+Triggers impedem UPDATE/DELETE dos snapshots.
+
+O CLV de uma aposta é odd da aposta / odd de fechamento - 1, com o
+fechamento sendo a média das casas no último snapshot de cada uma antes
+do início do jogo.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from ev_core.odds_import import match_fixtures
+from ev_core.score_matrix import MARKET_ALIASES
+
+DEFAULT_HISTORY_PATH = os.environ.get('EV_ODDS_HISTORY_PATH', os.path.join('data', 'odds_history.db'))
+
+ODD_SCALE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS odds_series (
+    id INTEGER PRIMARY KEY,
+    fixture TEXT NOT NULL,
+    market TEXT NOT NULL,
+    bookmaker TEXT NOT NULL,
+    UNIQUE (fixture, market, bookmaker)
+);
+
+CREATE TABLE IF NOT EXISTS odds_snapshots (
+    series_id INTEGER NOT NULL,
+    captured_at INTEGER NOT NULL,
+    odd INTEGER NOT NULL,
+    PRIMARY KEY (series_id, captured_at)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS odds_snapshots_no_update BEFORE UPDATE ON odds_snapshots BEGIN
+    SELECT RAISE(ABORT, 'odds_snapshots é somente inserção');
+END;
+
+CREATE TRIGGER IF NOT EXISTS odds_snapshots_no_delete BEFORE DELETE ON odds_snapshots BEGIN
+    SELECT RAISE(ABORT, 'odds_snapshots é somente inserção');
+END;
+"""
+
+_LATEST = """
+SELECT series_id, MAX(captured_at), odd FROM odds_snapshots GROUP BY series_id
+"""
+
+
+def to_epoch(value):
+    """Epoch em segundos de datetime, número ou texto ISO (sem fuso = UTC)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def event_kickoff(event):
+    """Início do jogo em UTC ('AAAA-MM-DD HH:MM:SS'); só a data vira meia-noite"""
+    timestamp = event.get('strTimestamp')
+    if not timestamp and event.get('dateEvent'):
+        timestamp = f"{event['dateEvent']} {event.get('strTime') or '00:00:00'}"
+    if not timestamp:
+        return None
+    try:
+        kickoff = datetime.fromisoformat(str(timestamp).strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if kickoff.tzinfo is not None:
+        kickoff = kickoff.astimezone(timezone.utc)
+    return kickoff.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def find_fixture(season_index, home_team, away_team):
+    """event_id e kickoff do próximo jogo pendente do confronto (dict vazio se não houver)"""
+    home_id = season_index.team_ids.get(home_team)
+    away_id = season_index.team_ids.get(away_team)
+    if home_id is None or away_id is None:
+        return {}
+    for row in season_index.upcoming_rows:
+        if season_index.home_ids[row] == home_id and season_index.away_ids[row] == away_id:
+            return {'event_id': season_index.event_ids[row], 'kickoff': event_kickoff(season_index.events[row])}
+    return {}
+
+
+def fixture_key(event_id, home_team, away_team):
+    """Chave da série: event_id quando conhecido, senão 'Casa vs Fora'"""
+    if event_id:
+        return event_id
+    return f"{home_team} vs {away_team}" if home_team and away_team else ''
+
+
+class OddsHistory:
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        # (fixture, mercado) -> {casa: id da série}
+        self._series = {}
+        for series_id, fixture, market, bookmaker in self._connection.execute(
+                "SELECT id, fixture, market, bookmaker FROM odds_series"):
+            self._series.setdefault((fixture, market), {})[bookmaker] = series_id
+        self._latest = {
+            series_id: (captured_at, odd) for series_id, captured_at, odd in self._connection.execute(_LATEST)
+        }
+
+    def close(self):
+        self._connection.close()
+
+    def _series_id(self, fixture, market, bookmaker):
+        books = self._series.setdefault((fixture, market), {})
+        series_id = books.get(bookmaker)
+        if series_id is None:
+            # outro processo pode ter criado a série depois do cache deste ser carregado
+            self._connection.execute(
+                "INSERT OR IGNORE INTO odds_series (fixture, market, bookmaker) VALUES (?, ?, ?)",
+                (fixture, market, bookmaker)
+            )
+            series_id = self._connection.execute(
+                "SELECT id FROM odds_series WHERE fixture = ? AND market = ? AND bookmaker = ?",
+                (fixture, market, bookmaker)
+            ).fetchone()[0]
+            books[bookmaker] = series_id
+        return series_id
+
+    def record(self, rows, captured_at=None):
+        """
+        Grava [(fixture, mercado, casa, odd)] no instante informado (agora
+        por padrão); odds iguais à última da série são ignoradas
+        Retorna quantos snapshots foram inseridos
+        """
+        captured_at = to_epoch(captured_at) if captured_at is not None else int(time.time())
+        inserted = 0
+        with self._lock, self._connection:
+            for fixture, market, bookmaker, odd in rows:
+                if not fixture or not np.isfinite(odd):
+                    continue
+                market = MARKET_ALIASES.get(market, market)
+                series_id = self._series_id(str(fixture), market, str(bookmaker or ''))
+                scaled_odd = int(round(float(odd) * ODD_SCALE))
+                latest = self._latest.get(series_id)
+                if latest is not None and latest[0] <= captured_at and latest[1] == scaled_odd:
+                    continue
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO odds_snapshots (series_id, captured_at, odd) VALUES (?, ?, ?)",
+                    (series_id, captured_at, scaled_odd)
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                    if latest is None or latest[0] <= captured_at:
+                        self._latest[series_id] = (captured_at, scaled_odd)
+        return inserted
+
+    def record_table(self, odds_table, round_prices=None, captured_at=None):
+        """Grava um OddsTable importado, usando o event_id do jogo casado em round_prices quando houver"""
+        event_ids = np.asarray(odds_table.event_id, dtype=object)
+        if round_prices is not None and len(round_prices['event_id']):
+            rows = match_fixtures(odds_table, round_prices)
+            matched = rows >= 0
+            event_ids = event_ids.copy()
+            event_ids[matched] = np.asarray(round_prices['event_id'], dtype=object)[rows[matched]]
+        return self.record(
+            (
+                (fixture_key(event_id, home, away), market, bookmaker, odd)
+                for event_id, home, away, market, bookmaker, odd in zip(
+                    event_ids, odds_table.home_team, odds_table.away_team,
+                    odds_table.market, odds_table.bookmaker, odds_table.odd
+                )
+            ),
+            captured_at
+        )
+
+    def series(self, fixture, market, bookmaker=None, start=None, end=None):
+        """
+        Snapshots de um fixture x mercado (todas as casas ou uma) no
+        intervalo [start, end], em ordem de casa e instante
+        Retorna colunas: bookmaker, captured_at (datetime64[s]) e odd
+        """
+        conditions = ["s.fixture = ?", "s.market = ?"]
+        params = [fixture, MARKET_ALIASES.get(market, market)]
+        if bookmaker is not None:
+            conditions.append("s.bookmaker = ?")
+            params.append(bookmaker)
+        if start is not None:
+            conditions.append("o.captured_at >= ?")
+            params.append(to_epoch(start))
+        if end is not None:
+            conditions.append("o.captured_at <= ?")
+            params.append(to_epoch(end))
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT s.bookmaker, o.captured_at, o.odd FROM odds_series s "
+                "JOIN odds_snapshots o ON o.series_id = s.id "
+                f"WHERE {' AND '.join(conditions)} ORDER BY s.bookmaker, o.captured_at",
+                params
+            ).fetchall()
+        return {
+            'bookmaker': np.array([row[0] for row in rows], dtype=object),
+            'captured_at': np.array([row[1] for row in rows], dtype='datetime64[s]'),
+            'odd': np.array([row[2] for row in rows], dtype=float) / ODD_SCALE,
+        }
+
+    def _closing_odd(self, fixture, market, kickoff, bookmaker=None):
+        # Séries lidas do banco, não do cache: outro processo pode ter criado as casas
+        conditions = ["s.fixture = ?", "s.market = ?"]
+        params = [kickoff, fixture, market]
+        if bookmaker is not None:
+            conditions.append("s.bookmaker = ?")
+            params.append(bookmaker)
+        closing = self._connection.execute(
+            "SELECT AVG(closing) FROM (SELECT ("
+            "SELECT o.odd FROM odds_snapshots o WHERE o.series_id = s.id AND o.captured_at < ? "
+            "ORDER BY o.captured_at DESC LIMIT 1"
+            f") AS closing FROM odds_series s WHERE {' AND '.join(conditions)})",
+            params
+        ).fetchone()[0]
+        return closing / ODD_SCALE if closing is not None else None
+
+    def closing_odd(self, fixture, market, kickoff, bookmaker=None):
+        """Média das casas (ou só a casa informada) no último snapshot antes do kickoff"""
+        with self._lock:
+            return self._closing_odd(fixture, MARKET_ALIASES.get(market, market), to_epoch(kickoff), bookmaker)
+
+    def closing_line_value(self, bets):
+        """
+        {id da aposta: (odd de fechamento, CLV)} para apostas do histórico
+        com kickoff e mercado conhecidos e algum snapshot antes do jogo
+        """
+        results = {}
+        with self._lock:
+            for bet in bets:
+                if not bet.get('kickoff') or not bet.get('key'):
+                    continue
+                market = MARKET_ALIASES.get(bet['key'], bet['key'])
+                kickoff = to_epoch(bet['kickoff'])
+                closing = self._closing_odd(bet.get('event_id'), market, kickoff)
+                if closing is None:
+                    closing = self._closing_odd(bet.get('jogo'), market, kickoff)
+                if closing is not None:
+                    results[bet['id']] = (closing, bet['odd'] / closing - 1)
+        return results
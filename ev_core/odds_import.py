@@ -0,0 +1,166 @@
+"""
+Importação de odds em lote
+
+Lê um arquivo CSV ou JSON com uma linha por jogo x mercado x casa
+(colunas event_id e/ou home_team/away_team, market, bookmaker, odd),
+junta com as probabilidades do modelo para todos os jogos e calcula EV,
+Kelly e classificação de todas as linhas numa única passada vetorizada.
+"""
+import csv
+import io
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from ev_core.betting import CLASSIFICATIONS, KELLY_CAP, calculate_ev_array, calculate_kelly_array, classify_bet_array
+from ev_core.score_matrix import MARKET_ALIASES
+
+ODDS_MARKETS = ('home_win', 'draw', 'away_win', 'over_2.5', 'under_2.5', 'btts_yes', 'btts_no')
+
+# Chave curta de cada mercado no histórico de apostas
+MARKET_BET_KEYS = {
+    'home_win': 'home', 'draw': 'draw', 'away_win': 'away', 'over_2.5': 'over', 'under_2.5': 'under',
+    'btts_yes': 'btts_yes', 'btts_no': 'btts_no',
+}
+
+
+def market_label(market, home_team, away_team):
+    """Mesmo rótulo de mercado usado nas apostas digitadas na análise"""
+    return {
+        'home_win': f'Vitória {home_team}', 'draw': 'Empate', 'away_win': f'Vitória {away_team}',
+        'over_2.5': 'Mais de 2.5', 'under_2.5': 'Menos de 2.5',
+        'btts_yes': 'Ambas Marcam - Sim', 'btts_no': 'Ambas Marcam - Não',
+    }[market]
+
+
+OddsTable = namedtuple('OddsTable', ['event_id', 'home_team', 'away_team', 'market', 'bookmaker', 'odd'])
+
+_FIELD_ALIASES = {
+    'idevent': 'event_id', 'event': 'event_id', 'jogo_id': 'event_id',
+    'home': 'home_team', 'casa': 'home_team', 'strhometeam': 'home_team',
+    'away': 'away_team', 'fora': 'away_team', 'visitante': 'away_team', 'strawayteam': 'away_team',
+    'mercado': 'market', 'casa_de_apostas': 'bookmaker', 'book': 'bookmaker', 'price': 'odd', 'odds': 'odd',
+}
+
+
+def normalize_fields(row):
+    """Nomes de coluna em minúsculas com os sinônimos aceitos (casa, fora, price...) resolvidos"""
+    return {_FIELD_ALIASES.get(str(key).strip().lower(), str(key).strip().lower()): value for key, value in row.items()}
+
+
+def normalize_market(market):
+    """Aceita chaves do modelo, chaves curtas do app e variações simples (ex: 'Over 2.5', 'BTTS Yes')"""
+    key = str(market or '').strip().lower().replace(' ', '_').replace('-', '_')
+    key = {'1': 'home_win', 'x': 'draw', '2': 'away_win', 'over_25': 'over_2.5', 'under_25': 'under_2.5',
+           'btts': 'btts_yes', 'btts_sim': 'btts_yes', 'btts_nao': 'btts_no', 'btts_não': 'btts_no'}.get(key, key)
+    key = MARKET_ALIASES.get(key, key)
+    return key if key in ODDS_MARKETS else None
+
+
+def _parse_odd(value):
+    try:
+        odd = float(str(value).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return np.nan
+    return odd if odd > 1 else np.nan
+
+
+def parse_odds_rows(rows):
+    """
+    Converte dicts (linhas do arquivo) numa OddsTable; linhas com mercado
+    desconhecido, odd inválida ou sem identificação do jogo são descartadas
+    Retorna (tabela, quantidade descartada)
+    """
+    columns = {field: [] for field in OddsTable._fields}
+    skipped = 0
+    for row in rows:
+        row = normalize_fields(row)
+        market = normalize_market(row.get('market'))
+        odd = _parse_odd(row.get('odd'))
+        event_id = str(row.get('event_id') or '').strip()
+        home_team = str(row.get('home_team') or '').strip()
+        away_team = str(row.get('away_team') or '').strip()
+        if market is None or np.isnan(odd) or not (event_id or (home_team and away_team)):
+            skipped += 1
+            continue
+        columns['event_id'].append(event_id)
+        columns['home_team'].append(home_team)
+        columns['away_team'].append(away_team)
+        columns['market'].append(market)
+        columns['bookmaker'].append(str(row.get('bookmaker') or '').strip())
+        columns['odd'].append(odd)
+
+    return OddsTable(
+        np.array(columns['event_id'], dtype=object), np.array(columns['home_team'], dtype=object),
+        np.array(columns['away_team'], dtype=object), np.array(columns['market'], dtype=object),
+        np.array(columns['bookmaker'], dtype=object), np.array(columns['odd'], dtype=float)
+    ), skipped
+
+
+def read_odds_file(content, filename=''):
+    """Lê bytes/str de um CSV (vírgula ou ponto e vírgula) ou JSON (lista ou {"odds": [...]})"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    stripped = content.lstrip()
+    if filename.lower().endswith('.json') or stripped.startswith(('[', '{')):
+        data = json.loads(content)
+        rows = data.get('odds', []) if isinstance(data, dict) else data
+    else:
+        dialect = csv.Sniffer().sniff(content[:2048], delimiters=',;\t') if content.strip() else csv.excel
+        rows = list(csv.DictReader(io.StringIO(content), dialect=dialect))
+    return parse_odds_rows(rows)
+
+
+def match_fixtures(odds_table, round_prices):
+    """Linha de round_prices de cada odd (por event_id ou pelo par casa/fora); -1 se não há jogo"""
+    fixture_rows = {event_id: row for row, event_id in enumerate(round_prices['event_id'])}
+    pair_rows = {
+        (home, away): row for row, (home, away) in enumerate(zip(round_prices['home_team'], round_prices['away_team']))
+    }
+    return np.array([
+        fixture_rows.get(event_id, pair_rows.get((home, away), -1)) if event_id else pair_rows.get((home, away), -1)
+        for event_id, home, away in zip(odds_table.event_id, odds_table.home_team, odds_table.away_team)
+    ], dtype=np.int64)
+
+
+def scan_value_bets(odds_table, round_prices, kelly_cap=KELLY_CAP, only_value=True):
+    """
+    Junta as odds com as probabilidades de price_round (por event_id ou
+    pelo par casa/fora) e calcula EV, Kelly e classificação de uma vez
+    Retorna (dict de colunas ordenado por EV, linhas sem jogo precificado)
+    """
+    rows = match_fixtures(odds_table, round_prices)
+    matched = rows >= 0
+    unmatched = int((~matched).sum())
+
+    probability_matrix = np.stack([np.asarray(round_prices[market], dtype=float) for market in ODDS_MARKETS], axis=1) \
+        if len(round_prices['event_id']) else np.zeros((0, len(ODDS_MARKETS)))
+    market_columns = {market: column for column, market in enumerate(ODDS_MARKETS)}
+    market_index = np.array([market_columns[market] for market in odds_table.market], dtype=np.int64)
+
+    rows, market_index, selected = rows[matched], market_index[matched], np.flatnonzero(matched)
+    probability = probability_matrix[rows, market_index]
+    odd = odds_table.odd[selected]
+    ev = calculate_ev_array(probability, odd)
+    kelly = calculate_kelly_array(probability, odd, kelly_cap)
+    classification = classify_bet_array(probability, odd, ev)
+
+    keep = ev > 0 if only_value else np.ones(len(ev), dtype=bool)
+    order = np.flatnonzero(keep)[np.argsort(-ev[keep], kind='stable')]
+    result = {
+        'event_id': np.asarray(round_prices['event_id'], dtype=object)[rows[order]],
+        'date': np.asarray(round_prices['date'], dtype=object)[rows[order]],
+        'home_team': np.asarray(round_prices['home_team'], dtype=object)[rows[order]],
+        'away_team': np.asarray(round_prices['away_team'], dtype=object)[rows[order]],
+        'expected_home_goals': np.asarray(round_prices['expected_home_goals'], dtype=float)[rows[order]],
+        'expected_away_goals': np.asarray(round_prices['expected_away_goals'], dtype=float)[rows[order]],
+        'market': odds_table.market[selected][order],
+        'bookmaker': odds_table.bookmaker[selected][order],
+        'odd': odd[order],
+        'probability': probability[order],
+        'ev': ev[order],
+        'kelly': kelly[order],
+        'classification': np.array(CLASSIFICATIONS, dtype=object)[classification[order]],
+    }
+    return result, unmatched
@@ -0,0 +1,183 @@
+"""
+Múltiplas: probabilidade conjunta exata e busca de combinações
+
+Pernas de jogos diferentes são independentes (produto das
+probabilidades). Pernas do mesmo jogo são correlacionadas: a
+probabilidade conjunta vem da interseção das células da matriz de
+placares daquele jogo, na forma p₁·p₂·… × P(A∩B…)/(P(A)·P(B)·…), o que
+preserva as probabilidades já ajustadas (H2H) de cada perna e zera
+combinações impossíveis (ex: casa vence + empate).
+
+A busca estende as combinações nível a nível (2, 3, … N pernas) com
+arrays: cada nível é calculado de uma vez para todas as combinações
+vivas. Combinações abaixo de min_probability ou acima de max_odd são
+podadas (a probabilidade nunca sobe e a odd nunca desce ao acrescentar
+pernas), e só as beam_width melhores de cada nível seguem sendo
+estendidas.
+"""
+import numpy as np
+
+from ev_core.betting import KELLY_CAP, calculate_kelly_array
+from ev_core.market_catalogue import market_cells
+
+OBJECTIVES = ('sharpe', 'ev', 'growth')
+
+
+def _prepare_legs(legs, score_matrices):
+    """Remove pernas repetidas e monta máscaras/probabilidades de matriz por perna"""
+    unique = []
+    seen = set()
+    for position, leg in enumerate(legs):
+        identity = (leg['jogo'], leg['key'])
+        if identity in seen:
+            continue
+        seen.add(identity)
+        unique.append(position)
+    unique.sort(key=lambda position: legs[position]['jogo'])
+
+    matches = {}
+    match_ids = np.array([matches.setdefault(legs[position]['jogo'], len(matches)) for position in unique], dtype=np.int64)
+    probabilities = np.array([legs[position]['prob'] for position in unique], dtype=float)
+    odds = np.array([legs[position]['odd'] for position in unique], dtype=float)
+
+    # Matrizes com corte adaptativo têm tamanhos diferentes por jogo: cada
+    # máscara sai do tamanho da própria matriz e vai para o canto de uma
+    # grade comum (células fora da matriz têm probabilidade zero)
+    matrices = {jogo: np.asarray(matrix, dtype=float) for jogo, matrix in (score_matrices or {}).items()
+                if jogo in matches and matrix is not None}
+    size = max((matrix.shape[-1] for matrix in matrices.values()), default=1)
+    masks = np.zeros((len(unique), size, size), dtype=bool)
+    model_probabilities = np.ones(len(unique))
+    has_matrix = np.zeros(len(unique), dtype=bool)
+    for row, position in enumerate(unique):
+        matrix = matrices.get(legs[position]['jogo'])
+        if matrix is None:
+            continue
+        goals = matrix.shape[-1]
+        mask = market_cells(legs[position]['key'], goals - 1)
+        masks[row, :goals, :goals] = mask
+        model_probabilities[row] = max(matrix[mask].sum(), 1e-12)
+        has_matrix[row] = True
+
+    flat_matrices = np.zeros((len(matches), size, size))
+    for jogo, matrix in matrices.items():
+        flat_matrices[matches[jogo], :matrix.shape[0], :matrix.shape[1]] = matrix
+    masks, flat_matrices = masks.reshape(len(unique), -1), flat_matrices.reshape(len(matches), -1)
+    return np.array(unique, dtype=np.int64), match_ids, probabilities, odds, masks, model_probabilities, has_matrix, flat_matrices
+
+
+def _scores(probability, odd, kelly_cap):
+    ev = probability * odd - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(probability < 1, ev / (odd * np.sqrt(probability * (1 - probability))), np.inf)
+    kelly = calculate_kelly_array(probability, odd, kelly_cap)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = probability * np.log1p(kelly * (odd - 1)) + (1 - probability) * np.log1p(-kelly)
+    return {'ev': ev, 'sharpe': sharpe, 'kelly': kelly, 'growth': np.nan_to_num(growth)}
+
+
+def search_parlays(legs, score_matrices=None, min_legs=2, max_legs=4, min_probability=0.01, max_odd=None,
+                   beam_width=20000, top=10, objective='sharpe', kelly_cap=KELLY_CAP):
+    """
+    Melhores múltiplas entre as pernas candidatas (dicts com jogo, key,
+    prob e odd, como os do app); score_matrices: {jogo: matriz de placares}
+    Pernas do mesmo jogo sem matriz não são combinadas entre si
+    Retorna até `top` dicts ordenados por objective ('sharpe' = EV por
+    desvio padrão do retorno, 'ev' ou 'growth' = crescimento log com Kelly)
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objetivo inválido: {objective}")
+    positions, match_ids, probabilities, odds, masks, model_probabilities, has_matrix, flat_matrices = \
+        _prepare_legs(legs, score_matrices)
+    leg_count = len(positions)
+    if leg_count < min_legs:
+        return []
+
+    # Estado de cada combinação viva: última perna, probabilidade dos jogos
+    # já fechados e o grupo do jogo atual (interseção + produtos de p e P(matriz))
+    combos = np.arange(leg_count)[:, None]
+    closed_probability = np.ones(leg_count)
+    group_mask = masks.copy()
+    group_legs_probability = probabilities.copy()
+    group_model_probability = model_probabilities.copy()
+    group_probability = probabilities.copy()
+    odd = odds.copy()
+
+    found = []
+    for size in range(2, max_legs + 1):
+        last = combos[:, -1]
+        parent, leg = np.nonzero(np.arange(leg_count)[None, :] > last[:, None])
+        if len(parent) == 0:
+            break
+        same_game = match_ids[leg] == match_ids[last[parent]]
+        allowed = ~same_game | (has_matrix[leg] & has_matrix[last[parent]])
+        parent, leg, same_game = parent[allowed], leg[allowed], same_game[allowed]
+
+        new_odd = odd[parent] * odds[leg]
+        new_closed = np.where(same_game, closed_probability[parent], closed_probability[parent] * group_probability[parent])
+        new_mask = np.where(same_game[:, None], group_mask[parent] & masks[leg], masks[leg])
+        new_legs_probability = np.where(same_game, group_legs_probability[parent] * probabilities[leg], probabilities[leg])
+        new_model_probability = np.where(
+            same_game, group_model_probability[parent] * model_probabilities[leg], model_probabilities[leg]
+        )
+        intersection = np.einsum('ij,ij->i', flat_matrices[match_ids[leg]], new_mask)
+        correlated = new_legs_probability * intersection / new_model_probability
+        # Com probabilidades ajustadas (H2H) a razão pode passar da menor perna do grupo;
+        # o grupo do pai já está limitado pelas pernas anteriores, falta só a nova
+        upper_bound = np.minimum(group_probability[parent], probabilities[leg])
+        new_group_probability = np.where(same_game, np.minimum(correlated, upper_bound), probabilities[leg])
+        new_probability = new_closed * new_group_probability
+
+        keep = new_probability >= min_probability
+        if max_odd is not None:
+            keep &= new_odd <= max_odd
+        parent, leg = parent[keep], leg[keep]
+        combos = np.hstack([combos[parent], leg[:, None]])
+        odd, closed_probability, group_mask = new_odd[keep], new_closed[keep], new_mask[keep]
+        group_legs_probability, group_model_probability = new_legs_probability[keep], new_model_probability[keep]
+        group_probability, probability = new_group_probability[keep], new_probability[keep]
+        if len(combos) == 0:
+            break
+
+        scores = _scores(probability, odd, kelly_cap)
+        if size >= min_legs:
+            best = np.argsort(-scores[objective], kind='stable')[:top]
+            found.extend(
+                (float(scores[objective][row]), combos[row], float(probability[row]), float(odd[row]),
+                 {name: float(values[row]) for name, values in scores.items()})
+                for row in best
+            )
+        if len(combos) > beam_width:
+            survivors = np.argsort(-scores[objective], kind='stable')[:beam_width]
+            combos, odd, closed_probability, group_mask = \
+                combos[survivors], odd[survivors], closed_probability[survivors], group_mask[survivors]
+            group_legs_probability, group_model_probability = \
+                group_legs_probability[survivors], group_model_probability[survivors]
+            group_probability, probability = group_probability[survivors], probability[survivors]
+
+    found.sort(key=lambda item: -item[0])
+    results = []
+    for _, combo, probability, odd, scores in found[:top]:
+        leg_positions = [int(positions[leg]) for leg in combo]
+        results.append({
+            'legs': leg_positions,
+            'probability': probability,
+            'independent_probability': float(np.prod(probabilities[combo])),
+            'odd': odd,
+            'same_game': bool(len(set(match_ids[combo])) < len(combo)),
+            **scores
+        })
+    return results
+
+
+def price_parlay(legs, score_matrices=None, kelly_cap=KELLY_CAP):
+    """Probabilidade conjunta, odd e EV de uma múltipla específica (todas as pernas)"""
+    if len(legs) < 2:
+        probability = float(legs[0]['prob']) if legs else 1.0
+        odd = float(legs[0]['odd']) if legs else 1.0
+        scores = _scores(np.array(probability), np.array(odd), kelly_cap)
+        return {'legs': list(range(len(legs))), 'probability': probability, 'independent_probability': probability,
+                'odd': odd, 'same_game': False, **{name: float(value) for name, value in scores.items()}}
+    results = search_parlays(legs, score_matrices, min_legs=len(legs), max_legs=len(legs), min_probability=0,
+                             beam_width=2 ** len(legs), top=1, objective='ev', kelly_cap=kelly_cap)
+    return results[0] if results else None
@@ -0,0 +1,191 @@
+"""
+Kelly simultâneo para a carteira de apostas selecionadas
+
+Maximiza o crescimento logarítmico esperado E[log(1 + Σ fᵢ·rᵢ)] sobre
+todas as apostas ao mesmo tempo, em vez de um Kelly isolado por aposta.
+O valor esperado é aproximado por cenários: em cada cenário cada jogo
+recebe um placar sorteado da sua matriz, então apostas do mesmo jogo
+ganham ou perdem juntas de forma consistente (casa e empate nunca
+ganham ao mesmo tempo) e jogos diferentes são independentes. Antes do
+sorteio a matriz de cada jogo é reponderada para que cada aposta ganhe
+com a própria probabilidade (a do 1X2 já ajustada pelo H2H), a mesma
+usada no Kelly isolado e nas múltiplas. Apostas sem matriz são
+sorteadas de forma independente pela sua probabilidade.
+
+O problema é côncavo; cada iteração de Newton resolve o modelo
+quadrático (n x n, barato) sob fᵢ ≥ 0, o limite por aposta e o limite
+de exposição total Σ fᵢ ≤ max_exposure, e faz busca linear sobre os
+cenários.
+"""
+import numpy as np
+
+from ev_core.betting import calculate_kelly_array
+from ev_core.market_catalogue import market_cells
+
+SCENARIOS = 20000
+
+
+def _project(fractions, upper, max_exposure):
+    """
+    Projeção euclidiana exata em {0 ≤ f ≤ upper, Σ f ≤ max_exposure}
+    Σ clip(f - τ, 0, upper) é linear por partes em τ; avalia todos os
+    pontos de quebra de uma vez e interpola no intervalo da raiz
+    """
+    clipped = np.clip(fractions, 0, upper)
+    if clipped.sum() <= max_exposure:
+        return clipped
+    breakpoints = np.unique(np.concatenate([fractions, fractions - upper, [0.0]]))
+    breakpoints = breakpoints[np.isfinite(breakpoints) & (breakpoints >= 0)]
+    totals = np.clip(fractions[None, :] - breakpoints[:, None], 0, upper).sum(axis=1)
+    position = np.searchsorted(-totals, -max_exposure)
+    if position == 0:
+        return clipped
+    low, high = breakpoints[position - 1], breakpoints[min(position, len(breakpoints) - 1)]
+    low_total, high_total = totals[position - 1], totals[min(position, len(breakpoints) - 1)]
+    shift = low if low_total == high_total else low + (low_total - max_exposure) * (high - low) / (low_total - high_total)
+    return np.clip(fractions - shift, 0, upper)
+
+
+def _solve_quadratic_model(fractions, gradient, hessian, upper, max_exposure, iterations=300):
+    """
+    Maximiza o modelo quadrático g·(x - f) + ½(x - f)ᵀH(x - f) no conjunto
+    viável com gradiente projetado acelerado (problema pequeno: n x n)
+    """
+    lipschitz = max(float(np.linalg.eigvalsh(-hessian).max()), 1e-12)
+    current = fractions.copy()
+    momentum = current.copy()
+    previous_t = 1.0
+    for _ in range(iterations):
+        model_gradient = gradient + hessian @ (momentum - fractions)
+        following = _project(momentum + model_gradient / lipschitz, upper, max_exposure)
+        t = (1 + np.sqrt(1 + 4 * previous_t ** 2)) / 2
+        momentum = following + (previous_t - 1) / t * (following - current)
+        if np.abs(following - current).max() < 1e-12:
+            current = following
+            break
+        current, previous_t = following, t
+    return current
+
+
+def _stratified_uniforms(generator, scenarios):
+    """Um uniforme em cada faixa [k/n, (k+1)/n) em ordem aleatória: as frequências batem com as probabilidades"""
+    return (generator.permutation(scenarios) + generator.random(scenarios)) / scenarios
+
+
+def _fit_marginals(matrix, masks, probabilities, iterations=50, tolerance=1e-12):
+    """
+    Ajuste proporcional iterativo: reescala as células de cada mercado (e
+    do complemento) até P(mercado) = probabilidade de cada aposta, mudando
+    a matriz o mínimo possível (partições como o 1X2 fecham numa passada)
+    """
+    fitted = matrix / matrix.sum()
+    for _ in range(iterations):
+        worst = 0.0
+        for mask, probability in zip(masks, probabilities):
+            current = fitted[mask].sum()
+            if not 0 < current < 1 or not 0 < probability < 1:
+                continue
+            worst = max(worst, abs(current - probability))
+            fitted = np.where(mask, fitted * (probability / current), fitted * ((1 - probability) / (1 - current)))
+        if worst < tolerance:
+            break
+    return fitted
+
+
+def scenario_wins(bets, score_matrices=None, scenarios=SCENARIOS, seed=0):
+    """Matriz booleana (cenários x apostas): quais apostas ganham em cada cenário"""
+    generator = np.random.default_rng(seed)
+    score_matrices = score_matrices or {}
+    wins = np.zeros((scenarios, len(bets)), dtype=bool)
+    masks = {}
+    for column, bet in enumerate(bets):
+        matrix = score_matrices.get(bet['jogo'])
+        if matrix is not None:
+            masks[column] = market_cells(bet['key'], np.shape(matrix)[-1] - 1)
+
+    sampled_cells = {}
+    for column, bet in enumerate(bets):
+        if column not in masks:
+            wins[:, column] = _stratified_uniforms(generator, scenarios) < bet['prob']
+            continue
+        if bet['jogo'] not in sampled_cells:
+            game_columns = [other for other in masks if bets[other]['jogo'] == bet['jogo']]
+            matrix = _fit_marginals(np.asarray(score_matrices[bet['jogo']], dtype=float),
+                                    [masks[other] for other in game_columns],
+                                    [bets[other]['prob'] for other in game_columns])
+            cumulative = np.cumsum(matrix.ravel())
+            sampled_cells[bet['jogo']] = np.minimum(
+                np.searchsorted(cumulative / cumulative[-1], _stratified_uniforms(generator, scenarios), side='right'),
+                matrix.size - 1
+            )
+        wins[:, column] = masks[column].ravel()[sampled_cells[bet['jogo']]]
+    return wins
+
+
+def scenario_returns(bets, score_matrices=None, scenarios=SCENARIOS, seed=0):
+    """
+    Matriz (cenários x apostas) do retorno por unidade apostada: odd - 1
+    quando a aposta ganha e -1 quando perde
+    """
+    odds = np.array([bet['odd'] for bet in bets], dtype=float)
+    return np.where(scenario_wins(bets, score_matrices, scenarios, seed), odds - 1, -1.0)
+
+
+def _growth(returns, fractions):
+    wealth = 1 + returns @ fractions
+    if np.any(wealth <= 0):
+        return -np.inf
+    return float(np.mean(np.log(wealth)))
+
+
+def optimize_portfolio(bets, score_matrices=None, max_exposure=1.0, max_fraction=None, scenarios=SCENARIOS,
+                       seed=0, max_iterations=100, tolerance=1e-10):
+    """
+    Frações da banca que maximizam o crescimento log esperado conjunto
+    bets: dicts com jogo, key, prob e odd (como os do app)
+    Retorna dict com fractions (na ordem de bets), expected_growth,
+    exposure, independent_kelly (Kelly isolado, sem limite) e iterations
+    """
+    if not bets:
+        return {'fractions': np.zeros(0), 'expected_growth': 0.0, 'exposure': 0.0,
+                'independent_kelly': np.zeros(0), 'iterations': 0}
+    returns = scenario_returns(bets, score_matrices, scenarios, seed)
+    count = returns.shape[1]
+    upper = np.full(count, np.inf if max_fraction is None else float(max_fraction))
+    probabilities = np.array([bet['prob'] for bet in bets], dtype=float)
+    odds = np.array([bet['odd'] for bet in bets], dtype=float)
+    independent_kelly = calculate_kelly_array(probabilities, odds, np.inf)
+
+    fractions = _project(independent_kelly / max(count, 1), upper, max_exposure)
+    growth = _growth(returns, fractions)
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        wealth = 1 + returns @ fractions
+        weighted = returns / wealth[:, None]
+        gradient = weighted.mean(axis=0)
+        hessian = -(weighted.T @ weighted) / len(returns)
+
+        # Passo de Newton restrito: ótimo do modelo quadrático no conjunto
+        # viável; como o conjunto é convexo, todo o segmento é viável
+        direction = _solve_quadratic_model(fractions, gradient, hessian, upper, max_exposure) - fractions
+        slope = float(gradient @ direction)
+        if slope <= tolerance:
+            break
+        step = 1.0
+        for _ in range(30):
+            candidate = fractions + step * direction
+            candidate_growth = _growth(returns, candidate)
+            if candidate_growth >= growth + 1e-4 * step * slope:
+                break
+            step /= 2
+        else:
+            break
+        fractions, growth = candidate, candidate_growth
+
+    return {
+        'fractions': fractions,
+        'expected_growth': growth,
+        'exposure': float(fractions.sum()),
+        'independent_kelly': independent_kelly,
+        'iterations': iteration,
+    }
@@ -0,0 +1,404 @@
+"""
+API HTTP local de precificação
+
+Serviço pequeno sobre o núcleo sem interface: probabilidades, mercados,
+EV/Kelly e distribuição de banca por HTTP/JSON, para outras ferramentas
+consultarem o mesmo preço do app sem abrir o Streamlit.
+
+Um único loop asyncio atende as conexões (HTTP/1.1 com keep-alive, só
+biblioteca padrão). As requisições de jogos não são precificadas uma a
+uma: entram numa fila e o agrupador junta o que as outras conexões
+enfileirarem enquanto ele cede o loop (no máximo batch_window ou
+max_batch jogos), e precifica o lote inteiro numa chamada vetorizada
+(analyse_matches). Requisição isolada não espera a janela. Índice da temporada, modelo e
+PricingCache são compartilhados por todas as requisições, então jogos
+repetidos saem do cache sem recalcular a matriz.
+
+Meta de latência: p99 abaixo de LATENCY_TARGET_MS por jogo, com
+concorrência moderada contra a instância local (medido por
+ev_core.pricing_load_test, que sai com erro acima da meta).
+
+    python -m ev_core.pricing_api --league 4351 --season 2025 --port 8765
+    curl -s localhost:8765/ev -d '{"home_team": "Flamengo", "away_team": "Bahia", "odds": {"home": 1.8}}'
+
+Endpoints:
+    GET  /health, /stats, /teams
+    POST /probabilities  {"home_team", "away_team"} ou {"fixtures": [...]}
+    POST /markets        idem, "catalogue": true inclui o catálogo completo
+    POST /ev             idem, com "odds": {mercado: odd} por jogo
+    POST /bankroll       {"bankroll", "risk_profile", "bets": [...]} ou jogos com odds
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+from ev_core.analysis import analyse_matches, analysis_summary, evaluate_odds
+from ev_core.betting import RISK_PROFILES, calculate_bankroll_distribution, calculate_ev
+from ev_core.config import DEFAULT_CONFIG_PATH, load_model_config
+from ev_core.dixon_coles import model_for_index
+from ev_core.pricing_cache import PricingCache
+from ev_core.season_cache import DEFAULT_CACHE_DIR
+from ev_core.season_index import SeasonIndex
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH = 64
+BATCH_WINDOW = 0.001
+MAX_BODY = 1 << 20
+TOP_SCORES = 5
+LATENCY_TARGET_MS = 5.0
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ==== Agrupador ====
+class PricingService:
+    """Fila de jogos precificados em lote sobre um índice, modelo e cache compartilhados"""
+
+    def __init__(self, season_index, config, model=None, pricing_cache=None, scope=None,
+                 max_batch=MAX_BATCH, batch_window=BATCH_WINDOW):
+        self.season_index = season_index
+        self.config = config
+        self.model = model
+        self.pricing_cache = pricing_cache if pricing_cache is not None else PricingCache()
+        self.scope = scope
+        self.pricing_cache.bind(scope, season_index)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.batches = 0
+        self.batched_fixtures = 0
+        self.largest_batch = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def analyse(self, home_team, away_team):
+        """MatchAnalysis do jogo (ou None sem histórico), precificada no próximo lote"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((home_team, away_team, future))
+        return await future
+
+    async def _collect(self):
+        """Primeiro jogo da fila + o que as outras conexões enfileirarem enquanto o loop gira"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch and time.perf_counter() < deadline:
+            if self._queue.empty():
+                # uma volta no loop: requisições já recebidas entram neste lote;
+                # sem novidade, precifica já em vez de esperar a janela inteira
+                await asyncio.sleep(0)
+                if self._queue.empty():
+                    break
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            pairs = list(dict.fromkeys((home_team, away_team) for home_team, away_team, _ in batch))
+            try:
+                analyses = dict(zip(pairs, analyse_matches(self.season_index, pairs, self.config, self.model,
+                                                           self.pricing_cache, self.scope)))
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            self.batched_fixtures += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for home_team, away_team, future in batch:
+                if not future.done():
+                    future.set_result(analyses[(home_team, away_team)])
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'fixtures': self.batched_fixtures,
+            'largest_batch': self.largest_batch,
+            'mean_batch': round(self.batched_fixtures / self.batches, 2) if self.batches else 0.0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'cache': self.pricing_cache.stats(),
+        }
+
+
+# ==== Endpoints ====
+def _fixtures(payload):
+    fixtures = payload.get('fixtures') if isinstance(payload.get('fixtures'), list) else [payload]
+    for fixture in fixtures:
+        if not isinstance(fixture, dict) or not fixture.get('home_team') or not fixture.get('away_team'):
+            raise ApiError(400, "cada jogo precisa de home_team e away_team")
+    return fixtures
+
+
+async def _analyse_all(service, fixtures):
+    analyses = await asyncio.gather(*(service.analyse(str(fixture['home_team']), str(fixture['away_team']))
+                                      for fixture in fixtures))
+    for fixture, analysis in zip(fixtures, analyses):
+        if analysis is None:
+            raise ApiError(404, f"sem histórico: {fixture['home_team']} vs {fixture['away_team']}")
+    return analyses
+
+
+def _top_scores(matrix, count=TOP_SCORES):
+    order = np.argsort(matrix, axis=None)[::-1][:count]
+    rows, columns = np.unravel_index(order, matrix.shape)
+    return [{'score': f"{home}-{away}", 'probability': round(float(matrix[home, away]), 6)}
+            for home, away in zip(rows.tolist(), columns.tolist())]
+
+
+def _evaluate(service, fixture, analysis, only_value):
+    odds = fixture.get('odds') or {}
+    if not isinstance(odds, dict):
+        raise ApiError(400, "odds deve ser {mercado: odd}")
+    try:
+        return evaluate_odds(analysis, odds, service.config.kelly_cap, only_value)
+    except (TypeError, ValueError) as error:
+        raise ApiError(400, str(error)) from None
+
+
+def _respond(payload, results):
+    return {'fixtures': results} if isinstance(payload.get('fixtures'), list) else results[0]
+
+
+async def probabilities(service, payload):
+    fixtures = _fixtures(payload)
+    analyses = await _analyse_all(service, fixtures)
+    results = []
+    for analysis in analyses:
+        summary = analysis_summary(analysis)
+        summary['max_goals'] = analysis.matrix.shape[-1] - 1
+        summary['scores'] = _top_scores(analysis.matrix)
+        results.append(summary)
+    return _respond(payload, results)
+
+
+async def markets(service, payload):
+    fixtures = _fixtures(payload)
+    analyses = await _analyse_all(service, fixtures)
+    results = []
+    for fixture, analysis in zip(fixtures, analyses):
+        result = analysis_summary(analysis)
+        result['markets'] = {market: round(float(value), 6) for market, value in analysis.markets.items()}
+        if fixture.get('catalogue', payload.get('catalogue')):
+            result['catalogue'] = {market: round(float(value), 6) for market, value in analysis.catalogue.items()}
+        results.append(result)
+    return _respond(payload, results)
+
+
+async def expected_value(service, payload):
+    fixtures = _fixtures(payload)
+    analyses = await _analyse_all(service, fixtures)
+    only_value = bool(payload.get('only_value', False))
+    results = []
+    for fixture, analysis in zip(fixtures, analyses):
+        result = analysis_summary(analysis)
+        result['bets'] = _evaluate(service, fixture, analysis, only_value)
+        results.append(result)
+    return _respond(payload, results)
+
+
+async def bankroll(service, payload):
+    try:
+        total_bankroll = float(payload.get('bankroll', 0))
+    except (TypeError, ValueError):
+        raise ApiError(400, "bankroll deve ser numérico") from None
+    risk_profile = payload.get('risk_profile', 'balanced')
+    if risk_profile not in RISK_PROFILES:
+        raise ApiError(400, f"risk_profile deve ser um de {sorted(RISK_PROFILES)}")
+
+    if isinstance(payload.get('bets'), list):
+        bets = []
+        for bet in payload['bets']:
+            try:
+                probability, odd = float(bet['prob']), float(bet['odd'])
+            except (KeyError, TypeError, ValueError):
+                raise ApiError(400, "cada aposta precisa de prob e odd") from None
+            bets.append(dict(bet, prob=probability, odd=odd, ev=calculate_ev(probability, odd)))
+    else:
+        fixtures = _fixtures(payload)
+        analyses = await _analyse_all(service, fixtures)
+        bets = [bet for fixture, analysis in zip(fixtures, analyses)
+                for bet in _evaluate(service, fixture, analysis, only_value=True)]
+    return calculate_bankroll_distribution(total_bankroll, bets, risk_profile)
+
+
+ROUTES = {
+    '/probabilities': probabilities,
+    '/markets': markets,
+    '/ev': expected_value,
+    '/bankroll': bankroll,
+}
+
+
+async def dispatch(service, method, path, body):
+    """(status, corpo JSON) de uma requisição"""
+    path = path.split('?', 1)[0].rstrip('/') or '/'
+    if method == 'GET':
+        if path == '/health':
+            return 200, {'status': 'ok', 'events': len(service.season_index.events),
+                         'model': 'dixon_coles' if service.model is not None else 'poisson'}
+        if path == '/stats':
+            return 200, service.stats()
+        if path == '/teams':
+            return 200, {'teams': service.season_index.team_list}
+        if path in ROUTES:
+            raise ApiError(405, "use POST")
+        raise ApiError(404, f"rota desconhecida: {path}")
+    if method != 'POST':
+        raise ApiError(405, "use GET ou POST")
+    handler = ROUTES.get(path)
+    if handler is None:
+        raise ApiError(404, f"rota desconhecida: {path}")
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        raise ApiError(400, "corpo não é JSON válido") from None
+    if not isinstance(payload, dict):
+        raise ApiError(400, "corpo deve ser um objeto JSON")
+    return 200, await handler(service, payload)
+
+
+# ==== HTTP ====
+async def _read_request(reader):
+    """(método, caminho, versão, cabeçalhos, corpo) ou None no fim da conexão"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, path, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise ApiError(400, "linha de requisição inválida") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise ApiError(400, "Content-Length inválido") from None
+    if length > MAX_BODY:
+        raise ApiError(413, "corpo grande demais")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, version, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ApiError as error:
+                writer.write(_response(error.status, {'error': str(error)}, False))
+                break
+            if request is None:
+                break
+            method, path, version, headers, body = request
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version != 'HTTP/1.0' or connection == 'keep-alive')
+            try:
+                status, payload = await dispatch(service, method, path, body)
+            except ApiError as error:
+                status, payload = error.status, {'error': str(error)}
+            except Exception as error:
+                status, payload = 500, {'error': f"{type(error).__name__}: {error}"}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+    service.start()
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    from ev_core.batch_pricing import load_season_events
+
+    parser = argparse.ArgumentParser(description="API HTTP local de precificação (probabilidades, mercados, EV, banca)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--league', default='4351', help="liga do snapshot em disco")
+    parser.add_argument('--season', default='2025', help="temporada do snapshot em disco")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, help="diretório do SeasonCache")
+    parser.add_argument('--events', action='append', help="payload(s) JSON da API em vez do snapshot")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help="pesos do modelo (calibração)")
+    parser.add_argument('--dixon-coles', action='store_true', help="gols esperados pelo modelo Dixon-Coles")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="jogos por lote vetorizado")
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000,
+                        help="tempo máximo (ms) juntando requisições num lote")
+    args = parser.parse_args(argv)
+
+    events = load_season_events(args)
+    if not events:
+        print("Nenhum snapshot da temporada em disco; rode o app uma vez ou use --events.", file=sys.stderr)
+        return 1
+
+    season_index = SeasonIndex(events)
+    service = PricingService(
+        season_index, load_model_config(args.config), model_for_index(season_index) if args.dixon_coles else None,
+        scope=(args.league, args.season), max_batch=max(args.max_batch, 1), batch_window=args.batch_window / 1000
+    )
+
+    def ready(server):
+        address = server.sockets[0].getsockname()
+        print(f"API de precificação em http://{address[0]}:{address[1]} ({len(events)} jogos na temporada)",
+              file=sys.stderr)
+
+    try:
+        asyncio.run(serve(service, args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
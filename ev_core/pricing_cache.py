@@ -0,0 +1,161 @@
+"""
+Cache LRU de precificação por jogo
+
+A interface reexecuta o script inteiro a cada tecla digitada, e sem
+cache cada rerun recalcula estatísticas, confrontos diretos, matriz de
+placares e mercados do mesmo confronto. Aqui a precificação fica
+memorizada pela chave (λ casa, λ fora) quantizada + versão dos
+parâmetros do modelo (o ModelConfig e o ρ do Dixon-Coles), e os passos
+anteriores ao λ (estatísticas, H2H) podem ser guardados com lookup().
+Cada entrada pertence a um escopo (liga, temporada): quando o índice da
+temporada muda, bind() descarta só as entradas daquele escopo.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.market_catalogue import market_catalogue
+from ev_core.score_matrix import (LAMBDA_FLOOR, adaptive_max_goals, calculate_markets, calculate_match_probabilities,
+                                 fold_score_matrix)
+
+MAX_ENTRIES = 512
+LAMBDA_QUANTUM = 0.01
+
+MatchPricing = namedtuple('MatchPricing', ['home_expected_goals', 'away_expected_goals', 'matrix', 'markets', 'catalogue'])
+
+
+class PricingCache:
+    def __init__(self, max_entries=MAX_ENTRIES, quantum=LAMBDA_QUANTUM):
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def bind(self, scope, version):
+        """Associa o escopo a uma versão dos dados (ex: o SeasonIndex); versão nova limpa o escopo"""
+        with self._lock:
+            if scope in self._versions and self._versions[scope] is version:
+                return False
+            if scope in self._versions:
+                self.invalidations += 1
+            self._versions[scope] = version
+            for key in [key for key in self._entries if key[0] == scope]:
+                del self._entries[key]
+            return True
+
+    def lookup(self, key, compute, scope=None):
+        """Valor em cache para (scope,) + key ou compute() na primeira vez"""
+        key = (scope,) + tuple(key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def quantize(self, expected_goals):
+        return round(float(expected_goals) / self.quantum)
+
+    def price(self, home_expected_goals, away_expected_goals, config=DEFAULT_CONFIG, model=None, scope=None):
+        """
+        Matriz (corte adaptativo), mercados básicos e catálogo para os λ
+        arredondados a quantum; model (Dixon-Coles) aplica a correção τ
+        """
+        home_step, away_step = self.quantize(home_expected_goals), self.quantize(away_expected_goals)
+        model_version = None if model is None else model.rho
+
+        def compute():
+            home_goals, away_goals = home_step * self.quantum, away_step * self.quantum
+            if model is not None:
+                matrix = model.score_matrix(home_goals, away_goals, max_goals=None)
+            else:
+                matrix = calculate_match_probabilities(home_goals, away_goals, max_goals=None,
+                                                       lambda_floor=config.lambda_floor)
+            matrix.setflags(write=False)
+            return MatchPricing(home_goals, away_goals, matrix, calculate_markets(matrix), market_catalogue(matrix))
+
+        return self.lookup(('price', home_step, away_step, tuple(config), model_version), compute, scope)
+
+    def price_many(self, home_expected_goals, away_expected_goals, config=DEFAULT_CONFIG, model=None, scope=None):
+        """
+        Versão em lote de price: as entradas ausentes do cache são
+        calculadas numa única chamada vetorizada, e cada jogo guarda a matriz
+        no próprio corte adaptativo (a mesma que price() daria)
+        """
+        model_version = None if model is None else model.rho
+        steps = [(self.quantize(home), self.quantize(away))
+                 for home, away in zip(home_expected_goals, away_expected_goals)]
+        keys = [(scope, 'price', home_step, away_step, tuple(config), model_version) for home_step, away_step in steps]
+
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+            missing = list(dict.fromkeys(key for key in keys if key not in found))
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            home_goals = np.array([key[2] for key in missing]) * self.quantum
+            away_goals = np.array([key[3] for key in missing]) * self.quantum
+            floor = LAMBDA_FLOOR if model is not None else config.lambda_floor
+            cuts = [adaptive_max_goals(home, away, lambda_floor=floor) for home, away in zip(home_goals, away_goals)]
+            # uma chamada com o maior corte do lote; cada matriz é dobrada no corte
+            # do próprio jogo (a mesma de price()) e completada com zeros até o
+            # maior corte, então mercados e catálogo não dependem do lote
+            size = max(cuts)
+            if model is not None:
+                matrices = model.score_matrix(home_goals, away_goals, max_goals=size)
+            else:
+                matrices = calculate_match_probabilities(home_goals, away_goals, max_goals=size,
+                                                         lambda_floor=config.lambda_floor)
+            folded = [fold_score_matrix(matrix, cut) for matrix, cut in zip(matrices, cuts)]
+            padded = np.zeros_like(matrices)
+            for position, matrix in enumerate(folded):
+                padded[position, :cuts[position] + 1, :cuts[position] + 1] = matrix
+                matrix.setflags(write=False)
+            markets = calculate_markets(padded)
+            catalogue = market_catalogue(padded)
+            with self._lock:
+                for position, key in enumerate(missing):
+                    value = MatchPricing(
+                        float(home_goals[position]), float(away_goals[position]), folded[position],
+                        {market: float(values[position]) for market, values in markets.items()},
+                        {market: float(values[position]) for market, values in catalogue.items()}
+                    )
+                    found[key] = value
+                    self._store(key, value)
+        return [found[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Acertos, falhas, descartes por LRU, invalidações de escopo e tamanho atual"""
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'size': len(self._entries), 'max_entries': self.max_entries,
+            }
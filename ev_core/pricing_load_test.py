@@ -0,0 +1,150 @@
+"""
+Teste de carga da API de precificação
+
+Abre N conexões keep-alive contra uma instância local (ev_core.pricing_api),
+cada uma enviando requisições em sequência com jogos sorteados entre os
+times de /teams, e mede a latência de ponta a ponta por requisição. Sai
+com código 1 se o p99 por jogo passar da meta (LATENCY_TARGET_MS).
+
+O cliente é de malha fechada: com concorrência alta a latência passa a
+medir a fila (lei de Little), e na mesma máquina o cliente disputa CPU
+com o servidor. A meta vale para concorrência moderada (o padrão);
+--fixtures N mede lotes de N jogos por requisição.
+
+    python -m ev_core.pricing_api --league 4351 --season 2025 &
+    python -m ev_core.pricing_load_test --requests 2000 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from ev_core.pricing_api import DEFAULT_HOST, DEFAULT_PORT, LATENCY_TARGET_MS
+
+ENDPOINTS = ('/probabilities', '/markets', '/ev')
+SAMPLE_ODDS = {'home': 2.1, 'draw': 3.3, 'away': 3.6, 'over': 1.9, 'under': 1.95, 'btts_yes': 1.85,
+               'dc_1x': 1.35, 'ah_home_-0.25': 1.9, 'cs_1-1': 7.5}
+
+
+class Connection:
+    """Conexão HTTP/1.1 keep-alive mínima sobre asyncio"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _payload(path, teams, rng, fixtures_per_request):
+    fixtures = []
+    for _ in range(fixtures_per_request):
+        home_team, away_team = rng.sample(teams, 2)
+        fixture = {'home_team': home_team, 'away_team': away_team}
+        if path == '/ev':
+            fixture['odds'] = SAMPLE_ODDS
+        fixtures.append(fixture)
+    return fixtures[0] if fixtures_per_request == 1 else {'fixtures': fixtures}
+
+
+async def _worker(host, port, teams, requests, rng, fixtures_per_request, latencies, failures):
+    connection = Connection(host, port)
+    await connection.open()
+    try:
+        for _ in range(requests):
+            path = rng.choice(ENDPOINTS)
+            payload = _payload(path, teams, rng, fixtures_per_request)
+            started = time.perf_counter()
+            status, _ = await connection.request('POST', path, payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                failures.append(status)
+    finally:
+        connection.close()
+
+
+async def run(host, port, requests, concurrency, fixtures_per_request=1, seed=0):
+    """(latências em ms, falhas, estatísticas do servidor, duração em s)"""
+    connection = Connection(host, port)
+    await connection.open()
+    _, body = await connection.request('GET', '/teams')
+    teams = body['teams']
+
+    rng = random.Random(seed)
+    latencies, failures = [], []
+    shares = [requests // concurrency + (worker < requests % concurrency) for worker in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(host, port, teams, share, random.Random(rng.random()), fixtures_per_request, latencies, failures)
+        for share in shares if share
+    ))
+    elapsed = time.perf_counter() - started
+    _, stats = await connection.request('GET', '/stats')
+    connection.close()
+    return np.array(latencies), failures, stats, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API local de precificação")
+    parser.add_argument('--url', default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4, help="conexões simultâneas")
+    parser.add_argument('--fixtures', type=int, default=1, help="jogos por requisição")
+    parser.add_argument('--target', type=float, default=LATENCY_TARGET_MS, help="meta de p99 por jogo (ms)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    try:
+        latencies, failures, stats, elapsed = asyncio.run(run(
+            url.hostname or DEFAULT_HOST, url.port or DEFAULT_PORT, args.requests, max(args.concurrency, 1),
+            max(args.fixtures, 1), args.seed
+        ))
+    except OSError as error:
+        print(f"Sem conexão com {args.url}: {error}", file=sys.stderr)
+        return 2
+
+    fixtures = max(args.fixtures, 1)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    per_fixture = p99 / fixtures
+    print(f"{len(latencies)} requisições ({fixtures} jogo(s) cada) em {elapsed:.2f}s "
+          f"= {len(latencies) / elapsed:.0f} req/s, {len(failures)} falhas")
+    print(f"latência (ms): p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  máx {latencies.max():.2f}")
+    print(f"lotes: {stats['batches']} (médio {stats['mean_batch']}, maior {stats['largest_batch']})  "
+          f"cache: {stats['cache']['hits']} acertos / {stats['cache']['misses']} falhas")
+    print(f"p99 por jogo: {per_fixture:.2f} ms (meta {args.target:.2f} ms)")
+    return 0 if per_fixture <= args.target and not failures else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Precificação da rodada completa
+
+Pega todos os jogos ainda sem placar do SeasonIndex, monta os arrays de
+gols esperados e calcula 1X2 ajustado por H2H e todos os mercados de
+calculate_markets em uma única passada vetorizada. Com um modelo
+Dixon-Coles ajustado, os gols esperados vêm dos ratings do modelo.
+"""
+import numpy as np
+
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.model import blend_with_h2h, count_h2h_results, expected_goals
+from ev_core.score_matrix import price_fixtures
+
+ROUND_COLUMNS = (
+    'row', 'event_id', 'date', 'round', 'home_team', 'away_team',
+    'expected_home_goals', 'expected_away_goals',
+    'home_win', 'draw', 'away_win', 'over_2.5', 'under_2.5', 'btts_yes', 'btts_no'
+)
+
+
+def price_round(season_index, rows=None, config=DEFAULT_CONFIG, model=None):
+    """
+    Precifica os jogos das linhas informadas (padrão: todos os não disputados)
+    Retorna um dict de colunas (pronto para pd.DataFrame); 'row' é a linha
+    do jogo no SeasonIndex (event_id pode vir vazio da API); jogos de times
+    ainda sem histórico no mando correspondente são ignorados e, com model,
+    jogos que o modelo não conhece usam as médias
+    """
+    if rows is None:
+        rows = season_index.upcoming_rows
+
+    priced_rows = []
+    home_lambdas = []
+    away_lambdas = []
+    modelled = []
+    h2h_counts = []
+    for row in rows:
+        home_team = season_index.team_list[season_index.home_ids[row]]
+        away_team = season_index.team_list[season_index.away_ids[row]]
+        home_statistics = season_index.team_stats(home_team, 'home', True, config.recent_games, config.recent_weight)
+        away_statistics = season_index.team_stats(away_team, 'away', True, config.recent_games, config.recent_weight)
+        if not home_statistics or not away_statistics:
+            continue
+        # Como em "ANALISAR JOGO": λ do modelo quando ele conhece os dois times, senão as médias
+        model_goals = model.expected_goals(home_team, away_team) if model is not None else None
+        expected_home_goals, expected_away_goals = model_goals or expected_goals(home_statistics, away_statistics)
+        priced_rows.append(row)
+        home_lambdas.append(expected_home_goals)
+        away_lambdas.append(expected_away_goals)
+        modelled.append(model_goals is not None)
+        h2h_counts.append(count_h2h_results(season_index.head_to_head(home_team, away_team), home_team))
+
+    priced_rows = np.array(priced_rows, dtype=np.int64)
+    if len(priced_rows) == 0:
+        return {column: np.array([], dtype=np.int64 if column == 'row' else float) for column in ROUND_COLUMNS}
+
+    home_lambdas = np.array(home_lambdas)
+    away_lambdas = np.array(away_lambdas)
+    modelled = np.array(modelled, dtype=bool)
+    markets = {}
+    for by_model in (False, True):
+        selected = modelled == by_model
+        if not selected.any():
+            continue
+        if by_model:
+            prices = model.price_fixtures(home_lambdas[selected], away_lambdas[selected])
+        else:
+            prices = price_fixtures(home_lambdas[selected], away_lambdas[selected], lambda_floor=config.lambda_floor)
+        for market, values in prices.items():
+            markets.setdefault(market, np.empty(len(priced_rows)))[selected] = values
+
+    h2h_counts = np.array(h2h_counts, dtype=float)
+    markets['home_win'], markets['draw'], markets['away_win'] = blend_with_h2h(
+        markets['home_win'], markets['draw'], markets['away_win'],
+        h2h_counts[:, 0], h2h_counts[:, 1], h2h_counts[:, 2], h2h_weight=config.h2h_weight
+    )
+
+    team_names = np.array(season_index.team_list, dtype=object)
+    result = {
+        'row': priced_rows,
+        'event_id': season_index.event_ids[priced_rows],
+        'date': season_index.dates[priced_rows],
+        'round': season_index.rounds[priced_rows],
+        'home_team': team_names[season_index.home_ids[priced_rows]],
+        'away_team': team_names[season_index.away_ids[priced_rows]],
+        'expected_home_goals': home_lambdas,
+        'expected_away_goals': away_lambdas,
+    }
+    result.update(markets)
+    return result
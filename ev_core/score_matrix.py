@@ -0,0 +1,137 @@
+"""
+Matriz de placares vetorizada (Poisson independente)
+
+A matriz é o produto externo de dois vetores PMF de Poisson e todos os
+mercados saem de somas mascaradas sobre ela. Todas as funções aceitam
+escalares ou arrays de lambdas, então uma rodada inteira é precificada
+em uma única chamada. A última linha/coluna guarda a cauda ("max_goals
+ou mais"), então a matriz sempre soma 1; com max_goals=None o corte se
+adapta ao maior λ para que a cauda fique abaixo de TAIL_MASS.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+MAX_GOALS = 7
+MIN_GOALS = 6
+TAIL_MASS = 1e-6
+LAMBDA_FLOOR = 0.5
+
+MARKET_KEYS = ('home_win', 'draw', 'away_win', 'over_2.5', 'btts_yes')
+
+# Chaves curtas usadas pela interface/histórico de apostas
+MARKET_ALIASES = {'home': 'home_win', 'away': 'away_win', 'over': 'over_2.5', 'under': 'under_2.5'}
+
+
+def poisson_probability(k, lambda_value):
+    return float(poisson_pmf(lambda_value, k, fold_tail=False)[k])
+
+
+@lru_cache(maxsize=None)
+def _log_factorials(max_goals):
+    goals = np.arange(max_goals + 1)
+    return goals, np.cumsum(np.log(np.maximum(goals, 1)))
+
+
+def poisson_pmf(lambdas, max_goals=MAX_GOALS, lambda_floor=LAMBDA_FLOOR, fold_tail=True):
+    """
+    Retorna P(0..max_goals gols) com shape (..., max_goals + 1)
+    fold_tail soma P(> max_goals) na última posição (vira "max_goals ou mais")
+    """
+    lambdas = np.asarray(lambdas, dtype=float)
+    lambdas = np.where(lambdas > 0, lambdas, lambda_floor)[..., None]
+    goals, log_factorials = _log_factorials(max_goals)
+    pmf = np.exp(goals * np.log(lambdas) - lambdas - log_factorials)
+    if fold_tail:
+        pmf[..., -1] = np.maximum(1 - pmf[..., :-1].sum(axis=-1), 0)
+    return pmf
+
+
+def adaptive_max_goals(home_expected_goals, away_expected_goals, tail_mass=TAIL_MASS, lambda_floor=LAMBDA_FLOOR):
+    """Menor corte (>= MIN_GOALS) em que P(gols > corte) < tail_mass para o maior λ do lote"""
+    lambdas = np.concatenate([np.ravel(home_expected_goals), np.ravel(away_expected_goals)]).astype(float)
+    largest = float(np.where(lambdas > 0, lambdas, lambda_floor).max())
+    limit = int(np.ceil(largest + 12 * np.sqrt(largest) + 12))
+    remaining = 1 - np.cumsum(poisson_pmf(largest, limit, lambda_floor, fold_tail=False))
+    return max(MIN_GOALS, int(np.argmax(remaining < tail_mass)))
+
+
+def calculate_match_probabilities(home_expected_goals, away_expected_goals, max_goals=MAX_GOALS,
+                                  lambda_floor=LAMBDA_FLOOR):
+    """
+    Matriz de placares P[..., gols_casa, gols_fora]
+    Aceita lambdas escalares (matriz 2D) ou arrays (uma matriz por jogo)
+    max_goals=None escolhe o corte pelo λ (adaptive_max_goals)
+    """
+    if max_goals is None:
+        max_goals = adaptive_max_goals(home_expected_goals, away_expected_goals, lambda_floor=lambda_floor)
+    home_pmf = poisson_pmf(home_expected_goals, max_goals, lambda_floor)
+    away_pmf = poisson_pmf(away_expected_goals, max_goals, lambda_floor)
+    return home_pmf[..., :, None] * away_pmf[..., None, :]
+
+
+def fold_score_matrix(matrix, max_goals):
+    """Reduz a matriz ao corte max_goals: a última linha/coluna passa a ser max_goals ou mais"""
+    matrix = np.asarray(matrix)
+    if matrix.shape[-1] <= max_goals + 1:
+        return matrix
+    rows = np.concatenate([matrix[..., :max_goals, :], matrix[..., max_goals:, :].sum(axis=-2, keepdims=True)], axis=-2)
+    return np.concatenate([rows[..., :max_goals], rows[..., max_goals:].sum(axis=-1, keepdims=True)], axis=-1)
+
+
+@lru_cache(maxsize=None)
+def _market_masks(max_goals):
+    """Máscaras achatadas (mercados x células) na ordem de MARKET_KEYS"""
+    home_goals, away_goals = np.indices((max_goals + 1, max_goals + 1))
+    masks = np.stack([
+        home_goals > away_goals,
+        home_goals == away_goals,
+        home_goals < away_goals,
+        (home_goals + away_goals) > 2.5,
+        (home_goals > 0) & (away_goals > 0),
+    ])
+    return masks.reshape(len(MARKET_KEYS), -1).astype(float)
+
+
+def market_cells(market_key, max_goals=MAX_GOALS):
+    """Máscara booleana (gols_casa, gols_fora) dos placares em que o mercado vence"""
+    masks = _market_masks(max_goals).reshape(len(MARKET_KEYS), max_goals + 1, max_goals + 1) > 0
+    market_key = MARKET_ALIASES.get(market_key, market_key)
+    complements = {'under_2.5': 'over_2.5', 'btts_no': 'btts_yes'}
+    if market_key in complements:
+        return ~masks[MARKET_KEYS.index(complements[market_key])]
+    return masks[MARKET_KEYS.index(market_key)]
+
+
+def calculate_markets(probability_matrix):
+    """
+    Deriva 1X2, Over/Under 2.5 e BTTS com um único produto matricial
+    Matriz 2D retorna floats; lote (n, G, G) retorna arrays de tamanho n
+    """
+    probability_matrix = np.asarray(probability_matrix, dtype=float)
+    size = probability_matrix.shape[-1]
+    flat = probability_matrix.reshape(probability_matrix.shape[:-2] + (size * size,))
+    sums = flat @ _market_masks(size - 1).T
+
+    markets = {
+        'home_win': sums[..., 0],
+        'draw': sums[..., 1],
+        'away_win': sums[..., 2],
+        'over_2.5': sums[..., 3],
+        'under_2.5': 1 - sums[..., 3],
+        'btts_yes': sums[..., 4],
+        'btts_no': 1 - sums[..., 4],
+    }
+
+    if probability_matrix.ndim == 2:
+        return {key: float(value) for key, value in markets.items()}
+    return markets
+
+
+def price_fixtures(home_expected_goals, away_expected_goals, max_goals=MAX_GOALS, lambda_floor=LAMBDA_FLOOR):
+    """Precifica vários jogos de uma vez a partir de arrays de (λ casa, λ fora)"""
+    return calculate_markets(
+        calculate_match_probabilities(
+            np.atleast_1d(home_expected_goals), np.atleast_1d(away_expected_goals), max_goals, lambda_floor
+        )
+    )
@@ -0,0 +1,149 @@
+"""
+Cache em disco dos payloads de temporada (stale-while-revalidate)
+
+Cada (liga, temporada) vira um JSON comprimido com a data da coleta. O
+app responde sempre a partir do disco; quando o snapshot passa da idade
+máxima, uma thread em segundo plano busca a API e regrava o arquivo.
+Sem rede, o último snapshot continua sendo servido.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_CACHE_DIR = os.environ.get('EV_CACHE_DIR', os.path.join('data', 'cache'))
+
+SeasonSnapshot = namedtuple('SeasonSnapshot', ['events', 'season', 'fetched_at'])
+
+
+def season_formats(season):
+    """Formatos aceitos pela API para a temporada ("2025" -> "2025" e "2024-2025"; "2024-2025" fica como está)"""
+    season = str(season).strip()
+    if season.isdigit():
+        return (season, f"{int(season) - 1}-{season}")
+    return (season,)
+
+
+def read_event_files(paths):
+    """Eventos de payloads JSON da API salvos em disco ({"events": [...]} ou lista)"""
+    events = []
+    for path in paths:
+        with open(path, encoding='utf-8') as events_file:
+            data = json.load(events_file)
+        events.extend(data.get('events') or [] if isinstance(data, dict) else data)
+    return events
+
+
+class SeasonCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def path(self, league_id, season):
+        return os.path.join(self.directory, f"events_{league_id}_{season}.json.gz")
+
+    def read(self, league_id, season):
+        """Snapshot salvo ou None; só relê o arquivo quando ele muda no disco"""
+        path = self.path(league_id, season)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            memo = self._memo.get(path)
+            if memo and memo[0] == mtime:
+                return memo[1]
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as cache_file:
+                payload = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        snapshot = SeasonSnapshot(payload['events'], payload['season'], payload['fetched_at'])
+        with self._lock:
+            self._memo[path] = (mtime, snapshot)
+        return snapshot
+
+    def write(self, league_id, season, events, fetched_at=None):
+        """Grava de forma atômica (arquivo temporário + rename)"""
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = SeasonSnapshot(events, season, fetched_at if fetched_at is not None else time.time())
+        path = self.path(league_id, season)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temporary_path, 'wt', encoding='utf-8') as cache_file:
+            json.dump(snapshot._asdict(), cache_file)
+        os.replace(temporary_path, path)
+        with self._lock:
+            self._memo[path] = (os.stat(path).st_mtime_ns, snapshot)
+        return snapshot
+
+
+class SeasonLoader:
+    """
+    Serve do disco e revalida em segundo plano
+    fetch(league_id, season_formats) -> (eventos, temporada) ou (None, None)
+    """
+
+    def __init__(self, cache, fetch, max_age=3600, retry_after=60):
+        self.cache = cache
+        self.fetch = fetch
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._last_failure = {}
+
+    def load(self, league_id, season_formats):
+        season_formats = tuple(season_formats)
+        for season in season_formats:
+            snapshot = self.cache.read(league_id, season)
+            if snapshot is not None:
+                if time.time() - snapshot.fetched_at > self.max_age:
+                    self.refresh_in_background(league_id, season_formats)
+                return snapshot
+
+        if self._recently_failed((league_id, season_formats)):
+            return None
+        return self.refresh(league_id, season_formats)
+
+    def refresh(self, league_id, season_formats):
+        """Busca a API de forma síncrona e atualiza o disco; None se falhar"""
+        key = (league_id, tuple(season_formats))
+        events, season = self.fetch(league_id, season_formats)
+        if not events:
+            with self._lock:
+                self._last_failure[key] = time.time()
+            return None
+        with self._lock:
+            self._last_failure.pop(key, None)
+        return self.cache.write(league_id, season, events)
+
+    def refresh_in_background(self, league_id, season_formats):
+        key = (league_id, tuple(season_formats))
+        with self._lock:
+            if key in self._refreshing or self._recently_failed(key, locked=True):
+                return False
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(league_id, season_formats)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"season-refresh-{league_id}", daemon=True).start()
+        return True
+
+    def _recently_failed(self, key, locked=False):
+        if locked:
+            failed_at = self._last_failure.get(key)
+        else:
+            with self._lock:
+                failed_at = self._last_failure.get(key)
+        return failed_at is not None and time.time() - failed_at < self.retry_after
@@ -0,0 +1,315 @@
+"""
+Índice da temporada
+
+Construído uma vez por payload de get_season_results: os eventos viram
+colunas tipadas, cada time guarda seus jogos em casa/fora já ordenados
+por data e os confrontos diretos ficam num mapa indexado pelo par de
+times. Consultas por time ou por confronto passam a ser O(1).
+"""
+import numpy as np
+
+RECENT_GAMES = 5
+RECENT_WEIGHT = 0.7
+
+
+def parse_score(value):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_games(scored, conceded, dates, use_recent=True, recent_games=RECENT_GAMES, recent_weight=RECENT_WEIGHT):
+    """
+    Médias de gols com ponderação de jogos recentes
+    Arrays do jogo mais recente ao mais antigo; use_recent=True dá peso 70%
+    aos últimos 5 jogos e 30% ao restante (ajustável via recent_games/recent_weight)
+    """
+    if len(scored) == 0:
+        return None
+
+    if use_recent and len(scored) >= recent_games:
+        recent_scored_avg = scored[:recent_games].mean()
+        recent_conceded_avg = conceded[:recent_games].mean()
+
+        if len(scored) > recent_games:
+            scored_average = recent_scored_avg * recent_weight + scored[recent_games:].mean() * (1 - recent_weight)
+            conceded_average = recent_conceded_avg * recent_weight + conceded[recent_games:].mean() * (1 - recent_weight)
+        else:
+            scored_average = recent_scored_avg
+            conceded_average = recent_conceded_avg
+    else:
+        scored_average = scored.mean()
+        conceded_average = conceded.mean()
+
+    last_5 = [
+        {'scored': int(scored[position]), 'conceded': int(conceded[position]), 'date': str(dates[position])}
+        for position in range(min(RECENT_GAMES, len(scored)))
+    ]
+    return {
+        'games': len(scored),
+        'scored_average': float(scored_average),
+        'conceded_average': float(conceded_average),
+        'last_5': last_5
+    }
+
+
+def _pair_key(team_a, team_b):
+    return (team_a, team_b) if team_a <= team_b else (team_b, team_a)
+
+
+_COLUMN_FILLS = {
+    'event_ids': '', 'dates': '', 'rounds': 0,
+    'home_ids': -1, 'away_ids': -1, 'home_scores': -1, 'away_scores': -1
+}
+
+
+def _event_signature(event):
+    """Campos que, se mudarem, alteram o índice"""
+    return (
+        event.get('strHomeTeam'), event.get('strAwayTeam'),
+        event.get('intHomeScore'), event.get('intAwayScore'),
+        event.get('dateEvent'), event.get('intRound')
+    )
+
+
+class SeasonIndex:
+    def __init__(self, events):
+        self.events = list(events)
+
+        teams = set()
+        for event in self.events:
+            if event.get('strHomeTeam'):
+                teams.add(event['strHomeTeam'])
+            if event.get('strAwayTeam'):
+                teams.add(event['strAwayTeam'])
+        self.team_list = sorted(teams)
+        self.team_ids = {team: position for position, team in enumerate(self.team_list)}
+
+        size = len(self.events)
+        self.event_ids = np.empty(size, dtype=object)
+        self.dates = np.empty(size, dtype=object)
+        self.rounds = np.zeros(size, dtype=np.int16)
+        self.home_ids = np.full(size, -1, dtype=np.int32)
+        self.away_ids = np.full(size, -1, dtype=np.int32)
+        self.home_scores = np.full(size, -1, dtype=np.int16)
+        self.away_scores = np.full(size, -1, dtype=np.int16)
+        self.row_by_id = {}
+
+        for row, event in enumerate(self.events):
+            self._set_row(row, event)
+        self._refresh_summary()
+
+        # Mais recente primeiro; sort estável preserva a ordem original em empates
+        played_rows = np.flatnonzero(self.played)
+        order = sorted(played_rows, key=lambda row: self.dates[row], reverse=True)
+
+        self.home_games = {team: [] for team in self.team_list}
+        self.away_games = {team: [] for team in self.team_list}
+        self.h2h = {}
+        for row in order:
+            home = self.team_list[self.home_ids[row]]
+            away = self.team_list[self.away_ids[row]]
+            self.home_games[home].append(row)
+            self.away_games[away].append(row)
+            self.h2h.setdefault(_pair_key(home, away), []).append(row)
+
+        self.home_games = {team: np.array(rows, dtype=np.int64) for team, rows in self.home_games.items()}
+        self.away_games = {team: np.array(rows, dtype=np.int64) for team, rows in self.away_games.items()}
+        self._stats_cache = {}
+
+    def _set_row(self, row, event):
+        event_id = event.get('idEvent') or ''
+        self.event_ids[row] = event_id
+        if event_id:
+            self.row_by_id[event_id] = row
+        self.dates[row] = event.get('dateEvent') or ''
+        self.rounds[row] = parse_score(event.get('intRound')) or 0
+        self.home_ids[row] = self.team_ids.get(event.get('strHomeTeam'), -1)
+        self.away_ids[row] = self.team_ids.get(event.get('strAwayTeam'), -1)
+        home_score = parse_score(event.get('intHomeScore'))
+        away_score = parse_score(event.get('intAwayScore'))
+        if home_score is not None and away_score is not None:
+            self.home_scores[row] = home_score
+            self.away_scores[row] = away_score
+        else:
+            self.home_scores[row] = -1
+            self.away_scores[row] = -1
+
+    def _refresh_summary(self):
+        self.played = (self.home_scores >= 0) & (self.home_ids >= 0) & (self.away_ids >= 0)
+        self.completed_games = int(self.played.sum())
+        upcoming = ~self.played & (self.home_ids >= 0) & (self.away_ids >= 0)
+        self.upcoming_rows = np.array(
+            sorted(np.flatnonzero(upcoming), key=lambda row: self.dates[row]), dtype=np.int64
+        )
+
+    def _sorted_by_date(self, rows):
+        return sorted(sorted(rows), key=lambda row: self.dates[row], reverse=True)
+
+    def diff(self, events):
+        """
+        Compara um payload novo com o índice pelo idEvent
+        Retorna [(linha ou None se novo, evento)] dos jogos novos/alterados,
+        ou None quando só uma reconstrução completa é segura (evento sem id,
+        evento removido ou time novo)
+        """
+        changes = []
+        seen = 0
+        for event in events:
+            event_id = event.get('idEvent')
+            if not event_id:
+                return None
+            row = self.row_by_id.get(event_id)
+            if row is None:
+                changes.append((None, event))
+            else:
+                seen += 1
+                if _event_signature(event) != _event_signature(self.events[row]):
+                    changes.append((row, event))
+            for team in (event.get('strHomeTeam'), event.get('strAwayTeam')):
+                if team and team not in self.team_ids:
+                    return None
+        if seen != len(self.row_by_id) or len(self.row_by_id) != len(self.events):
+            return None
+        return changes
+
+    def updated(self, events):
+        """Novo índice para o payload; reaproveita o atual quando possível"""
+        changes = self.diff(events)
+        if changes is None:
+            return SeasonIndex(events)
+        return self.apply_changes(changes)
+
+    def apply_changes(self, changes):
+        """
+        Aplica [(linha ou None, evento)] vindos de diff() num novo índice
+        Colunas são copiadas; listas por time, H2H e estatísticas em cache
+        só são refeitas para os times e confrontos afetados
+        """
+        if not changes:
+            return self
+
+        clone = object.__new__(SeasonIndex)
+        clone.__dict__.update(self.__dict__)
+        clone.events = list(self.events)
+        clone.row_by_id = dict(self.row_by_id)
+        new_rows = sum(1 for row, _ in changes if row is None)
+        for column, fill in _COLUMN_FILLS.items():
+            values = getattr(self, column)
+            grown = np.full(len(values) + new_rows, fill, dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(clone, column, grown)
+
+        touched_rows = {}
+        for row, event in changes:
+            if row is None:
+                row = len(clone.events)
+                clone.events.append(event)
+            else:
+                clone.events[row] = event
+            touched_rows[row] = (int(self.home_ids[row]), int(self.away_ids[row])) if row < len(self.events) else None
+            clone._set_row(row, event)
+        clone._refresh_summary()
+
+        affected_home = {}
+        affected_away = {}
+        affected_pairs = {}
+        for row, previous in touched_rows.items():
+            teams_involved = [(int(clone.home_ids[row]), int(clone.away_ids[row]))]
+            if previous is not None:
+                teams_involved.append(previous)
+            for home_id, away_id in teams_involved:
+                if home_id < 0 or away_id < 0:
+                    continue
+                home = clone.team_list[home_id]
+                away = clone.team_list[away_id]
+                affected_home.setdefault(home, set()).add(row)
+                affected_away.setdefault(away, set()).add(row)
+                affected_pairs.setdefault(_pair_key(home, away), set()).add(row)
+
+        def merge(existing, touched, team_column, team_id):
+            rows = {int(row) for row in existing} - touched
+            rows.update(row for row in touched if clone.played[row] and team_column[row] == team_id)
+            return rows
+
+        clone.home_games = dict(self.home_games)
+        for team, touched in affected_home.items():
+            rows = merge(self.home_games.get(team, ()), touched, clone.home_ids, clone.team_ids[team])
+            clone.home_games[team] = np.array(clone._sorted_by_date(rows), dtype=np.int64)
+
+        clone.away_games = dict(self.away_games)
+        for team, touched in affected_away.items():
+            rows = merge(self.away_games.get(team, ()), touched, clone.away_ids, clone.team_ids[team])
+            clone.away_games[team] = np.array(clone._sorted_by_date(rows), dtype=np.int64)
+
+        clone.h2h = dict(self.h2h)
+        for pair, touched in affected_pairs.items():
+            rows = {int(row) for row in self.h2h.get(pair, ())} - touched
+            rows.update(
+                row for row in touched
+                if clone.played[row] and _pair_key(
+                    clone.team_list[clone.home_ids[row]], clone.team_list[clone.away_ids[row]]
+                ) == pair
+            )
+            if rows:
+                clone.h2h[pair] = clone._sorted_by_date(rows)
+            else:
+                clone.h2h.pop(pair, None)
+
+        clone._stats_cache = {
+            key: value for key, value in self._stats_cache.items()
+            if key[0] not in (affected_home if key[1] == 'home' else affected_away)
+        }
+        return clone
+
+    def team_games(self, team_name, venue='home'):
+        """Retorna (gols marcados, gols sofridos, linhas) do mais recente ao mais antigo"""
+        if venue == 'home':
+            rows = self.home_games.get(team_name)
+            if rows is None:
+                return None
+            return self.home_scores[rows], self.away_scores[rows], rows
+        rows = self.away_games.get(team_name)
+        if rows is None:
+            return None
+        return self.away_scores[rows], self.home_scores[rows], rows
+
+    def team_stats(self, team_name, venue='home', use_recent=True, recent_games=RECENT_GAMES, recent_weight=RECENT_WEIGHT):
+        """
+        Estatísticas com ponderação de jogos recentes
+        use_recent=True: Últimos 5 jogos têm peso 70%, restante 30%
+        """
+        key = (team_name, venue, use_recent, recent_games, recent_weight)
+        if key not in self._stats_cache:
+            games = self.team_games(team_name, venue)
+            self._stats_cache[key] = None if games is None else summarize_games(
+                games[0], games[1], self.dates[games[2]], use_recent, recent_games, recent_weight
+            )
+        return self._stats_cache[key]
+
+    def head_to_head(self, home_team, away_team, limit=5):
+        """Retorna confrontos diretos entre os dois times (mais recentes primeiro)"""
+        rows = self.h2h.get(_pair_key(home_team, away_team), [])[:limit]
+        return [
+            {
+                'date': self.dates[row],
+                'home': self.team_list[self.home_ids[row]],
+                'away': self.team_list[self.away_ids[row]],
+                'score_home': int(self.home_scores[row]),
+                'score_away': int(self.away_scores[row])
+            }
+            for row in rows
+        ]
+
+
+def process_team_stats(events, team_name, venue='home', use_recent=True):
+    """Atalho para uma consulta avulsa; prefira reutilizar um SeasonIndex"""
+    return SeasonIndex(events).team_stats(team_name, venue, use_recent)
+
+
+def get_head_to_head(events, home_team, away_team):
+    """Atalho para uma consulta avulsa; prefira reutilizar um SeasonIndex"""
+    return SeasonIndex(events).head_to_head(home_team, away_team)
@@ -0,0 +1,168 @@
+"""
+Simulação Monte Carlo do restante da temporada
+
+Cada jogo pendente é sorteado N vezes como dois Poisson independentes
+com os gols esperados do modelo; os pontos de todas as simulações saem
+de um produto matricial (simulações x jogos) · (jogos x times) e a
+classificação de um np.lexsort por linha (pontos, vitórias, saldo, gols
+pró e sorteio). Lotes de simulações podem ser distribuídos num
+ProcessPoolExecutor com sementes independentes derivadas de uma única
+seed, então o resultado é reproduzível para a mesma seed e workers.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.round_pricing import price_round
+
+BATCH_SIZE = 10000
+
+ZONES = {
+    'champion': (0, 1),
+    'top_4': (0, 4),
+    'relegation': (-4, None),
+}
+
+SeasonTable = namedtuple('SeasonTable', ['teams', 'points', 'wins', 'goal_difference', 'goals_for', 'played'])
+
+SimulationResult = namedtuple('SimulationResult', [
+    'teams', 'simulations', 'position_probabilities', 'expected_points', 'expected_position', 'zones'
+])
+
+
+def current_table(season_index):
+    """Pontos, vitórias, saldo e gols pró dos jogos já disputados"""
+    team_count = len(season_index.team_list)
+    played = season_index.played
+    home = season_index.home_ids[played]
+    away = season_index.away_ids[played]
+    home_goals = season_index.home_scores[played].astype(np.int64)
+    away_goals = season_index.away_scores[played].astype(np.int64)
+
+    home_win = home_goals > away_goals
+    away_win = home_goals < away_goals
+    draw = ~home_win & ~away_win
+    points = np.bincount(home, 3 * home_win + draw, team_count) + np.bincount(away, 3 * away_win + draw, team_count)
+    wins = np.bincount(home, home_win, team_count) + np.bincount(away, away_win, team_count)
+    goals_for = np.bincount(home, home_goals, team_count) + np.bincount(away, away_goals, team_count)
+    goals_against = np.bincount(home, away_goals, team_count) + np.bincount(away, home_goals, team_count)
+    games = np.bincount(home, minlength=team_count) + np.bincount(away, minlength=team_count)
+    return SeasonTable(
+        list(season_index.team_list), points.astype(np.int64), wins.astype(np.int64),
+        (goals_for - goals_against).astype(np.int64), goals_for.astype(np.int64), games
+    )
+
+
+def _simulate_batch(table, home_ids, away_ids, home_lambdas, away_lambdas, simulations, generator):
+    """Contagem (times x posições) de um lote de simulações"""
+    team_count = len(table.teams)
+    home_goals = generator.poisson(home_lambdas, size=(simulations, len(home_ids)))
+    away_goals = generator.poisson(away_lambdas, size=(simulations, len(home_ids)))
+
+    home_onehot = np.zeros((len(home_ids), team_count))
+    home_onehot[np.arange(len(home_ids)), home_ids] = 1
+    away_onehot = np.zeros((len(away_ids), team_count))
+    away_onehot[np.arange(len(away_ids)), away_ids] = 1
+
+    home_win = (home_goals > away_goals).astype(float)
+    away_win = (home_goals < away_goals).astype(float)
+    draw = 1 - home_win - away_win
+    points = table.points + (3 * home_win + draw) @ home_onehot + (3 * away_win + draw) @ away_onehot
+    wins = table.wins + home_win @ home_onehot + away_win @ away_onehot
+    goal_difference = table.goal_difference + (home_goals - away_goals) @ (home_onehot - away_onehot)
+    goals_for = table.goals_for + home_goals @ home_onehot + away_goals @ away_onehot
+
+    tiebreak = generator.random((simulations, team_count))
+    order = np.lexsort((tiebreak, -goals_for, -goal_difference, -wins, -points), axis=-1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(team_count)[None, :], axis=-1)
+
+    cells = np.arange(team_count) * team_count + positions
+    counts = np.bincount(cells.ravel(), minlength=team_count * team_count).reshape(team_count, team_count)
+    return counts, points.sum(axis=0)
+
+
+def _simulate_chunk(table, home_ids, away_ids, home_lambdas, away_lambdas, simulations, seed_sequence):
+    generator = np.random.default_rng(seed_sequence)
+    team_count = len(table.teams)
+    counts = np.zeros((team_count, team_count), dtype=np.int64)
+    points_total = np.zeros(team_count)
+    for start in range(0, simulations, BATCH_SIZE):
+        batch_counts, batch_points = _simulate_batch(
+            table, home_ids, away_ids, home_lambdas, away_lambdas, min(BATCH_SIZE, simulations - start), generator
+        )
+        counts += batch_counts
+        points_total += batch_points
+    return counts, points_total
+
+
+def simulate_season(table, home_ids, away_ids, home_lambdas, away_lambdas, simulations=10000, seed=None,
+                    workers=1):
+    """
+    Joga os jogos pendentes (índices de time em table.teams e λ de cada
+    lado) `simulations` vezes a partir da tabela atual
+    workers > 1 divide as simulações num ProcessPoolExecutor
+    """
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+    home_lambdas = np.asarray(home_lambdas, dtype=float)
+    away_lambdas = np.asarray(away_lambdas, dtype=float)
+    workers = max(1, min(workers or os.cpu_count() or 1, simulations))
+    sizes = [simulations // workers + (position < simulations % workers) for position in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    arguments = (table, home_ids, away_ids, home_lambdas, away_lambdas)
+
+    if workers == 1:
+        results = [_simulate_chunk(*arguments, sizes[0], seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_simulate_chunk, *arguments, size, chunk_seed)
+                       for size, chunk_seed in zip(sizes, seeds)]
+            results = [future.result() for future in futures]
+
+    counts = sum(result[0] for result in results)
+    position_probabilities = counts / simulations
+    team_count = len(table.teams)
+    zones = {
+        zone: position_probabilities[:, slice(start, end)].sum(axis=1)
+        for zone, (start, end) in ZONES.items()
+    }
+    return SimulationResult(
+        table.teams, simulations, position_probabilities,
+        sum(result[1] for result in results) / simulations,
+        position_probabilities @ np.arange(1, team_count + 1),
+        zones
+    )
+
+
+def simulate_from_index(season_index, simulations=10000, seed=None, workers=1, config=DEFAULT_CONFIG, model=None):
+    """
+    Simula a temporada do SeasonIndex com os gols esperados de price_round
+    Jogos que o modelo não consegue precificar usam a média de gols da liga
+    """
+    table = current_table(season_index)
+    rows = season_index.upcoming_rows
+    played = season_index.played
+    home_average = float(season_index.home_scores[played].mean()) if played.any() else 1.0
+    away_average = float(season_index.away_scores[played].mean()) if played.any() else 1.0
+    home_lambdas = np.full(len(rows), home_average)
+    away_lambdas = np.full(len(rows), away_average)
+
+    prices = price_round(season_index, rows, config, model)
+    position_by_row = {row: position for position, row in enumerate(rows)}
+    for row, home_goals, away_goals in zip(
+        prices['row'], prices['expected_home_goals'], prices['expected_away_goals']
+    ):
+        position = position_by_row[row]
+        home_lambdas[position] = home_goals
+        away_lambdas[position] = away_goals
+
+    return simulate_season(
+        table, season_index.home_ids[rows], season_index.away_ids[rows],
+        np.where(home_lambdas > 0, home_lambdas, config.lambda_floor),
+        np.where(away_lambdas > 0, away_lambdas, config.lambda_floor),
+        simulations, seed, workers
+    )
@@ -0,0 +1,118 @@
+"""
+Acesso à API do TheSportsDB
+
+Um requests.Session com pool de conexões e retry com backoff é reutilizado
+entre chamadas. Os formatos de temporada candidatos são consultados em
+paralelo; vence o primeiro payload válido respeitando a ordem de
+preferência, e cada tentativa tem a latência registrada.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE = "https://www.thesportsdb.com/api/v1/json/3"
+
+FetchAttempt = namedtuple('FetchAttempt', ['season', 'url', 'status_code', 'latency', 'ok', 'error'])
+
+
+def make_session(retries=2, backoff_factor=0.3, pool_size=4):
+    """Session com pool e retry para erros de conexão, 429 e 5xx"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SportsDBClient:
+    def __init__(self, api_base=API_BASE, session=None, timeout=10, max_workers=4, history_size=50):
+        self.api_base = api_base.rstrip('/')
+        self.session = session or make_session(pool_size=max_workers)
+        self.timeout = timeout
+        self.attempts = deque(maxlen=history_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sportsdb')
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _fetch_one(self, league_id, season):
+        url = f"{self.api_base}/eventsseason.php?id={league_id}&s={season}"
+        started = time.perf_counter()
+        status_code = None
+        events = None
+        error = None
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            status_code = response.status_code
+            if status_code == 200:
+                data = response.json()
+                if data and data.get('events') and len(data['events']) > 0:
+                    events = data['events']
+        except (requests.RequestException, ValueError) as exception:
+            error = f"{type(exception).__name__}: {exception}"
+
+        attempt = FetchAttempt(season, url, status_code, time.perf_counter() - started, events is not None, error)
+        with self._lock:
+            self.attempts.append(attempt)
+        return events
+
+    def fetch_season_events(self, league_id, season_formats):
+        """
+        Consulta todos os formatos ao mesmo tempo
+        Retorna (eventos, temporada) do formato preferido que respondeu com
+        dados, sem esperar pelos menos preferidos, ou (None, None)
+        """
+        season_formats = list(season_formats)
+        futures = {self._executor.submit(self._fetch_one, league_id, season): position
+                   for position, season in enumerate(season_formats)}
+        results = [None] * len(season_formats)
+        resolved = [False] * len(season_formats)
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position = futures[future]
+                results[position] = future.result()
+                resolved[position] = True
+
+            for position, season in enumerate(season_formats):
+                if not resolved[position]:
+                    break
+                if results[position]:
+                    for future in pending:
+                        future.cancel()
+                    return results[position], season
+
+        return None, None
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def fetch_season_events(league_id, season_formats, api_base=API_BASE):
+    """Atalho usando um cliente compartilhado por api_base"""
+    global _default_client
+    replaced = None
+    with _default_client_lock:
+        if _default_client is None or _default_client.api_base != api_base.rstrip('/'):
+            replaced, _default_client = _default_client, SportsDBClient(api_base)
+        client = _default_client
+    if replaced is not None:
+        replaced.close()
+    return client.fetch_season_events(league_id, season_formats)
@@ -0,0 +1,118 @@
+"""
+Plano de stakes por perfil de risco e simulação de risco da banca
+
+staking_plan reproduz a recomendação da gestão de banca (orçamento por
+perfil, simples proporcionais ao Kelly, melhores múltiplas proporcionais
+ao Kelly e high-risk em partes iguais). simulate_bankroll repete esse
+plano rodada após rodada, reinvestindo as mesmas frações da banca, em
+muitos caminhos: os resultados de uma rodada vêm de uma tabela de
+cenários sorteada uma única vez (placares das matrizes, então apostas do
+mesmo jogo são consistentes), e cada caminho é só uma sequência de
+índices nessa tabela. Log da banca por soma acumulada e drawdown pelo
+máximo acumulado, tudo em arrays (caminhos x rodadas).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from ev_core.betting import KELLY_CAP, RISK_PROFILES, calculate_bankroll_distribution, calculate_kelly_criterion
+from ev_core.parlay import search_parlays
+from ev_core.portfolio import SCENARIOS, scenario_wins
+
+PATHS = 100000
+ROUNDS = 20
+RUIN_LEVEL = 0.2
+DRAWDOWN_PERCENTILES = (50, 90, 95, 99)
+
+Position = namedtuple('Position', ['legs', 'odd', 'probability', 'stake', 'group'])
+
+
+def staking_plan(bets, total_bankroll, risk_profile="balanced", kelly_cap=KELLY_CAP, score_matrices=None,
+                 max_parlay_legs=4, parlays=5):
+    """
+    Posições recomendadas para o perfil: lista de Position com os índices
+    das pernas em bets, odd, probabilidade (conjunta nas múltiplas), stake
+    em R$ e grupo (simple, multiple, high_risk)
+    """
+    recommendations = calculate_bankroll_distribution(total_bankroll, bets, risk_profile)
+    positions_by_bet = {id(bet): position for position, bet in enumerate(bets)}
+    positions = []
+
+    all_simple = recommendations['simple_high'] + recommendations['simple_low']
+    simple_budget = recommendations['budgets']['simple_total']
+    simple_kellies = [calculate_kelly_criterion(bet['prob'], bet['odd'], kelly_cap) for bet in all_simple]
+    total_kelly = sum(simple_kellies)
+    for bet, kelly in zip(all_simple, simple_kellies):
+        stake = simple_budget * (kelly / total_kelly) if total_kelly > 0 else simple_budget / len(all_simple)
+        positions.append(Position((positions_by_bet[id(bet)],), bet['odd'], bet['prob'], stake, 'simple'))
+
+    if len(bets) >= 2:
+        multiple_budget = recommendations['budgets']['multiple_total']
+        best_parlays = [
+            parlay for parlay in search_parlays(bets, score_matrices, max_legs=min(max_parlay_legs, len(bets)),
+                                                top=parlays, kelly_cap=kelly_cap)
+            if parlay['ev'] > 0
+        ]
+        total_parlay_kelly = sum(parlay['kelly'] for parlay in best_parlays)
+        for parlay in best_parlays:
+            stake = multiple_budget * (parlay['kelly'] / total_parlay_kelly) if total_parlay_kelly > 0 else 0
+            positions.append(Position(tuple(parlay['legs']), parlay['odd'], parlay['probability'], stake, 'multiple'))
+
+    high_risk = recommendations['high_risk']
+    for bet in high_risk:
+        stake = recommendations['budgets']['high_risk_total'] / len(high_risk)
+        positions.append(Position((positions_by_bet[id(bet)],), bet['odd'], bet['prob'], stake, 'high_risk'))
+    return positions
+
+
+def round_multipliers(positions, wins, total_bankroll):
+    """Fator de crescimento da banca em cada cenário para as posições dadas"""
+    multipliers = np.ones(len(wins))
+    for position in positions:
+        if position.stake <= 0:
+            continue
+        won = wins[:, list(position.legs)].all(axis=1)
+        multipliers += position.stake / total_bankroll * np.where(won, position.odd - 1, -1.0)
+    return multipliers
+
+
+def simulate_bankroll(multipliers, paths=PATHS, rounds=ROUNDS, ruin_level=RUIN_LEVEL, seed=0):
+    """
+    Caminhos da banca (relativa à inicial) repetindo a rodada `rounds`
+    vezes; ruína = banca abaixo de ruin_level em algum momento
+    """
+    generator = np.random.default_rng(seed)
+    with np.errstate(divide='ignore'):
+        log_multipliers = np.log(np.maximum(multipliers, 0)).astype(np.float32)
+    draws = generator.integers(0, len(multipliers), size=(paths, rounds), dtype=np.int32)
+    log_bankroll = np.cumsum(log_multipliers[draws], axis=1)
+    running_peak = np.maximum(np.maximum.accumulate(log_bankroll, axis=1), 0)
+    with np.errstate(invalid='ignore'):
+        max_drawdown = 1 - np.exp(np.min(log_bankroll - running_peak, axis=1))
+    max_drawdown = np.nan_to_num(max_drawdown, nan=1.0)
+    final_log = log_bankroll[:, -1]
+    finite = np.isfinite(log_multipliers)
+
+    return {
+        'paths': paths,
+        'rounds': rounds,
+        'risk_of_ruin': float(np.mean(log_bankroll.min(axis=1) < np.log(ruin_level))),
+        'drawdown_percentiles': dict(zip(DRAWDOWN_PERCENTILES, np.percentile(max_drawdown, DRAWDOWN_PERCENTILES).tolist())),
+        'expected_log_growth': float(np.mean(log_multipliers)) if finite.all() else -np.inf,
+        'median_final': float(np.exp(np.median(final_log))),
+        'final_percentiles': dict(zip((5, 95), np.exp(np.percentile(final_log, (5, 95))).tolist())),
+        'probability_of_profit': float(np.mean(final_log > 0)),
+    }
+
+
+def profile_risk(bets, total_bankroll, kelly_cap=KELLY_CAP, score_matrices=None, paths=PATHS, rounds=ROUNDS,
+                 ruin_level=RUIN_LEVEL, scenarios=SCENARIOS, seed=0):
+    """simulate_bankroll do plano de cada perfil em RISK_PROFILES, com a mesma tabela de cenários"""
+    wins = scenario_wins(bets, score_matrices, scenarios, seed)
+    results = {}
+    for risk_profile in RISK_PROFILES:
+        positions = staking_plan(bets, total_bankroll, risk_profile, kelly_cap, score_matrices)
+        result = simulate_bankroll(round_multipliers(positions, wins, total_bankroll), paths, rounds, ruin_level, seed)
+        result['staked'] = sum(position.stake for position in positions)
+        results[risk_profile] = result
+    return results
@@ -0,0 +1,106 @@
+"""Precificação em lote pela linha de comando: CSV de odds até o JSONL de saída"""
+import json
+import os
+import tempfile
+import unittest
+
+from ev_core.analysis import analyse_match, evaluate_odds
+from ev_core.batch_pricing import main
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.pricing_cache import PricingCache
+from ev_core.season_cache import SeasonCache, season_formats
+from ev_core.season_index import SeasonIndex
+
+from test_season_index import make_season
+
+CSV_HEADER = 'event_id;home_team;away_team;market;bookmaker;odd\n'
+
+
+class BatchPricingCliTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.events = make_season(30)
+        self.index = SeasonIndex(self.events)
+        self.events_path = self.path('events.json')
+        with open(self.events_path, 'w', encoding='utf-8') as events_file:
+            json.dump({'events': self.events}, events_file)
+
+        upcoming = [self.events[row] for row in self.index.upcoming_rows[:3]]
+        self.fixtures = [(event['strHomeTeam'], event['strAwayTeam']) for event in upcoming]
+        lines = []
+        for event in upcoming[:2]:
+            for market, odd in (('1', '2,10'), ('X', '3.40'), ('2', '3.9'), ('Over 2.5', '1.95'), ('BTTS Sim', '1.8')):
+                lines.append(f"{event['idEvent']};{event['strHomeTeam']};{event['strAwayTeam']};{market};A;{odd}\n")
+        # Só o event_id: os times saem do índice da temporada
+        lines.append(f"{upcoming[2]['idEvent']};;;1;B;2.5\n")
+        lines.append(";Flamengo;Vasco;1;A;2.0\n")
+        self.input_path = self.path('odds.csv')
+        with open(self.input_path, 'w', encoding='utf-8') as input_file:
+            input_file.write(CSV_HEADER + ''.join(lines))
+        self.odds = [
+            {'1': 2.1, 'X': 3.4, '2': 3.9, 'Over 2.5': 1.95, 'BTTS Sim': 1.8},
+            {'1': 2.1, 'X': 3.4, '2': 3.9, 'Over 2.5': 1.95, 'BTTS Sim': 1.8},
+            {'1': 2.5},
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def run_cli(self, *arguments):
+        output_path = self.path('apostas.jsonl')
+        code = main(['--config', self.path('sem_config.json'), '--output', output_path, *arguments])
+        if code != 0:
+            return code, None
+        with open(output_path, encoding='utf-8') as output_file:
+            return code, [json.loads(line) for line in output_file]
+
+    def expected(self, only_value):
+        # Mesmo cache que o worker usa: λ quantizado como na CLI
+        pricing_cache = PricingCache()
+        lines = []
+        for (home_team, away_team), odds in zip(self.fixtures, self.odds):
+            analysis = analyse_match(self.index, home_team, away_team, DEFAULT_CONFIG, pricing_cache=pricing_cache)
+            for bet in evaluate_odds(analysis, odds, DEFAULT_CONFIG.kelly_cap, only_value):
+                lines.append((home_team, away_team, bet['key'], bet['odd'], round(bet['prob'], 6), round(bet['ev'], 6)))
+        return lines
+
+    def assertMatchesAnalysis(self, lines, only_value):
+        got = [(line['home_team'], line['away_team'], line['market'], line['odd'], line['probability'], line['ev'])
+               for line in lines]
+        self.assertEqual(got, self.expected(only_value))
+        if only_value:
+            self.assertTrue(all(line['ev'] > 0 for line in lines))
+
+    def test_csv_to_jsonl_matches_analyse_match(self):
+        code, lines = self.run_cli('--events', self.events_path, '--all', self.input_path)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(lines), 11)
+        self.assertMatchesAnalysis(lines, only_value=False)
+        self.assertEqual({line['bookmaker'] for line in lines}, {'A', 'B'})
+        self.assertEqual(lines[-1]['event_id'], self.events[self.index.upcoming_rows[2]]['idEvent'])
+
+        code, lines = self.run_cli('--events', self.events_path, self.input_path)
+        self.assertMatchesAnalysis(lines, only_value=True)
+
+    def test_workers_keep_input_order(self):
+        _, single = self.run_cli('--events', self.events_path, '--all', self.input_path)
+        _, parallel = self.run_cli('--events', self.events_path, '--all', '--workers', '2', self.input_path)
+        self.assertEqual(parallel, single)
+
+    def test_snapshot_season_formats(self):
+        self.assertEqual(season_formats('2025'), ('2025', '2024-2025'))
+        self.assertEqual(season_formats(' 2024-2025 '), ('2024-2025',))
+        cache_dir = self.path('cache')
+        SeasonCache(cache_dir).write('4351', '2024-2025', self.events)
+        for season in ('2025', '2024-2025'):
+            code, lines = self.run_cli('--cache', cache_dir, '--season', season, '--all', self.input_path)
+            self.assertEqual(code, 0, season)
+            self.assertMatchesAnalysis(lines, only_value=False)
+        self.assertEqual(self.run_cli('--cache', cache_dir, '--season', '2023', self.input_path)[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
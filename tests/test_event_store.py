@@ -0,0 +1,184 @@
+"""EventStore colunar: datas defensivas, poda de partições, filtros e paridade com o SeasonIndex"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ev_core.event_store import EventStore, events_to_columns
+from ev_core.ingestion import SeasonIngestor
+from ev_core.season_index import SeasonIndex
+
+from test_season_index import TEAMS, make_season
+
+
+def renumbered(events, offset, year):
+    """Cópia da temporada com outros idEvent e as datas deslocadas para outro ano"""
+    return [
+        dict(event, idEvent=str(int(event['idEvent']) + offset), dateEvent=f"{year}{event['dateEvent'][4:]}")
+        for event in events
+    ]
+
+
+def matches(event, team=None, venue=None, opponent=None, played=None, date_from=None, date_to=None):
+    home, away = event['strHomeTeam'], event['strAwayTeam']
+    if team is not None:
+        home_match = home == team and (opponent is None or away == opponent)
+        away_match = away == team and (opponent is None or home == opponent)
+        if not {'home': home_match, 'away': away_match}.get(venue, home_match or away_match):
+            return False
+    if played is not None and (event['intHomeScore'] is not None) != played:
+        return False
+    return (date_from is None or event['dateEvent'] >= date_from) and (date_to is None or event['dateEvent'] <= date_to)
+
+
+class EventStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = EventStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class EventColumnsTest(EventStoreTestCase):
+    def test_malformed_and_missing_dates_become_nat(self):
+        events = [
+            {'idEvent': '1', 'strHomeTeam': 'Bahia', 'strAwayTeam': 'Flamengo', 'dateEvent': '2025-04-01',
+             'intHomeScore': '1', 'intAwayScore': '0'},
+            {'idEvent': '2', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia', 'dateEvent': ''},
+            {'idEvent': '3', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia', 'dateEvent': 'adiado'},
+            {'idEvent': '4', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia', 'dateEvent': '2025-02-30'},
+            {'idEvent': '5', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia'},
+            {'idEvent': '6', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia', 'dateEvent': '2025-05-03T16:00:00'},
+        ]
+        columns, teams = events_to_columns(events)
+        self.assertEqual(columns['date'].dtype, np.dtype('datetime64[D]'))
+        np.testing.assert_array_equal(np.isnat(columns['date']), [False, True, True, True, True, False])
+        self.assertEqual(str(columns['date'][5]), '2025-05-03')
+        self.assertEqual(list(teams), ['Bahia', 'Flamengo'])
+
+        meta = self.store.write_partition('4351', '2025', events)
+        self.assertEqual((meta['min_date'], meta['max_date'], meta['played']), ('2025-04-01', '2025-05-03', 1))
+        self.assertEqual(len(self.store.query(date_from='2025-01-01')['event_id']), 2)
+        self.assertEqual(len(self.store.query()['event_id']), 6)
+
+    def test_empty_partition(self):
+        self.assertEqual(self.store.write_partition('4351', '2025', [])['rows'], 0)
+        result = self.store.query(team='Bahia')
+        self.assertEqual(len(result['event_id']), 0)
+        self.assertIsNone(self.store.team_stats('Bahia'))
+        self.assertEqual(self.store.head_to_head('Bahia', 'Flamengo'), [])
+
+    def test_event_without_team(self):
+        events = make_season(0)
+        events[0] = dict(events[0], strAwayTeam=None)
+        self.store.write_partition('4351', '2025', events)
+        result = self.store.query()
+        self.assertEqual(result['away_team'][list(result['event_id']).index(events[0]['idEvent'])], '')
+
+
+class EventStoreQueryTest(EventStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seasons = {
+            ('4351', '2024'): renumbered(make_season(10, played_share=1.0), 1000, 2024),
+            ('4351', '2025'): make_season(11),
+            ('4404', '2025'): renumbered(make_season(12), 2000, 2025)[:12],
+        }
+        for (league_id, season), events in self.seasons.items():
+            self.store.write_partition(league_id, season, events)
+
+    def loaded(self):
+        return sorted((os.path.basename(os.path.dirname(path)), os.path.basename(path)) for path, _ in self.store._open)
+
+    def test_partitions_are_pruned_before_reading_columns(self):
+        self.assertEqual([(meta['league_id'], meta['season']) for meta in self.store.partitions()],
+                         sorted(self.seasons))
+        self.assertEqual(len(self.store.partitions(leagues=['4351'], seasons=['2025'])), 1)
+
+        self.store.query(date_to='2024-12-31')
+        self.assertEqual(self.loaded(), [('league=4351', 'season=2024')])
+
+        self.store._open.clear()
+        self.store.query(leagues=['4404'], team='Bahia')
+        self.assertEqual(self.loaded(), [('league=4404', 'season=2025')])
+
+        self.store._open.clear()
+        self.store.query(seasons=['2025'], date_from='2025-01-01', date_to='2025-04-30')
+        self.assertEqual(self.loaded(), [('league=4351', 'season=2025'), ('league=4404', 'season=2025')])
+
+    def test_open_partitions_are_bounded(self):
+        store = EventStore(self.directory.name, max_open_partitions=2)
+        store.query()
+        self.assertEqual(len(store._open), 2)
+
+    def test_query_filters_match_python_filter(self):
+        cases = [
+            {},
+            {'team': 'Flamengo'},
+            {'team': 'Flamengo', 'venue': 'home'},
+            {'team': 'Bahia', 'venue': 'away', 'played': True},
+            {'team': 'Grêmio', 'opponent': 'Palmeiras'},
+            {'team': 'Grêmio', 'opponent': 'Palmeiras', 'venue': 'away'},
+            {'played': False},
+            {'date_from': '2024-06-01', 'date_to': '2025-05-15'},
+            {'team': 'Fortaleza', 'played': True, 'date_from': '2025-04-20'},
+            {'team': 'Vasco'},
+        ]
+        for filters in cases:
+            for leagues, seasons in ((None, None), (['4351'], None), (None, ['2025'])):
+                result = self.store.query(leagues, seasons, **filters)
+                expected = sorted(
+                    event['idEvent'] for (league_id, season), events in self.seasons.items()
+                    if (leagues is None or league_id in leagues) and (seasons is None or season in seasons)
+                    for event in events if matches(event, **filters)
+                )
+                self.assertEqual(sorted(result['event_id']), expected, (filters, leagues, seasons))
+
+        result = self.store.query(seasons=['2024'], team='Bahia', venue='home')
+        self.assertTrue(np.all(result['home_team'] == 'Bahia'))
+        self.assertTrue(np.all(result['season'] == '2024'))
+
+    def test_stats_match_season_index(self):
+        for league_id, season in self.seasons:
+            events = self.seasons[(league_id, season)]
+            index = SeasonIndex(events)
+            for team in TEAMS:
+                for venue in ('home', 'away'):
+                    for use_recent in (True, False):
+                        self.assertEqual(
+                            self.store.team_stats(team, venue, use_recent, leagues=[league_id], seasons=[season]),
+                            index.team_stats(team, venue, use_recent), (league_id, season, team, venue)
+                        )
+                for opponent in TEAMS:
+                    self.assertEqual(
+                        self.store.head_to_head(team, opponent, limit=50, leagues=[league_id], seasons=[season]),
+                        index.head_to_head(team, opponent, limit=50), (league_id, season, team, opponent)
+                    )
+
+    def test_stats_across_seasons_match_one_combined_index(self):
+        combined = SeasonIndex(self.seasons[('4351', '2024')] + self.seasons[('4351', '2025')])
+        for team in TEAMS:
+            self.assertEqual(self.store.team_stats(team, 'away', leagues=['4351']), combined.team_stats(team, 'away'))
+            self.assertEqual(self.store.head_to_head(team, 'Flamengo', leagues=['4351']),
+                             combined.head_to_head(team, 'Flamengo'))
+
+    def test_ingestion_writes_changed_snapshots(self):
+        ingestor = SeasonIngestor(self.store)
+        events = make_season(13)
+        ingestor.ingest('4351', '2026', 't0', events)
+        written_at = self.store.partitions(seasons=['2026'])[0]['written_at']
+        ingestor.ingest('4351', '2026', 't1', [dict(event) for event in events])
+        self.assertEqual(self.store.partitions(seasons=['2026'])[0]['written_at'], written_at)
+
+        events = [dict(event) for event in events]
+        events[-1].update(intHomeScore='2', intAwayScore='2')
+        ingestor.ingest('4351', '2026', 't2', events)
+        meta = self.store.partitions(seasons=['2026'])[0]
+        self.assertEqual(meta['played'], sum(event['intHomeScore'] is not None for event in events))
+        self.assertEqual(self.store.team_stats('Flamengo', seasons=['2026']), SeasonIndex(events).team_stats('Flamengo'))
+
+
+if __name__ == '__main__':
+    unittest.main()
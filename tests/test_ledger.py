@@ -0,0 +1,324 @@
+"""Histórico de apostas em SQLite: CRUD, ids estáveis, ROI, totais mantidos por triggers e filtros"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+from ev_core.ledger import BetLedger
+
+
+def recompute(bets):
+    """ROI, lucro e taxa de acerto recalculados em Python sobre as linhas"""
+    finalized = [bet for bet in bets if bet['status'] in ('ganhou', 'perdeu')]
+    if not finalized:
+        return 0, 0, 0
+    invested = sum(bet['stake'] for bet in finalized)
+    returned = sum(bet['stake'] * bet['odd'] for bet in finalized if bet['status'] == 'ganhou')
+    wins = sum(bet['status'] == 'ganhou' for bet in finalized)
+    profit = returned - invested
+    return (profit / invested * 100 if invested > 0 else 0), profit, wins / len(finalized) * 100
+
+
+def random_bet(rng, day=None):
+    return {
+        'timestamp': f"2025-{rng.randint(1, 12):02d}-{day or rng.randint(1, 28):02d} 12:00:00",
+        'jogo': rng.choice(['Flamengo vs Bahia', 'Palmeiras vs Santos', 'Grêmio vs Inter']),
+        'mercado': rng.choice(['Vitória Flamengo', 'Empate', 'Mais de 2.5', 'Ambas Marcam - Sim']),
+        'odd': round(rng.uniform(1.3, 5.0), 2),
+        'stake': round(rng.uniform(5, 50), 2),
+        'status': rng.choice(['pendente', 'ganhou', 'perdeu']),
+    }
+
+
+class LedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'apostas.db')
+        self.ledger = BetLedger(self.path)
+
+    def tearDown(self):
+        self.ledger.close()
+        self.directory.cleanup()
+
+    def assertRoiMatches(self, expected_bets, roi=None):
+        for value, expected in zip(roi or self.ledger.calculate_roi(), recompute(expected_bets)):
+            self.assertAlmostEqual(value, expected, places=9)
+
+    def assertTotalsConsistent(self):
+        """Totais dos triggers == recálculo completo (rebuild_totals) == soma em Python das linhas"""
+        maintained = self.ledger.totals()
+        self.ledger.rebuild_totals()
+        rebuilt = self.ledger.totals()
+        self.assertEqual(maintained.keys(), rebuilt.keys())
+        for key in maintained:
+            self.assertAlmostEqual(maintained[key], rebuilt[key], places=9, msg=key)
+
+        bets = self.ledger.list_bets()
+        finalized = [bet for bet in bets if bet['status'] in ('ganhou', 'perdeu')]
+        self.assertEqual(maintained['total_bets'], len(bets))
+        self.assertEqual(maintained['finalized'], len(finalized))
+        self.assertEqual(maintained['wins'], sum(bet['status'] == 'ganhou' for bet in finalized))
+        self.assertAlmostEqual(maintained['total_invested'], sum(bet['stake'] for bet in finalized), places=9)
+        self.assertAlmostEqual(maintained['total_returned'],
+                               sum(bet['stake'] * bet['odd'] for bet in finalized if bet['status'] == 'ganhou'), places=9)
+        self.assertRoiMatches(bets)
+
+
+class BetLedgerTest(LedgerTestCase):
+    def test_save_and_get(self):
+        bet_id = self.ledger.save_bet({'jogo': 'Flamengo vs Bahia', 'mercado': 'Empate', 'odd': '3.2', 'stake': 10})
+        bet = self.ledger.get_bet(bet_id)
+        self.assertEqual((bet['jogo'], bet['mercado'], bet['odd'], bet['stake'], bet['status']),
+                         ('Flamengo vs Bahia', 'Empate', 3.2, 10.0, 'pendente'))
+        self.assertIsNone(self.ledger.get_bet(bet_id + 1))
+
+    def test_ids_stay_unique_after_deletes(self):
+        rng = random.Random(1)
+        ids = [self.ledger.save_bet(random_bet(rng)) for _ in range(5)]
+        self.assertTrue(self.ledger.delete_bet(ids[-1]))
+        self.assertTrue(self.ledger.delete_bet(ids[1]))
+        self.assertFalse(self.ledger.delete_bet(ids[1]))
+        new_id = self.ledger.save_bet(random_bet(rng))
+        self.assertNotIn(new_id, ids)
+        self.assertEqual({bet['id'] for bet in self.ledger.list_bets()}, {ids[0], ids[2], ids[3], new_id})
+        self.assertEqual(self.ledger.count(), 4)
+
+    def test_update_status(self):
+        bet_id = self.ledger.save_bet({'jogo': 'A vs B', 'mercado': 'Empate', 'odd': 3.0, 'stake': 10})
+        self.assertTrue(self.ledger.update_status(bet_id, 'ganhou'))
+        self.assertEqual(self.ledger.get_bet(bet_id)['status'], 'ganhou')
+        self.assertFalse(self.ledger.update_status(bet_id + 1, 'perdeu'))
+        with self.assertRaises(ValueError):
+            self.ledger.update_status(bet_id, 'anulada')
+        with self.assertRaises(ValueError):
+            self.ledger.save_bet({'jogo': 'A vs B', 'mercado': 'Empate', 'odd': 3.0, 'status': 'anulada'})
+
+    def test_roi_from_sql_aggregates(self):
+        self.assertEqual(self.ledger.calculate_roi(), (0, 0, 0))
+        self.ledger.save_bet({'jogo': 'A vs B', 'mercado': 'Empate', 'odd': 3.0, 'stake': 10, 'status': 'ganhou'})
+        self.ledger.save_bet({'jogo': 'C vs D', 'mercado': 'Empate', 'odd': 2.0, 'stake': 20, 'status': 'perdeu'})
+        self.ledger.save_bet({'jogo': 'E vs F', 'mercado': 'Empate', 'odd': 5.0, 'stake': 99, 'status': 'pendente'})
+        roi, profit, win_rate = self.ledger.calculate_roi()
+        self.assertAlmostEqual(profit, 30 - 30)
+        self.assertAlmostEqual(roi, 0)
+        self.assertAlmostEqual(win_rate, 50)
+
+        rng = random.Random(2)
+        for _ in range(200):
+            self.ledger.save_bet(random_bet(rng))
+        self.assertRoiMatches(self.ledger.list_bets())
+
+    def test_survives_reopening(self):
+        rng = random.Random(3)
+        for _ in range(10):
+            self.ledger.save_bet(random_bet(rng))
+        before = self.ledger.list_bets()
+        self.ledger.close()
+        self.ledger = BetLedger(self.path)
+        self.assertEqual(self.ledger.list_bets(), before)
+        self.assertRoiMatches(before)
+
+    def test_clear(self):
+        rng = random.Random(4)
+        for _ in range(5):
+            self.ledger.save_bet(random_bet(rng))
+        self.ledger.clear()
+        self.assertEqual((self.ledger.count(), self.ledger.list_bets(), self.ledger.calculate_roi()), (0, [], (0, 0, 0)))
+
+
+class LedgerTotalsTest(LedgerTestCase):
+    def test_triggers_follow_inserts_status_changes_and_deletes(self):
+        rng = random.Random(5)
+        ids = []
+        for step in range(400):
+            action = rng.random()
+            if action < 0.5 or not ids:
+                ids.append(self.ledger.save_bet(random_bet(rng)))
+            elif action < 0.85:
+                self.ledger.update_status(rng.choice(ids), rng.choice(['pendente', 'ganhou', 'perdeu']))
+            else:
+                self.ledger.delete_bet(ids.pop(rng.randrange(len(ids))))
+            if step % 50 == 0:
+                self.assertTotalsConsistent()
+        self.assertTotalsConsistent()
+
+    def test_same_status_update_is_a_no_op(self):
+        bet_id = self.ledger.save_bet({'jogo': 'A vs B', 'mercado': 'Empate', 'odd': 3.0, 'stake': 10, 'status': 'ganhou'})
+        before = self.ledger.totals()
+        self.ledger.update_status(bet_id, 'ganhou')
+        self.assertEqual(self.ledger.totals(), before)
+
+    def test_odd_and_stake_corrections_move_the_totals(self):
+        rng = random.Random(6)
+        ids = [self.ledger.save_bet(random_bet(rng)) for _ in range(30)]
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("UPDATE bets SET stake = stake * 2, odd = odd + 0.5 WHERE id IN (?, ?, ?)", ids[:3])
+        connection.close()
+        self.assertTotalsConsistent()
+
+    def test_totals_are_built_for_a_ledger_without_them(self):
+        self.ledger.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executescript("""
+            CREATE TABLE bets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, jogo TEXT NOT NULL,
+                mercado TEXT NOT NULL, odd REAL NOT NULL, stake REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pendente', prob REAL, ev REAL, classification TEXT, market_key TEXT
+            );
+            INSERT INTO bets (timestamp, jogo, mercado, odd, stake, status) VALUES
+                ('2025-03-01 10:00:00', 'A vs B', 'Empate', 3.0, 10, 'ganhou'),
+                ('2025-03-02 10:00:00', 'C vs D', 'Empate', 2.0, 20, 'perdeu'),
+                ('2025-03-03 10:00:00', 'E vs F', 'Empate', 4.0, 5, 'pendente');
+        """)
+        connection.close()
+
+        self.ledger = BetLedger(self.path)
+        totals = self.ledger.totals()
+        self.assertEqual((totals['total_bets'], totals['finalized'], totals['wins']), (3, 2, 1))
+        self.assertAlmostEqual(totals['total_invested'], 30)
+        self.assertAlmostEqual(totals['total_returned'], 30)
+        self.ledger.update_status(3, 'ganhou')
+        self.assertTotalsConsistent()
+
+
+FILTERS = [
+    {'statuses': ['ganhou']},
+    {'statuses': ['ganhou', 'perdeu'], 'market': 'Flamengo'},
+    {'market': 'mais de'},
+    {'date_from': date(2025, 3, 1), 'date_to': date(2025, 6, 30)},
+    {'statuses': ['perdeu', 'pendente'], 'date_from': date(2025, 9, 1)},
+    {'date_to': date(2025, 2, 14), 'market': 'Empate'},
+]
+
+
+def matches(bet, statuses=None, market=None, date_from=None, date_to=None):
+    day = date.fromisoformat(bet['timestamp'][:10])
+    return (
+        (not statuses or bet['status'] in statuses)
+        and (not market or market.lower() in bet['mercado'].lower())
+        and (date_from is None or day >= date_from)
+        and (date_to is None or day <= date_to)
+    )
+
+
+class LedgerFilterTest(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(7)
+        for _ in range(300):
+            self.ledger.save_bet(random_bet(rng))
+
+    def test_filtered_queries_match_python_filter(self):
+        bets = self.ledger.list_bets()
+        for filters in FILTERS:
+            expected = sorted((bet for bet in bets if matches(bet, **filters)),
+                              key=lambda bet: (bet['timestamp'], bet['id']), reverse=True)
+            self.assertEqual(self.ledger.count_bets(**filters), len(expected), filters)
+            pages = [self.ledger.query_bets(**filters, limit=25, offset=offset) for offset in range(0, len(expected) + 25, 25)]
+            self.assertEqual([bet for page in pages for bet in page], expected, filters)
+
+    def test_filtered_roi_matches_recompute_over_the_same_rows(self):
+        for filters in FILTERS:
+            rows = self.ledger.query_bets(**filters, limit=-1)
+            self.assertRoiMatches(rows, self.ledger.calculate_roi(**filters))
+        self.assertEqual(self.ledger.calculate_roi(), self.ledger.calculate_roi(statuses=[], market=''))
+
+    def test_bulk_status_updates_keep_totals(self):
+        ids = [bet['id'] for bet in self.ledger.query_bets(statuses=['pendente'], limit=40)]
+        self.assertEqual(self.ledger.bulk_update_status(ids, 'ganhou'), len(ids))
+        self.assertTrue(all(self.ledger.get_bet(bet_id)['status'] == 'ganhou' for bet_id in ids))
+        self.assertTotalsConsistent()
+
+        filters = {'market': 'Empate', 'date_from': date(2025, 5, 1)}
+        selected = {bet['id'] for bet in self.ledger.list_bets() if matches(bet, **filters)}
+        self.assertEqual(self.ledger.update_status_where('perdeu', **filters), len(selected))
+        self.assertEqual({bet['id'] for bet in self.ledger.list_bets() if bet['status'] == 'perdeu'} & selected, selected)
+        self.assertTotalsConsistent()
+
+        with self.assertRaises(ValueError):
+            self.ledger.bulk_update_status(ids, 'anulada')
+
+
+
+class LedgerClosingTest(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(11)
+        for position in range(30):
+            bet = random_bet(rng)
+            bet.update(event_id=str(position % 7), key='home', kickoff=f"2025-05-{position % 28 + 1:02d} 19:00:00")
+            self.ledger.save_bet(bet)
+        self.ledger.save_bet(random_bet(rng))
+
+    def assertClvMatches(self):
+        bets = [bet for bet in self.ledger.list_bets() if bet['closing_odd']]
+        mean, count = self.ledger.average_clv()
+        self.assertEqual(count, len(bets))
+        expected = sum(bet['odd'] / bet['closing_odd'] - 1 for bet in bets) / len(bets) if bets else 0
+        self.assertAlmostEqual(mean or 0, expected, places=9)
+        self.assertTotalsConsistent()
+
+    def test_pending_closing_only_lists_started_unresolved_bets(self):
+        pending = self.ledger.pending_closing('2025-05-10 19:00:00')
+        expected = [bet['id'] for bet in self.ledger.list_bets()
+                    if bet['kickoff'] is not None and bet['kickoff'] <= '2025-05-10 19:00:00']
+        self.assertTrue(expected)
+        self.assertEqual(sorted(bet['id'] for bet in pending), sorted(expected))
+        self.ledger.set_closing_odds({bet['id']: 0 for bet in pending})
+        self.assertEqual(self.ledger.pending_closing('2025-05-10 19:00:00'), [])
+        self.assertEqual(self.ledger.average_clv(), (None, 0))
+
+    def test_average_clv_follows_closing_odds_and_edits(self):
+        rng = random.Random(5)
+        ids = [bet['id'] for bet in self.ledger.pending_closing('2025-12-31 23:59:59')]
+        self.assertEqual(self.ledger.set_closing_odds({bet_id: round(rng.uniform(1.2, 5), 2) for bet_id in ids}), len(ids))
+        self.assertClvMatches()
+
+        # Sem snapshot (0) sai da média; odd corrigida e exclusão movem a soma
+        self.ledger.set_closing_odds({ids[0]: 0, ids[1]: 2.5})
+        with self.ledger._connection:
+            self.ledger._connection.execute("UPDATE bets SET odd = odd + 0.3 WHERE id = ?", (ids[2],))
+        self.ledger.delete_bet(ids[3])
+        self.assertClvMatches()
+
+    def test_closing_columns_are_added_to_an_older_ledger(self):
+        self.ledger.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executescript("""
+            CREATE TABLE bets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, jogo TEXT NOT NULL,
+                mercado TEXT NOT NULL, odd REAL NOT NULL, stake REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pendente', prob REAL, ev REAL, classification TEXT, market_key TEXT
+            );
+            CREATE TABLE ledger_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1), total_bets INTEGER NOT NULL DEFAULT 0,
+                finalized INTEGER NOT NULL DEFAULT 0, wins INTEGER NOT NULL DEFAULT 0,
+                total_invested REAL NOT NULL DEFAULT 0, total_returned REAL NOT NULL DEFAULT 0
+            );
+            INSERT INTO bets (timestamp, jogo, mercado, odd, stake, status) VALUES
+                ('2025-03-01 10:00:00', 'A vs B', 'Empate', 3.0, 10, 'ganhou'),
+                ('2025-03-02 10:00:00', 'C vs D', 'Empate', 2.0, 20, 'perdeu');
+            INSERT INTO ledger_totals VALUES (1, 2, 2, 1, 30, 30);
+        """)
+        connection.close()
+
+        self.ledger = BetLedger(self.path)
+        bet = self.ledger.get_bet(1)
+        self.assertEqual((bet['event_id'], bet['kickoff'], bet['closing_odd']), (None, None, None))
+        self.assertEqual(self.ledger.average_clv(), (None, 0))
+        self.assertEqual(self.ledger.pending_closing(), [])
+
+        bet_id = self.ledger.save_bet({'jogo': 'E vs F', 'mercado': 'Empate', 'odd': 3.3, 'stake': 5,
+                                       'event_id': '9', 'key': 'draw', 'kickoff': '2025-03-03 19:00:00'})
+        self.assertEqual([bet['id'] for bet in self.ledger.pending_closing()], [bet_id])
+        self.ledger.set_closing_odds({bet_id: 3.0, 1: 2.5})
+        self.assertClvMatches()
+
+
+if __name__ == '__main__':
+    unittest.main()
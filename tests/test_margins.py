@@ -0,0 +1,162 @@
+"""Remoção de margem (proporcional, Shin, potência) e comparação de preços entre casas"""
+import unittest
+
+import numpy as np
+
+from ev_core.margins import (
+    DEVIG_METHODS, compare_prices, devig_power, devig_proportional, devig_shin, shin_probabilities
+)
+from ev_core.odds_import import ODDS_MARKETS, parse_odds_rows
+
+TRUE_PROBABILITIES = np.array([0.5, 0.3, 0.2])
+
+
+def odds_table(rows):
+    table, skipped = parse_odds_rows(
+        {'event_id': event_id, 'home_team': home, 'away_team': away, 'market': market, 'bookmaker': book, 'odd': odd}
+        for event_id, home, away, market, book, odd in rows
+    )
+    assert skipped == 0
+    return table
+
+
+def round_prices(fixtures):
+    """fixtures: [(event_id, casa, fora, {mercado: probabilidade})]"""
+    prices = {
+        'event_id': np.array([fixture[0] for fixture in fixtures], dtype=object),
+        'home_team': np.array([fixture[1] for fixture in fixtures], dtype=object),
+        'away_team': np.array([fixture[2] for fixture in fixtures], dtype=object),
+    }
+    for market in ODDS_MARKETS:
+        prices[market] = np.array([fixture[3].get(market, np.nan) for fixture in fixtures], dtype=float)
+    return prices
+
+
+def one_x_two(event_id, book, home, draw, away):
+    return [
+        (event_id, 'Flamengo', 'Bahia', 'home_win', book, home),
+        (event_id, 'Flamengo', 'Bahia', 'draw', book, draw),
+        (event_id, 'Flamengo', 'Bahia', 'away_win', book, away),
+    ]
+
+
+class DevigTest(unittest.TestCase):
+    def setUp(self):
+        odds = np.array([[1.85, 3.4, 4.6], [2.1, 3.2, 3.5], [1.25, 6.0, 11.0], [1.9, 1.9, np.nan]])
+        self.implied = 1 / odds
+
+    def test_every_method_sums_to_one(self):
+        for devig in (devig_proportional, devig_shin, devig_power):
+            fair = devig(self.implied)
+            np.testing.assert_allclose(np.nansum(fair, axis=1), 1, atol=1e-12, err_msg=devig.__name__)
+            self.assertTrue(np.isnan(fair[3, 2]), devig.__name__)
+
+    def test_proportional_divides_by_booksum(self):
+        implied = np.array([[0.55, 0.30, 0.25]])
+        np.testing.assert_allclose(devig_proportional(implied), [[0.5, 0.3 / 1.1, 0.25 / 1.1]])
+
+    def test_shin_recovers_generating_probabilities(self):
+        # Modelo de Shin direto: q_i = sqrt(S (z p_i + (1 - z) p_i²)), com sqrt(S) = Σ sqrt(z p_i + (1 - z) p_i²)
+        insider_share = 0.04
+        terms = np.sqrt(insider_share * TRUE_PROBABILITIES + (1 - insider_share) * TRUE_PROBABILITIES ** 2)
+        implied = (terms.sum() * terms)[None, :]
+        np.testing.assert_allclose(devig_shin(implied), [TRUE_PROBABILITIES], atol=1e-12)
+        np.testing.assert_allclose(shin_probabilities(implied, np.array([insider_share])), [TRUE_PROBABILITIES])
+
+    def test_shin_with_two_outcomes_splits_margin_equally(self):
+        # Com dois resultados Shin coincide com tirar metade da margem de cada lado
+        implied = 1 / np.array([[1.8, 2.05]])
+        margin = implied.sum() - 1
+        np.testing.assert_allclose(devig_shin(implied), implied - margin / 2, atol=1e-12)
+
+    def test_power_recovers_generating_probabilities(self):
+        exponent = 1.08
+        implied = (TRUE_PROBABILITIES ** (1 / exponent))[None, :]
+        np.testing.assert_allclose(devig_power(implied), [TRUE_PROBABILITIES], atol=1e-12)
+
+    def test_no_margin_is_left_unchanged(self):
+        implied = TRUE_PROBABILITIES[None, :]
+        for devig in (devig_proportional, devig_shin, devig_power):
+            np.testing.assert_allclose(devig(implied), implied, atol=1e-9, err_msg=devig.__name__)
+
+
+class ComparePricesTest(unittest.TestCase):
+    def test_best_price_and_consensus_across_books(self):
+        table = odds_table(one_x_two('1', 'A', 1.85, 3.4, 4.6) + one_x_two('1', 'B', 1.95, 3.3, 4.2))
+        result = compare_prices(table)
+        home = list(result['market']).index('home_win')
+        self.assertEqual(result['best_odd'][home], 1.95)
+        self.assertEqual(result['best_bookmaker'][home], 'B')
+        np.testing.assert_array_equal(result['books'], [2, 2, 2])
+
+        implied = 1 / np.array([[1.85, 3.4, 4.6], [1.95, 3.3, 4.2]])
+        order = [list(result['market']).index(market) for market in ('home_win', 'draw', 'away_win')]
+        for method, devig in (('proportional', devig_proportional), ('shin', devig_shin), ('power', devig_power)):
+            np.testing.assert_allclose(result[f'fair_{method}'][order], devig(implied).mean(axis=0), err_msg=method)
+            self.assertAlmostEqual(result[f'fair_{method}'].sum(), 1)
+        np.testing.assert_allclose(result['overround'], (implied.sum(axis=1) - 1).mean())
+        np.testing.assert_allclose(result['fair_odd'], 1 / result['fair_shin'])
+
+    def test_single_bookmaker_consensus_is_its_own_fair_price(self):
+        table = odds_table(one_x_two('1', 'A', 1.85, 3.4, 4.6))
+        result = compare_prices(table, consensus_method='power')
+        order = [list(result['market']).index(market) for market in ('home_win', 'draw', 'away_win')]
+        np.testing.assert_array_equal(result['books'], [1, 1, 1])
+        np.testing.assert_allclose(result['fair_power'][order], devig_power(1 / np.array([[1.85, 3.4, 4.6]]))[0])
+        np.testing.assert_allclose(result['fair_odd'], 1 / result['fair_power'])
+
+    def test_incomplete_market_group_has_best_price_but_no_consensus(self):
+        rows = one_x_two('1', 'A', 1.85, 3.4, 4.6)[:2] + [('1', 'Flamengo', 'Bahia', 'over_2.5', 'A', 1.9)]
+        result = compare_prices(odds_table(rows))
+        self.assertEqual(sorted(result['market']), ['draw', 'home_win', 'over_2.5'])
+        np.testing.assert_array_equal(result['books'], [0, 0, 0])
+        self.assertTrue(np.all(np.isnan(result['fair_shin'])))
+        self.assertTrue(np.all(np.isnan(result['overround'])))
+        self.assertEqual(sorted(result['best_odd']), [1.85, 1.9, 3.4])
+
+    def test_only_complete_books_enter_the_consensus(self):
+        rows = one_x_two('1', 'A', 1.85, 3.4, 4.6) + [('1', 'Flamengo', 'Bahia', 'home_win', 'B', 2.2)]
+        result = compare_prices(odds_table(rows))
+        home = list(result['market']).index('home_win')
+        self.assertEqual((result['best_odd'][home], result['best_bookmaker'][home]), (2.2, 'B'))
+        self.assertEqual(result['books'][home], 1)
+
+    def test_flags_model_far_from_consensus(self):
+        table = odds_table(one_x_two('1', 'A', 1.85, 3.4, 4.6) + one_x_two('1', 'B', 1.95, 3.3, 4.2))
+        prices = round_prices([('1', 'Flamengo', 'Bahia', {'home_win': 0.60, 'draw': 0.27, 'away_win': 0.13})])
+        result = compare_prices(table, prices, threshold=0.05)
+        by_market = {market: row for row, market in enumerate(result['market'])}
+        np.testing.assert_allclose(result['disagreement'], result['model_probability'] - result['fair_shin'])
+        np.testing.assert_allclose(result['ev'], result['model_probability'] * result['best_odd'] - 1)
+        self.assertTrue(result['flag'][by_market['home_win']])
+        self.assertFalse(result['flag'][by_market['draw']])
+        self.assertTrue(result['flag'][by_market['away_win']])
+
+        loose = compare_prices(table, prices, threshold=0.2)
+        self.assertFalse(loose['flag'].any())
+
+    def test_unmatched_fixture_has_no_model_columns(self):
+        table = odds_table(one_x_two('1', 'A', 1.85, 3.4, 4.6) + one_x_two('2', 'A', 2.5, 3.1, 2.9))
+        prices = round_prices([('1', 'Flamengo', 'Bahia', {'home_win': 0.5, 'draw': 0.28, 'away_win': 0.22})])
+        result = compare_prices(table, prices)
+        matched = result['event_id'] == '1'
+        self.assertEqual(matched.sum(), 3)
+        self.assertFalse(np.isnan(result['model_probability'][matched]).any())
+        self.assertTrue(np.isnan(result['model_probability'][~matched]).all())
+        self.assertFalse(result['flag'][~matched].any())
+
+    def test_empty_round_prices(self):
+        table = odds_table(one_x_two('1', 'A', 1.85, 3.4, 4.6))
+        empty = {column: np.array([], dtype=float) for column in ('event_id', 'home_team', 'away_team', *ODDS_MARKETS)}
+        result = compare_prices(table, empty)
+        self.assertEqual(len(result['market']), 3)
+        self.assertTrue(np.isnan(result['model_probability']).all())
+        self.assertTrue(np.isnan(result['ev']).all())
+        self.assertFalse(result['flag'].any())
+        np.testing.assert_array_equal(result['event_id'], ['1', '1', '1'])
+        for method in DEVIG_METHODS:
+            self.assertAlmostEqual(result[f'fair_{method}'].sum(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
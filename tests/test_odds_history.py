@@ -0,0 +1,141 @@
+"""Histórico de odds somente inserção, gravação só de mudanças e closing line value"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from ev_core.odds_history import OddsHistory, event_kickoff, fixture_key, to_epoch
+from ev_core.odds_import import parse_odds_rows
+
+KICKOFF = '2025-05-10 19:00:00'
+
+
+def at(minutes_before):
+    return to_epoch(KICKOFF) - minutes_before * 60
+
+
+class OddsHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'odds_history.db')
+        self.history = OddsHistory(self.path)
+
+    def tearDown(self):
+        self.history.close()
+        self.directory.cleanup()
+
+    def snapshots(self):
+        return self.history._connection.execute("SELECT COUNT(*) FROM odds_snapshots").fetchone()[0]
+
+
+class AppendOnlyTest(OddsHistoryTestCase):
+    def test_snapshots_cannot_be_changed_or_deleted(self):
+        self.history.record([('1', 'home', 'A', 2.0)], at(60))
+        connection = sqlite3.connect(self.path)
+        try:
+            with self.assertRaises(sqlite3.IntegrityError):
+                with connection:
+                    connection.execute("UPDATE odds_snapshots SET odd = 1")
+            with self.assertRaises(sqlite3.IntegrityError):
+                with connection:
+                    connection.execute("DELETE FROM odds_snapshots")
+        finally:
+            connection.close()
+        self.assertEqual(self.snapshots(), 1)
+        self.assertEqual(list(self.history.series('1', 'home')['odd']), [2.0])
+
+
+class ChangeOnlyTest(OddsHistoryTestCase):
+    def test_only_price_changes_are_stored(self):
+        rows = [('1', 'home', 'A', 2.0), ('1', 'home', 'B', 2.05), ('1', 'draw', 'A', 3.4)]
+        self.assertEqual(self.history.record(rows, at(300)), 3)
+        self.assertEqual(self.history.record(rows, at(240)), 0)
+        self.assertEqual(self.history.record([('1', 'home', 'A', 2.1)] + rows[1:], at(180)), 1)
+        self.assertEqual(self.history.record(rows, at(120)), 1)
+        self.assertEqual(self.snapshots(), 5)
+
+        series = self.history.series('1', 'home_win', bookmaker='A')
+        self.assertEqual(list(series['odd']), [2.0, 2.1, 2.0])
+        self.assertEqual(list(series['captured_at'].astype('int64')), [at(300), at(180), at(120)])
+        self.assertEqual(len(self.history.series('1', 'home', start=at(200), end=at(100))['odd']), 2)
+
+    def test_reopened_history_remembers_latest_prices(self):
+        rows = [('1', 'over', 'A', 1.9), ('2', 'under', 'A', 1.95)]
+        self.history.record(rows, at(60))
+        self.history.close()
+        self.history = OddsHistory(self.path)
+        self.assertEqual(self.history.record(rows, at(30)), 0)
+        self.assertEqual(self.history.record([('1', 'over', 'A', 1.85)], at(20)), 1)
+
+    def test_invalid_rows_are_skipped(self):
+        self.assertEqual(self.history.record([('', 'home', 'A', 2.0), ('1', 'home', 'A', np.nan)], at(10)), 0)
+
+    def test_imported_table_uses_matched_event_id(self):
+        table, _ = parse_odds_rows([
+            {'home_team': 'Flamengo', 'away_team': 'Bahia', 'market': '1', 'bookmaker': 'A', 'odd': '1,8'},
+            {'home_team': 'Grêmio', 'away_team': 'Inter', 'market': 'X', 'bookmaker': 'A', 'odd': '3.1'},
+        ])
+        round_prices = {
+            'event_id': np.array(['77'], dtype=object),
+            'home_team': np.array(['Flamengo'], dtype=object),
+            'away_team': np.array(['Bahia'], dtype=object),
+        }
+        self.assertEqual(self.history.record_table(table, round_prices, at(60)), 2)
+        self.assertEqual(list(self.history.series('77', 'home')['odd']), [1.8])
+        self.assertEqual(list(self.history.series(fixture_key('', 'Grêmio', 'Inter'), 'draw')['odd']), [3.1])
+
+
+class ClosingLineTest(OddsHistoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.history.record([('1', 'home', 'A', 2.0), ('1', 'home', 'B', 2.2)], at(600))
+        self.history.record([('1', 'home', 'A', 1.9)], at(30))
+        self.history.record([('1', 'home', 'A', 1.5), ('1', 'home', 'B', 1.6)], at(-10))
+
+    def test_closing_is_the_average_of_each_book_before_kickoff(self):
+        self.assertAlmostEqual(self.history.closing_odd('1', 'home', KICKOFF), (1.9 + 2.2) / 2)
+        self.assertAlmostEqual(self.history.closing_odd('1', 'home_win', KICKOFF, bookmaker='B'), 2.2)
+        self.assertAlmostEqual(self.history.closing_odd('1', 'home', at(60)), 2.1)
+        self.assertIsNone(self.history.closing_odd('1', 'home', at(700)))
+        self.assertIsNone(self.history.closing_odd('1', 'away', KICKOFF))
+        self.assertIsNone(self.history.closing_odd('2', 'home', KICKOFF))
+
+    def test_sees_series_created_by_another_handle(self):
+        other = OddsHistory(self.path)
+        try:
+            self.history.record([('3', 'over', 'C', 2.0)], at(20))
+            self.assertAlmostEqual(other.closing_odd('3', 'over', KICKOFF), 2.0)
+            self.assertEqual(other.closing_line_value([
+                {'id': 9, 'event_id': '3', 'jogo': '', 'key': 'over', 'odd': 2.2, 'kickoff': KICKOFF}
+            ]), {9: (2.0, 2.2 / 2.0 - 1)})
+        finally:
+            other.close()
+
+    def test_closing_line_value_per_bet(self):
+        self.history.record([('Grêmio vs Inter', 'btts_yes', 'A', 1.8)], at(5))
+        bets = [
+            {'id': 1, 'event_id': '1', 'jogo': 'Flamengo vs Bahia', 'key': 'home', 'odd': 2.1, 'kickoff': KICKOFF},
+            {'id': 2, 'event_id': None, 'jogo': 'Grêmio vs Inter', 'key': 'btts_yes', 'odd': 1.7, 'kickoff': KICKOFF},
+            {'id': 3, 'event_id': '1', 'jogo': 'Flamengo vs Bahia', 'key': 'home', 'odd': 2.1, 'kickoff': None},
+            {'id': 4, 'event_id': '1', 'jogo': 'Flamengo vs Bahia', 'key': 'draw', 'odd': 3.3, 'kickoff': KICKOFF},
+        ]
+        closing = (1.9 + 2.2) / 2
+        result = self.history.closing_line_value(bets)
+        self.assertEqual(sorted(result), [1, 2])
+        self.assertAlmostEqual(result[1][0], closing)
+        self.assertAlmostEqual(result[1][1], 2.1 / closing - 1)
+        self.assertAlmostEqual(result[2][1], 1.7 / 1.8 - 1)
+
+    def test_event_kickoff(self):
+        self.assertEqual(event_kickoff({'strTimestamp': '2025-05-10T19:00:00+00:00'}), KICKOFF)
+        self.assertEqual(event_kickoff({'strTimestamp': '2025-05-10T16:00:00-03:00'}), KICKOFF)
+        self.assertEqual(event_kickoff({'dateEvent': '2025-05-10', 'strTime': '19:00:00'}), KICKOFF)
+        self.assertEqual(event_kickoff({'dateEvent': '2025-05-10'}), '2025-05-10 00:00:00')
+        self.assertIsNone(event_kickoff({'strTimestamp': 'adiado'}))
+        self.assertIsNone(event_kickoff({}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Múltiplas: probabilidade conjunta contra a soma direta na matriz de placares"""
+import itertools
+import unittest
+
+import numpy as np
+
+from ev_core.parlay import price_parlay, search_parlays
+from ev_core.score_matrix import calculate_match_probabilities
+
+MAX_GOALS = 7
+
+
+def cells(key, max_goals=MAX_GOALS):
+    """Máscara de cada mercado escrita à mão, independente da do módulo"""
+    home, away = np.indices((max_goals + 1, max_goals + 1))
+    return {
+        'home': home > away, 'draw': home == away, 'away': home < away,
+        'over': home + away > 2, 'under': home + away <= 2,
+        'btts_yes': (home > 0) & (away > 0), 'btts_no': (home == 0) | (away == 0),
+    }[key]
+
+
+def brute_force(legs, matrices):
+    """Σ das células da interseção em cada jogo, multiplicado entre jogos"""
+    probability = 1.0
+    for jogo in {leg['jogo'] for leg in legs}:
+        mask = np.ones((MAX_GOALS + 1, MAX_GOALS + 1), dtype=bool)
+        for leg in legs:
+            if leg['jogo'] == jogo:
+                mask &= cells(leg['key'])
+        probability *= matrices[jogo][mask].sum()
+    return probability
+
+
+class ParlayTest(unittest.TestCase):
+    def setUp(self):
+        self.matrices = {
+            'Flamengo vs Bahia': calculate_match_probabilities(1.9, 0.8, MAX_GOALS),
+            'Grêmio vs Inter': calculate_match_probabilities(1.2, 1.3, MAX_GOALS),
+        }
+        keys = {
+            'Flamengo vs Bahia': ('home', 'draw', 'over', 'under', 'btts_yes', 'btts_no'),
+            'Grêmio vs Inter': ('away', 'over', 'btts_yes'),
+        }
+        self.legs = [
+            {'jogo': jogo, 'key': key, 'prob': float(self.matrices[jogo][cells(key)].sum()), 'odd': 1.5 + 0.25 * position}
+            for jogo, game_keys in keys.items() for position, key in enumerate(game_keys)
+        ]
+
+    def test_every_combination_matches_brute_force(self):
+        results = search_parlays(self.legs, self.matrices, min_legs=2, max_legs=4, min_probability=0,
+                                 beam_width=10 ** 6, top=10 ** 6, objective='ev')
+        expected_count = sum(len(list(itertools.combinations(self.legs, size))) for size in (2, 3, 4))
+        self.assertEqual(len(results), expected_count)
+        for result in results:
+            legs = [self.legs[position] for position in result['legs']]
+            self.assertAlmostEqual(result['probability'], brute_force(legs, self.matrices), places=12,
+                                   msg=[(leg['jogo'], leg['key']) for leg in legs])
+            self.assertAlmostEqual(result['odd'], np.prod([leg['odd'] for leg in legs]))
+
+    def test_correlated_same_game_legs(self):
+        home, over, btts = (self.legs[position] for position in (0, 2, 4))
+        parlay = price_parlay([home, over, btts], self.matrices)
+        self.assertTrue(parlay['same_game'])
+        self.assertAlmostEqual(parlay['probability'], brute_force([home, over, btts], self.matrices), places=12)
+        self.assertNotAlmostEqual(parlay['probability'], parlay['independent_probability'], places=3)
+        self.assertEqual(price_parlay([home, self.legs[1]], self.matrices)['probability'], 0)
+
+    def test_independent_games_multiply(self):
+        home, away = self.legs[0], self.legs[6]
+        parlay = price_parlay([home, away], self.matrices)
+        self.assertFalse(parlay['same_game'])
+        self.assertAlmostEqual(parlay['probability'], home['prob'] * away['prob'], places=12)
+
+    def test_adjusted_leg_probabilities_stay_bounded(self):
+        # Probabilidades exibidas diferentes das da matriz (ajuste H2H): a
+        # conjunta escala pela razão, mas nunca passa da menor perna
+        legs = [dict(leg) for leg in self.legs]
+        legs[2]['prob'] = 0.95
+        legs[4]['prob'] = 0.3
+        results = search_parlays(legs, self.matrices, min_legs=2, max_legs=4, min_probability=0,
+                                 beam_width=10 ** 6, top=10 ** 6, objective='ev')
+        for result in results:
+            probabilities = [legs[position]['prob'] for position in result['legs']]
+            self.assertLessEqual(result['probability'], min(probabilities) + 1e-12, result['legs'])
+
+        over, btts = legs[2], legs[4]
+        exact = brute_force([over, btts], self.matrices)
+        model = self.legs[2]['prob'] * self.legs[4]['prob']
+        expected = min(over['prob'] * btts['prob'] * exact / model, over['prob'], btts['prob'])
+        self.assertAlmostEqual(price_parlay([over, btts], self.matrices)['probability'], expected, places=12)
+
+    def test_same_game_legs_without_matrix_are_not_combined(self):
+        results = search_parlays(self.legs, {}, min_legs=2, max_legs=2, min_probability=0, top=10 ** 6)
+        self.assertTrue(results)
+        self.assertFalse(any(result['same_game'] for result in results))
+
+    def test_pruning_by_probability_and_odd(self):
+        results = search_parlays(self.legs, self.matrices, min_legs=2, max_legs=4, min_probability=0.1, max_odd=6,
+                                 top=10 ** 6)
+        self.assertTrue(results)
+        for result in results:
+            self.assertGreaterEqual(result['probability'], 0.1)
+            self.assertLessEqual(result['odd'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Kelly simultâneo: casos que reduzem ao Kelly isolado, limites de exposição e cenários"""
+import unittest
+
+import numpy as np
+
+from ev_core.betting import calculate_kelly_array
+from ev_core.portfolio import optimize_portfolio, scenario_returns
+from ev_core.score_matrix import calculate_match_probabilities
+
+SCENARIOS = 20000
+
+
+def kelly(probability, odd):
+    return (probability * odd - 1) / (odd - 1)
+
+
+def single(probability, odd, jogo='Flamengo vs Bahia', key='home'):
+    return {'jogo': jogo, 'key': key, 'prob': probability, 'odd': odd}
+
+
+class OptimizePortfolioTest(unittest.TestCase):
+    def setUp(self):
+        self.matrices = {
+            'Flamengo vs Bahia': calculate_match_probabilities(1.8, 0.9, 7),
+            'Grêmio vs Inter': calculate_match_probabilities(1.3, 1.2, 7),
+            'Santos vs Vasco': calculate_match_probabilities(1.5, 1.1, 7),
+        }
+
+    def test_single_bet_is_plain_kelly(self):
+        for probability, odd in ((0.55, 2.1), (0.3, 4.5), (0.7, 1.6)):
+            result = optimize_portfolio([single(probability, odd)], scenarios=SCENARIOS)
+            self.assertAlmostEqual(result['fractions'][0], kelly(probability, odd), delta=2e-3)
+            self.assertAlmostEqual(result['independent_kelly'][0], kelly(probability, odd))
+
+    def test_single_bet_is_capped(self):
+        result = optimize_portfolio([single(0.55, 2.1)], max_fraction=0.05)
+        self.assertAlmostEqual(result['fractions'][0], 0.05, places=9)
+        result = optimize_portfolio([single(0.55, 2.1)], max_exposure=0.04)
+        self.assertAlmostEqual(result['fractions'][0], 0.04, places=9)
+        self.assertAlmostEqual(result['exposure'], 0.04, places=9)
+
+    def test_single_bet_without_value_gets_nothing(self):
+        result = optimize_portfolio([single(0.4, 2.2)])
+        self.assertEqual(result['fractions'][0], 0)
+        np.testing.assert_allclose(result['independent_kelly'], calculate_kelly_array(np.array([0.4]), np.array([2.2]), np.inf))
+
+    def test_independent_bets_on_different_games(self):
+        bets = [single(0.55, 2.1), single(0.5, 2.3, 'Grêmio vs Inter', 'over')]
+        result = optimize_portfolio(bets, scenarios=SCENARIOS)
+        # Simultâneas ficam abaixo do Kelly isolado, mas perto dele para apostas pequenas e independentes
+        self.assertTrue(np.all(result['fractions'] <= result['independent_kelly'] + 2e-3))
+        self.assertTrue(np.all(result['fractions'] > 0.5 * result['independent_kelly']))
+
+    def test_stakes_never_exceed_the_budget(self):
+        bets = [
+            {'jogo': 'Flamengo vs Bahia', 'key': 'home', 'prob': 0.62, 'odd': 2.0},
+            {'jogo': 'Flamengo vs Bahia', 'key': 'over', 'prob': 0.55, 'odd': 2.1},
+            {'jogo': 'Flamengo vs Bahia', 'key': 'btts_yes', 'prob': 0.5, 'odd': 2.2},
+            {'jogo': 'Grêmio vs Inter', 'key': 'draw', 'prob': 0.3, 'odd': 3.8},
+            {'jogo': 'Grêmio vs Inter', 'key': 'under', 'prob': 0.5, 'odd': 2.2},
+            {'jogo': 'Santos vs Vasco', 'key': 'home', 'prob': 0.48, 'odd': 2.4},
+            {'jogo': 'Palmeiras vs Bahia', 'key': 'away', 'prob': 0.35, 'odd': 3.4},
+        ]
+        for max_exposure, max_fraction in ((1.0, None), (0.25, None), (0.1, 0.03), (0.5, 0.02)):
+            result = optimize_portfolio(bets, self.matrices, max_exposure=max_exposure, max_fraction=max_fraction)
+            fractions = result['fractions']
+            self.assertLessEqual(fractions.sum(), max_exposure + 1e-9, (max_exposure, max_fraction))
+            self.assertAlmostEqual(result['exposure'], fractions.sum())
+            self.assertTrue(np.all(fractions >= 0))
+            if max_fraction is not None:
+                self.assertTrue(np.all(fractions <= max_fraction + 1e-12))
+            self.assertGreater(result['expected_growth'], 0)
+
+    def test_scenarios_respect_each_game(self):
+        bets = [
+            {'jogo': 'Flamengo vs Bahia', 'key': 'home', 'prob': 0.6, 'odd': 2.0},
+            {'jogo': 'Flamengo vs Bahia', 'key': 'draw', 'prob': 0.24, 'odd': 3.6},
+            {'jogo': 'Flamengo vs Bahia', 'key': 'over', 'prob': 0.5, 'odd': 2.0},
+            {'jogo': 'Palmeiras vs Bahia', 'key': 'away', 'prob': 0.35, 'odd': 3.4},
+        ]
+        wins = scenario_returns(bets, self.matrices, SCENARIOS) > 0
+        self.assertFalse(np.any(wins[:, 0] & wins[:, 1]))
+        np.testing.assert_allclose(wins.mean(axis=0), [bet['prob'] for bet in bets], atol=5e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
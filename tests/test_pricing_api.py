@@ -0,0 +1,137 @@
+"""API de precificação: servidor numa porta livre, requisições concorrentes contra analyse_match"""
+import asyncio
+import itertools
+import os
+import tempfile
+import unittest
+
+from ev_core.analysis import analyse_match, evaluate_odds
+from ev_core.config import DEFAULT_CONFIG
+from ev_core.dixon_coles import model_for_index
+from ev_core.pricing_api import PricingService, main, serve
+from ev_core.pricing_cache import PricingCache
+from ev_core.pricing_load_test import SAMPLE_ODDS, Connection
+from ev_core.season_index import SeasonIndex
+
+from test_season_index import TEAMS, make_season
+
+CONNECTIONS = 8
+PAIRS = list(itertools.permutations(TEAMS, 2))
+
+
+class PricingApiTest(unittest.IsolatedAsyncioTestCase):
+    dixon_coles = False
+
+    async def asyncSetUp(self):
+        self.index = SeasonIndex(make_season(40))
+        self.model = model_for_index(self.index) if self.dixon_coles else None
+        self.service = PricingService(self.index, DEFAULT_CONFIG, self.model, scope=('4351', '2025'))
+        started = asyncio.get_running_loop().create_future()
+        self.server = asyncio.create_task(serve(
+            self.service, '127.0.0.1', 0, lambda server: started.set_result(server.sockets[0].getsockname()[1])
+        ))
+        self.port = await started
+        self.pricing_cache = PricingCache()
+
+    async def asyncTearDown(self):
+        self.server.cancel()
+        try:
+            await self.server
+        except asyncio.CancelledError:
+            pass
+
+    def analysis(self, home_team, away_team):
+        return analyse_match(self.index, home_team, away_team, DEFAULT_CONFIG, self.model,
+                             pricing_cache=self.pricing_cache)
+
+    async def send_all(self, requests):
+        """Distribui (método, caminho, payload) entre conexões keep-alive simultâneas; respostas na ordem"""
+        responses = [None] * len(requests)
+
+        async def worker(offset):
+            connection = Connection('127.0.0.1', self.port)
+            await connection.open()
+            try:
+                for position in range(offset, len(requests), CONNECTIONS):
+                    responses[position] = await connection.request(*requests[position])
+            finally:
+                connection.close()
+
+        await asyncio.gather(*(worker(offset) for offset in range(CONNECTIONS)))
+        return responses
+
+    def assertSummaryMatches(self, result, analysis):
+        self.assertEqual((result['home_team'], result['away_team']), (analysis.home_team, analysis.away_team))
+        self.assertAlmostEqual(result['expected_home_goals'], analysis.expected_home_goals, delta=1e-4)
+        self.assertAlmostEqual(result['expected_away_goals'], analysis.expected_away_goals, delta=1e-4)
+        self.assertEqual(result['model'], 'dixon_coles' if self.model is not None else 'poisson')
+        for market, value in result['markets'].items():
+            self.assertAlmostEqual(value, analysis.markets[market], delta=1e-6, msg=market)
+
+    async def test_concurrent_requests_match_analyse_match(self):
+        requests = []
+        for home_team, away_team in PAIRS:
+            fixture = {'home_team': home_team, 'away_team': away_team}
+            requests += [('POST', '/probabilities', fixture), ('POST', '/markets', dict(fixture, catalogue=True)),
+                         ('POST', '/ev', dict(fixture, odds=SAMPLE_ODDS))]
+        responses = await self.send_all(requests)
+
+        for (method, path, payload), (status, result) in zip(requests, responses):
+            self.assertEqual(status, 200, (path, result))
+            analysis = self.analysis(payload['home_team'], payload['away_team'])
+            self.assertSummaryMatches(result, analysis)
+            if path == '/probabilities':
+                self.assertEqual(result['max_goals'], analysis.matrix.shape[-1] - 1)
+                best = result['scores'][0]
+                home_goals, away_goals = map(int, best['score'].split('-'))
+                self.assertAlmostEqual(best['probability'], analysis.matrix.max(), delta=1e-6)
+                self.assertAlmostEqual(best['probability'], analysis.matrix[home_goals, away_goals], delta=1e-6)
+            elif path == '/markets':
+                self.assertEqual(set(result['catalogue']), set(analysis.catalogue))
+                for market, value in result['catalogue'].items():
+                    self.assertAlmostEqual(value, analysis.catalogue[market], delta=1e-6, msg=market)
+            else:
+                expected = evaluate_odds(analysis, SAMPLE_ODDS, DEFAULT_CONFIG.kelly_cap, only_value=False)
+                self.assertEqual([bet['key'] for bet in result['bets']], [bet['key'] for bet in expected])
+                for bet, expected_bet in zip(result['bets'], expected):
+                    self.assertAlmostEqual(bet['prob'], expected_bet['prob'], places=9)
+                    self.assertAlmostEqual(bet['ev'], expected_bet['ev'], places=9)
+
+        # Conexões simultâneas acabam no mesmo lote vetorizado
+        stats = self.service.stats()
+        self.assertEqual(stats['fixtures'], len(requests))
+        self.assertGreater(stats['largest_batch'], 1)
+
+    async def test_fixture_lists_keep_their_order(self):
+        fixtures = [{'home_team': home_team, 'away_team': away_team} for home_team, away_team in PAIRS[::3]]
+        (status, result), = await self.send_all([('POST', '/markets', {'fixtures': fixtures})])
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result['fixtures']), len(fixtures))
+        for fixture, summary in zip(fixtures, result['fixtures']):
+            self.assertSummaryMatches(summary, self.analysis(fixture['home_team'], fixture['away_team']))
+
+    async def test_errors(self):
+        responses = await self.send_all([
+            ('POST', '/probabilities', {'home_team': 'Flamengo', 'away_team': 'Vasco'}),
+            ('POST', '/probabilities', {'home_team': 'Flamengo'}),
+            ('POST', '/ev', {'home_team': 'Flamengo', 'away_team': 'Bahia', 'odds': {'mercado_inexistente': 2.0}}),
+            ('GET', '/ev', None),
+            ('GET', '/nada', None),
+            ('GET', '/teams', None),
+        ])
+        self.assertEqual([status for status, _ in responses], [404, 400, 400, 405, 404, 200])
+        self.assertEqual(responses[-1][1]['teams'], self.index.team_list)
+
+
+class DixonColesPricingApiTest(PricingApiTest):
+    dixon_coles = True
+
+
+class PricingApiMainTest(unittest.TestCase):
+    def test_missing_snapshot_for_split_year_season(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(main(['--cache', os.path.join(directory, 'cache'), '--season', '2024-2025']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Precificação da rodada com e sem o modelo Dixon-Coles"""
+import unittest
+
+import numpy as np
+
+from ev_core.dixon_coles import DixonColesModel, model_for_index
+from ev_core.round_pricing import ROUND_COLUMNS, price_round
+from ev_core.season_index import SeasonIndex
+
+from test_season_index import make_season
+
+MARKETS = ('home_win', 'draw', 'away_win', 'over_2.5', 'under_2.5', 'btts_yes', 'btts_no')
+
+
+class PriceRoundTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SeasonIndex(make_season(20))
+        self.model = model_for_index(self.index)
+        # Mesmo ajuste sem o último time: os jogos dele ficam sem λ do modelo
+        self.unknown = self.model.teams[-1]
+        self.partial = DixonColesModel(
+            self.model.teams[:-1], self.model.attack[:-1], self.model.defence[:-1],
+            self.model.home_advantage, self.model.rho
+        )
+
+    def test_prices_every_upcoming_fixture(self):
+        prices = price_round(self.index)
+        self.assertEqual(set(prices), set(ROUND_COLUMNS))
+        np.testing.assert_array_equal(prices['event_id'], self.index.event_ids[self.index.upcoming_rows])
+        total = prices['home_win'] + prices['draw'] + prices['away_win']
+        np.testing.assert_allclose(total, 1, atol=1e-9)
+
+    def test_fixtures_unknown_to_the_model_fall_back_to_averages(self):
+        averages = price_round(self.index)
+        partial = price_round(self.index, model=self.partial)
+        full = price_round(self.index, model=self.model)
+        np.testing.assert_array_equal(partial['event_id'], averages['event_id'])
+
+        unknown = (partial['home_team'] == self.unknown) | (partial['away_team'] == self.unknown)
+        self.assertTrue(unknown.any() and not unknown.all())
+        for column in ('expected_home_goals', 'expected_away_goals') + MARKETS:
+            np.testing.assert_allclose(partial[column][unknown], averages[column][unknown], err_msg=column)
+            np.testing.assert_allclose(partial[column][~unknown], full[column][~unknown], err_msg=column)
+
+    def test_selected_rows(self):
+        rows = self.index.upcoming_rows[::2]
+        prices = price_round(self.index, rows, model=self.partial)
+        np.testing.assert_array_equal(prices['event_id'], self.index.event_ids[rows])
+        everything = price_round(self.index, model=self.partial)
+        positions = [list(everything['event_id']).index(event_id) for event_id in prices['event_id']]
+        for market in MARKETS:
+            np.testing.assert_allclose(prices[market], everything[market][positions])
+
+    def test_no_fixtures(self):
+        prices = price_round(self.index, rows=[], model=self.model)
+        self.assertEqual(set(prices), set(ROUND_COLUMNS))
+        self.assertEqual(len(prices['event_id']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
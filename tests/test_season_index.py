@@ -0,0 +1,156 @@
+"""Atualização incremental do SeasonIndex (diff/apply_changes) contra a reconstrução completa"""
+import copy
+import random
+import unittest
+from datetime import date, timedelta
+
+from ev_core.ingestion import SeasonIngestor
+from ev_core.season_index import SeasonIndex
+
+TEAMS = ['Bahia', 'Botafogo', 'Flamengo', 'Fortaleza', 'Grêmio', 'Palmeiras']
+
+
+def make_season(seed=0, played_share=0.6):
+    """Turno e returno entre TEAMS; os primeiros played_share dos jogos já têm placar"""
+    rng = random.Random(seed)
+    fixtures = [(home, away) for home in TEAMS for away in TEAMS if home != away]
+    rng.shuffle(fixtures)
+    start = date(2025, 4, 1)
+    events = []
+    for position, (home, away) in enumerate(fixtures):
+        played = position < len(fixtures) * played_share
+        events.append({
+            'idEvent': str(1000 + position),
+            'intRound': str(position // 3 + 1),
+            'strHomeTeam': home,
+            'strAwayTeam': away,
+            'intHomeScore': str(rng.randint(0, 4)) if played else None,
+            'intAwayScore': str(rng.randint(0, 3)) if played else None,
+            'dateEvent': (start + timedelta(days=position // 3 * 7)).isoformat(),
+        })
+    return events
+
+
+def finish(event, home_score, away_score):
+    event['intHomeScore'] = str(home_score)
+    event['intAwayScore'] = str(away_score)
+
+
+class SeasonIndexUpdateTest(unittest.TestCase):
+    def assertSameIndex(self, index, expected):
+        self.assertEqual(index.team_list, expected.team_list)
+        self.assertEqual(index.completed_games, expected.completed_games)
+        self.assertEqual(sorted(index.event_ids), sorted(expected.event_ids))
+        self.assertEqual([index.event_ids[row] for row in index.upcoming_rows],
+                         [expected.event_ids[row] for row in expected.upcoming_rows])
+        for team in expected.team_list:
+            for venue in ('home', 'away'):
+                for use_recent in (True, False):
+                    self.assertEqual(index.team_stats(team, venue, use_recent),
+                                     expected.team_stats(team, venue, use_recent), (team, venue, use_recent))
+            for opponent in expected.team_list:
+                self.assertEqual(index.head_to_head(team, opponent, limit=100),
+                                 expected.head_to_head(team, opponent, limit=100), (team, opponent))
+
+    def updated(self, events, new_events):
+        """Índice incremental (com o cache de estatísticas já preenchido) e a reconstrução completa"""
+        index = SeasonIndex(events)
+        for team in index.team_list:
+            index.team_stats(team, 'home')
+            index.team_stats(team, 'away', False)
+        changes = index.diff(new_events)
+        self.assertIsNotNone(changes)
+        return index.apply_changes(changes), SeasonIndex(new_events), changes
+
+    def test_new_scores(self):
+        events = make_season()
+        new_events = copy.deepcopy(events)
+        pending = [event for event in new_events if event['intHomeScore'] is None]
+        for event in pending[:7]:
+            finish(event, 2, 1)
+        incremental, rebuilt, changes = self.updated(events, new_events)
+        self.assertEqual(len(changes), 7)
+        self.assertSameIndex(incremental, rebuilt)
+
+    def test_corrected_scores(self):
+        events = make_season(1)
+        new_events = copy.deepcopy(events)
+        finish(new_events[0], 5, 5)
+        finish(new_events[3], 0, 0)
+        new_events[5]['intHomeScore'] = new_events[5]['intAwayScore'] = None
+        incremental, rebuilt, changes = self.updated(events, new_events)
+        self.assertEqual(sorted(row for row, _ in changes), [0, 3, 5])
+        self.assertSameIndex(incremental, rebuilt)
+
+    def test_new_events(self):
+        events = make_season(2)
+        new_events = copy.deepcopy(events)
+        new_events.insert(4, {
+            'idEvent': '9001', 'intRound': '40', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia',
+            'intHomeScore': '3', 'intAwayScore': '3', 'dateEvent': '2025-05-20',
+        })
+        new_events.append({
+            'idEvent': '9002', 'intRound': '41', 'strHomeTeam': 'Grêmio', 'strAwayTeam': 'Palmeiras',
+            'intHomeScore': None, 'intAwayScore': None, 'dateEvent': '2025-06-03',
+        })
+        incremental, rebuilt, changes = self.updated(events, new_events)
+        self.assertEqual([row for row, _ in changes], [None, None])
+        self.assertSameIndex(incremental, rebuilt)
+
+    def test_rescheduled_dates(self):
+        events = make_season(3)
+        new_events = copy.deepcopy(events)
+        pending = [event for event in new_events if event['intHomeScore'] is None]
+        pending[0]['dateEvent'] = '2026-01-10'
+        pending[-1]['dateEvent'] = '2025-04-02'
+        played = [event for event in new_events if event['intHomeScore'] is not None]
+        played[2]['dateEvent'] = '2025-12-31'
+        incremental, rebuilt, _ = self.updated(events, new_events)
+        self.assertSameIndex(incremental, rebuilt)
+
+    def test_chained_snapshots(self):
+        events = make_season(4, played_share=0.2)
+        index = SeasonIndex(events)
+        rng = random.Random(4)
+        for _ in range(6):
+            events = copy.deepcopy(events)
+            for event in rng.sample([event for event in events if event['intHomeScore'] is None], 4):
+                finish(event, rng.randint(0, 3), rng.randint(0, 3))
+            rng.choice(events)['dateEvent'] = f"2025-{rng.randint(4, 11):02d}-{rng.randint(1, 28):02d}"
+            index = index.updated(events)
+            self.assertSameIndex(index, SeasonIndex(events))
+
+    def test_unsafe_payloads_need_a_full_rebuild(self):
+        events = make_season(5)
+        index = SeasonIndex(events)
+        self.assertEqual(index.diff(copy.deepcopy(events)), [])
+        self.assertIs(index.apply_changes([]), index)
+
+        new_team = copy.deepcopy(events)
+        new_team[0]['strHomeTeam'] = 'Vasco'
+        self.assertIsNone(index.diff(new_team))
+        self.assertIsNone(index.diff(events[1:]))
+        without_id = copy.deepcopy(events)
+        without_id[0]['idEvent'] = ''
+        self.assertIsNone(index.diff(without_id))
+        self.assertSameIndex(index.updated(new_team), SeasonIndex(new_team))
+
+    def test_ingestion_matches_full_rebuild(self):
+        ingestor = SeasonIngestor()
+        events = make_season(6)
+        ingestor.ingest('4351', '2025', 't0', events)
+        self.assertTrue(ingestor.last_result.full_rebuild)
+
+        new_events = copy.deepcopy(events)
+        for event in [event for event in new_events if event['intHomeScore'] is None][:5]:
+            finish(event, 1, 0)
+        new_events[-1]['dateEvent'] = '2025-12-01'
+        index = ingestor.ingest('4351', '2025', 't1', new_events)
+        self.assertFalse(ingestor.last_result.full_rebuild)
+        self.assertEqual(ingestor.last_result.changed, 6)
+        self.assertSameIndex(index, SeasonIndex(new_events))
+        self.assertIs(ingestor.ingest('4351', '2025', 't1', new_events), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
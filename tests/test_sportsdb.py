@@ -0,0 +1,121 @@
+"""SportsDBClient contra um servidor HTTP local (http.server) no lugar da API"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ev_core import sportsdb
+from ev_core.sportsdb import SportsDBClient, make_session
+
+EVENTS = [{'idEvent': '1', 'strHomeTeam': 'Flamengo', 'strAwayTeam': 'Bahia'}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Responde eventsseason.php conforme server.behaviour[temporada] = (tipo, atraso)"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        season = parse_qs(urlparse(self.path).query)['s'][0]
+        with self.server.lock:
+            self.server.hits.append(season)
+            kind, delay = self.server.behaviour.get(season, ('empty', 0))
+            if kind == 'flaky':
+                failures = self.server.failures.get(season, 0)
+                kind = '503' if failures < 1 else 'ok'
+                self.server.failures[season] = failures + 1
+        time.sleep(delay)
+        if kind in ('500', '503'):
+            self.send_response(int(kind))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'events': EVENTS if kind == 'ok' else None}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SportsDBClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.behaviour = {}
+        self.server.failures = {}
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = SportsDBClient(
+            f"http://127.0.0.1:{self.server.server_port}/api/v1/json/3",
+            session=make_session(retries=2, backoff_factor=0.01), timeout=5
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_prefers_first_format_even_if_slower(self):
+        self.server.behaviour.update({'2025': ('ok', 0.2), '2024-2025': ('ok', 0)})
+        events, season = self.client.fetch_season_events('4351', ['2025', '2024-2025'])
+        self.assertEqual(season, '2025')
+        self.assertEqual(events, EVENTS)
+
+    def test_falls_back_when_preferred_format_is_empty(self):
+        self.server.behaviour.update({'2025': ('empty', 0), '2024-2025': ('ok', 0)})
+        events, season = self.client.fetch_season_events('4351', ['2025', '2024-2025'])
+        self.assertEqual(season, '2024-2025')
+        self.assertEqual(events, EVENTS)
+
+    def test_falls_back_after_server_errors(self):
+        self.server.behaviour.update({'2025': ('500', 0), '2024-2025': ('ok', 0)})
+        events, season = self.client.fetch_season_events('4351', ['2025', '2024-2025'])
+        self.assertEqual(season, '2024-2025')
+        self.assertEqual(self.server.hits.count('2025'), 3)
+
+    def test_retries_transient_errors(self):
+        self.server.behaviour['2025'] = ('flaky', 0)
+        events, season = self.client.fetch_season_events('4351', ['2025'])
+        self.assertEqual(season, '2025')
+        self.assertEqual(events, EVENTS)
+        self.assertEqual(self.server.hits.count('2025'), 2)
+
+    def test_returns_none_and_records_attempts_when_nothing_found(self):
+        events, season = self.client.fetch_season_events('4351', ['2025', '2024-2025'])
+        self.assertEqual((events, season), (None, None))
+        attempts = list(self.client.attempts)
+        self.assertEqual(sorted(attempt.season for attempt in attempts), ['2024-2025', '2025'])
+        self.assertTrue(all(attempt.status_code == 200 and not attempt.ok for attempt in attempts))
+
+    def test_connection_error_is_recorded(self):
+        client = SportsDBClient('http://127.0.0.1:9', session=make_session(retries=0), timeout=1)
+        try:
+            self.assertEqual(client.fetch_season_events('4351', ['2025']), (None, None))
+            self.assertIsNotNone(client.attempts[-1].error)
+        finally:
+            client.close()
+
+    def test_shared_client_is_closed_when_api_base_changes(self):
+        self.server.behaviour['2025'] = ('ok', 0)
+        base = f"http://127.0.0.1:{self.server.server_port}/api/v1/json/3"
+        try:
+            self.assertEqual(sportsdb.fetch_season_events('4351', ['2025'], api_base=base), (EVENTS, '2025'))
+            first = sportsdb._default_client
+            self.assertEqual(sportsdb.fetch_season_events('4351', ['2025'], api_base=base + '/'), (EVENTS, '2025'))
+            self.assertIs(sportsdb._default_client, first)
+
+            sportsdb.fetch_season_events('4351', ['2025'], api_base=base.replace('/3', '/4'))
+            self.assertIsNot(sportsdb._default_client, first)
+            with self.assertRaises(RuntimeError):
+                first._executor.submit(time.sleep, 0)
+        finally:
+            sportsdb._default_client.close()
+            sportsdb._default_client = None
+
+
+if __name__ == '__main__':
+    unittest.main()